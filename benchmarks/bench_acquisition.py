@@ -0,0 +1,72 @@
+"""End-to-end load test of the acquisition path with emulated cameras.
+
+Frames are acquired with `Camera.get_frame` from a camera emulated by
+`camazing.emulator` for a given time, and the achieved frame rate, the
+acquisition statistics and the frame loss report are written as JSON:
+
+    python benchmarks/bench_acquisition.py --width 2048 --height 1536 \\
+        --frame-rate 200 --drop-rate 0.001 --duration 10
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from camazing import CameraList
+from camazing.emulator import EmulatedCamera, EmulatedGenTL
+from camazing.pixelformats import get_pixel_formats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="File to write the results to.")
+    parser.add_argument("--duration", type=float, default=5.0,
+                        help="Acquisition time in seconds.")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--pixel-format", default="Mono8",
+                        choices=get_pixel_formats())
+    parser.add_argument("--frame-rate", type=float, default=100.0)
+    parser.add_argument("--n-buffers", type=int, default=None)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--incomplete-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--software-trigger", action="store_true")
+    args = parser.parse_args()
+
+    spec = EmulatedCamera(
+        width=args.width, height=args.height, pixel_format=args.pixel_format,
+        frame_rate=args.frame_rate, drop_rate=args.drop_rate,
+        incomplete_rate=args.incomplete_rate, latency=args.latency, seed=0
+    )
+    camera = CameraList(gentl=EmulatedGenTL([spec]))[0]
+    camera.initialize()
+    if args.software_trigger:
+        camera["TriggerMode"].value = "On"
+
+    camera.start_acquisition(n_buffers=args.n_buffers)
+    n_frames = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.duration:
+        camera.get_frame()
+        n_frames += 1
+    elapsed = time.perf_counter() - start
+    camera.stop_acquisition()
+
+    output = {
+        "config": vars(args),
+        "frames": n_frames,
+        "frames_per_second": n_frames / elapsed,
+        "stats": camera.stats(),
+        "loss": camera.loss_report(),
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(output, file, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
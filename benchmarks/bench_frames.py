@@ -0,0 +1,269 @@
+"""Microbenchmarks of buffer decoding and frame wrapping.
+
+The benchmarks feed synthetic payloads of typical sensor sizes through every
+decoder in `camazing.pixelformats` and through `camazing.frames.wrap_frame`,
+and run the whole frame path, including the metadata reads, through
+`Camera.get_frame` on a camera emulated by `camazing.emulator` with and
+without `cache_meta`, so no camera is needed. Results are written as JSON,
+and can be compared to the results of an earlier run:
+
+    python benchmarks/bench_frames.py --output new.json --compare old.json
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from camazing import CameraList
+from camazing.emulator import EmulatedCamera, EmulatedGenTL
+from camazing.frames import wrap_frame
+from camazing.pixelformats import (get_decoder, get_pixel_formats,
+                                   get_valid_range)
+
+RESOLUTIONS = {
+    "VGA": (480, 640),
+    "FullHD": (1080, 1920),
+    "5MP": (2048, 2448),
+    "12MP": (3000, 4096),
+    "20MP": (3648, 5472),
+}
+
+# Typical metadata attached to each frame by `Camera`.
+META = {
+    "timestamp": 0.0,
+    "frame_id": 0,
+    "Gain": 0.0,
+    "ExposureTime": 10000.0,
+    "PixelColorFilter": "None",
+}
+
+
+def bytes_per_pixel(pixel_format):
+    """Size of a pixel in the payload of the given pixel format."""
+    channels = 3 if "RGB" in pixel_format else 1
+    return get_valid_range(pixel_format).dtype.itemsize * channels
+
+
+def measure(function, min_time):
+    """Time a function and trace its memory allocations.
+
+    Returns
+    -------
+    dict
+        Calls per second, number of timed calls, peak bytes allocated during
+        a call and number of memory blocks kept alive by its result.
+    """
+    function()  # Warm up.
+
+    n = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        n += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time and n >= 3:
+            break
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(
+        stat.count_diff for stat in after.compare_to(before, "filename")
+    )
+    del result
+
+    return {
+        "calls_per_second": n / elapsed,
+        "iterations": n,
+        "alloc_bytes_per_frame": peak,
+        "alloc_blocks_per_frame": blocks,
+    }
+
+
+def result_row(benchmark, pixel_format, name, height, width, payload_size,
+               result):
+    """Make a result of a benchmark and print its summary."""
+    fps = result.pop("calls_per_second")
+    print(
+        f"{benchmark:>20} {pixel_format:>10} {name:>7}: "
+        f"{fps:10.1f} frames/s "
+        f"{fps * payload_size / 1e6:10.1f} MB/s",
+        file=sys.stderr
+    )
+    return {
+        "benchmark": benchmark,
+        "pixel_format": pixel_format,
+        "resolution": name,
+        "width": width,
+        "height": height,
+        "payload_bytes": payload_size,
+        "frames_per_second": fps,
+        "megabytes_per_second": fps * payload_size / 1e6,
+        **result,
+    }
+
+
+def run_camera(camera, resolutions, pixel_formats, min_time):
+    """Benchmark `get_frame` on an emulated camera.
+
+    The emulated camera produces frames faster than they are usually
+    fetched, so the frame rate is set by the frame path: waiting for and
+    decoding the buffer, reading the metadata features and wrapping the
+    frame. The time spent reading the metadata is reported in
+    `meta_seconds_per_frame`.
+    """
+    results = []
+    for name, (height, width) in resolutions.items():
+        for pixel_format in pixel_formats:
+            camera["Width"].value = width
+            camera["Height"].value = height
+            camera["PixelFormat"].value = pixel_format
+            payload_size = height * width * bytes_per_pixel(pixel_format)
+            for cache_meta in (False, True):
+                camera.start_acquisition(n_buffers=4, cache_meta=cache_meta)
+                camera.reset_stats()
+                try:
+                    result = measure(camera.get_frame, min_time)
+                finally:
+                    camera.stop_acquisition()
+                result["meta_seconds_per_frame"] = \
+                    camera.stats()["stages"]["meta"]["mean"]
+                benchmark = "get_frame_cache_meta" if cache_meta \
+                    else "get_frame"
+                results.append(result_row(
+                    benchmark, pixel_format, name, height, width,
+                    payload_size, result
+                ))
+    return results
+
+
+def run(resolutions, pixel_formats, min_time):
+    """Run the benchmarks and return a list of results."""
+    results = []
+    rng = np.random.default_rng(0)
+    for name, (height, width) in resolutions.items():
+        for pixel_format in pixel_formats:
+            payload_size = height * width * bytes_per_pixel(pixel_format)
+            payload = rng.integers(0, 256, payload_size, np.uint8).tobytes()
+            decoder = get_decoder(pixel_format)
+            valid_range = get_valid_range(pixel_format)
+            data = decoder(payload, (height, width))
+
+            benchmarks = {
+                "decode": lambda: decoder(payload, (height, width)),
+                "wrap": lambda: wrap_frame(
+                    data, pixel_format, valid_range, META),
+                "decode_and_wrap": lambda: wrap_frame(
+                    decoder(payload, (height, width)),
+                    pixel_format, valid_range, META),
+            }
+            for benchmark, function in benchmarks.items():
+                results.append(result_row(
+                    benchmark, pixel_format, name, height, width,
+                    payload_size, measure(function, min_time)
+                ))
+    return results
+
+
+def environment():
+    """Describe the environment, so that results can be matched to commits."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import xarray
+    return {
+        "commit": commit,
+        "date": dt.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "xarray": xarray.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(results, previous):
+    """Print the change in frame rate relative to earlier results."""
+    key = ("benchmark", "pixel_format", "resolution")
+    old = {tuple(r[k] for k in key): r for r in previous["results"]}
+    for result in results:
+        earlier = old.get(tuple(result[k] for k in key))
+        if earlier:
+            change = (result["frames_per_second"] /
+                      earlier["frames_per_second"] - 1)
+            print(
+                f"{result['benchmark']:>20} {result['pixel_format']:>10} "
+                f"{result['resolution']:>7}: {change:+7.1%}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="File to write the results to.")
+    parser.add_argument("--compare", help="Earlier results to compare to.")
+    parser.add_argument(
+        "--resolution", action="append", choices=list(RESOLUTIONS),
+        help="Resolutions to benchmark (default: all)."
+    )
+    parser.add_argument(
+        "--pixel-format", action="append", choices=get_pixel_formats(),
+        help="Pixel formats to benchmark (default: all)."
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.5,
+        help="Minimum time in seconds to run each benchmark."
+    )
+    parser.add_argument(
+        "--no-camera", action="store_true",
+        help="Skip the benchmarks of get_frame on an emulated camera."
+    )
+    args = parser.parse_args()
+
+    resolutions = {
+        k: v for k, v in RESOLUTIONS.items()
+        if not args.resolution or k in args.resolution
+    }
+    pixel_formats = args.pixel_format or get_pixel_formats()
+
+    results = run(resolutions, pixel_formats, args.min_time)
+    if not args.no_camera:
+        spec = EmulatedCamera(frame_rate=2000.0, seed=0)
+        camera = CameraList(gentl=EmulatedGenTL([spec]))[0]
+        camera.initialize()
+        try:
+            results += run_camera(camera, resolutions, pixel_formats,
+                                  args.min_time)
+        finally:
+            camera.finalize()
+    output = {"environment": environment(), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(output, file, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Startup benchmark of importing camazing.
+
+Imports camazing in fresh interpreters with `python -X importtime` and
+reports the median import time, the slowest modules and which heavy
+dependencies were imported. Results are written as JSON, and can be compared
+to the results of an earlier run:
+
+    python benchmarks/bench_import.py --output new.json --compare old.json
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+# Dependencies that should only be imported when they are needed.
+HEAVY_MODULES = (
+    "numpy", "xarray", "pandas", "genicam2.gentl", "genicam2.genapi",
+    "tabulate", "toml", "zipfile36",
+)
+
+STATEMENTS = {
+    "import camazing": "import camazing",
+    "CameraList": "from camazing import CameraList",
+}
+
+
+def import_times(statement):
+    """Import in a fresh interpreter and parse the `-X importtime` report.
+
+    Returns
+    -------
+    total : float
+        Time of the whole statement in seconds.
+    modules : dict
+        Cumulative import time of each module in seconds.
+    loaded : list of str
+        The modules of `HEAVY_MODULES` that were imported.
+    """
+    check = (
+        f"{statement}; import sys; "
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        capture_output=True, text=True, check=True
+    )
+
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative) / 1e6
+
+    # Top-level imports are not indented, and they run one after another.
+    top_level = [
+        line for line in process.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line and
+        not line.split("|")[2].startswith("  ") and
+        "cumulative" not in line
+    ]
+    total = sum(int(line.split("|")[1]) for line in top_level) / 1e6
+    return total, modules, json.loads(process.stdout.replace("'", '"'))
+
+
+def run(repeat, top):
+    """Run the benchmarks and return a list of results."""
+    results = []
+    for name, statement in STATEMENTS.items():
+        totals = []
+        slowest = {}
+        for _ in range(repeat):
+            total, modules, loaded = import_times(statement)
+            totals.append(total)
+            for module, seconds in modules.items():
+                slowest.setdefault(module, []).append(seconds)
+
+        medians = {k: statistics.median(v) for k, v in slowest.items()}
+        result = {
+            "benchmark": name,
+            "statement": statement,
+            "median_seconds": statistics.median(totals),
+            "min_seconds": min(totals),
+            "heavy_modules_loaded": loaded,
+            "slowest_modules": dict(
+                sorted(medians.items(), key=lambda x: -x[1])[:top]
+            ),
+        }
+        results.append(result)
+        print(
+            f"{name:>16}: {result['median_seconds'] * 1e3:8.1f} ms "
+            f"(heavy: {', '.join(loaded) or 'none'})",
+            file=sys.stderr
+        )
+    return results
+
+
+def environment():
+    """Describe the environment, so that results can be matched to commits."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "date": dt.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(results, previous):
+    """Print the change in import time relative to earlier results."""
+    old = {r["benchmark"]: r for r in previous["results"]}
+    for result in results:
+        earlier = old.get(result["benchmark"])
+        if earlier:
+            change = (result["median_seconds"] /
+                      earlier["median_seconds"] - 1)
+            print(f"{result['benchmark']:>16}: {change:+7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="File to write the results to.")
+    parser.add_argument("--compare", help="Earlier results to compare to.")
+    parser.add_argument(
+        "--repeat", type=int, default=10,
+        help="Number of interpreters to start for each statement."
+    )
+    parser.add_argument(
+        "--top", type=int, default=15,
+        help="Number of slowest modules to report."
+    )
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.top)
+    output = {"environment": environment(), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(output, file, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
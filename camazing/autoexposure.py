@@ -0,0 +1,221 @@
+"""Software auto-exposure and auto-gain control."""
+
+import logging
+import math
+import time
+
+from camazing.imagestats import image_statistics
+
+logger = logging.getLogger(__name__)
+
+
+class AutoExposure:
+    """Keeps the mean brightness of the frames at a target level.
+
+    The controller assumes that the brightness is proportional to the
+    exposure time and the linear gain, so a single step corrects the
+    brightness of an unsaturated image. The exposure time is increased
+    first, and the gain only when the exposure time is at its maximum.
+
+    A feature is written only if its value would change more than
+    `threshold`. After writing, the controller skips `settle_frames` frames,
+    which may have been exposed with the old settings, and waits at least
+    `min_interval` seconds before writing again. Frames arriving in between
+    are not analyzed, so the controller costs next to nothing when it's idle.
+
+    Examples
+    --------
+    >>> with camera, camera.auto_exposure(target=0.4) as controller:
+    ...     for _ in range(100):
+    ...         frame = camera.get_frame()
+    ...     print(controller.state())
+    """
+
+    def __init__(self, camera, target=0.5, threshold=0.05, min_interval=0.05,
+                 settle_frames=2, subsample=8, max_saturation=0.01,
+                 exposure_limits=None, gain_limits=None, use_gain=True):
+        """Create a controller for a camera.
+
+        Use `Camera.auto_exposure` to create a controller that is run on
+        every frame.
+
+        Parameters
+        ----------
+        camera : camazing.core.Camera
+            Initialized camera with an `ExposureTime` feature.
+        target : float, optional
+            Target mean brightness as a fraction of the maximum pixel value.
+        threshold : float, optional
+            Minimum relative change of the exposure time or the linear gain
+            to write.
+        min_interval : float, optional
+            Minimum time between writes in seconds.
+        settle_frames : int, optional
+            Number of frames skipped after writing.
+        subsample : int, optional
+            Use every `subsample`:th pixel along both axes for the
+            brightness.
+        max_saturation : float, optional
+            Fraction of saturated pixels above which the exposure is reduced
+            by a factor of 4 to 256, depending on the fraction, as the mean
+            of a saturated image underestimates the light.
+        exposure_limits : tuple of float, optional
+            Minimum and maximum exposure time in microseconds. Defaults to
+            the limits of `ExposureTime`.
+        gain_limits : tuple of float, optional
+            Minimum and maximum gain in decibels. Defaults to the limits of
+            `Gain`.
+        use_gain : bool, optional
+            Whether to adjust `Gain`, if the camera has it.
+
+        Raises
+        ------
+        ValueError
+            If `target` is not between 0 and 1.
+        """
+        if not 0 < target < 1:
+            raise ValueError(
+                f"Expected `target` to be between 0 and 1, but got {target}."
+            )
+        self._target = target
+        self._threshold = threshold
+        self._min_interval = min_interval
+        self._settle_frames = settle_frames
+        self._subsample = subsample
+        self._max_saturation = max_saturation
+
+        exposure = camera["ExposureTime"]
+        self._exposure_limits = exposure_limits or (exposure.min, exposure.max)
+        self._gain = None
+        if use_gain and "Gain" in camera:
+            gain = camera["Gain"]
+            self._gain = gain
+            self._gain_limits = gain_limits or (gain.min, gain.max)
+        self._exposure = exposure
+        self._exposure_time = exposure.value
+        self._gain_db = self._gain.value if self._gain is not None else 0.0
+
+        self._skip = 0
+        self._next_time = 0.0
+        self._brightness = None
+        self._saturated = None
+        self._status = "waiting"
+        self.frames = 0
+        self.updates = 0
+        self.detach = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def update(self, data, valid_range, statistics=None):
+        """Analyze a frame and adjust the features if needed.
+
+        Parameters
+        ----------
+        data : numpy.ndarray
+            Decoded image.
+        valid_range : numpy.ndarray
+            Range of valid values for the pixel format.
+        statistics : dict, optional
+            Statistics of the image from
+            `camazing.imagestats.image_statistics`, if already computed.
+
+        Returns
+        -------
+        bool
+            `True` if a feature was written.
+        """
+        self.frames += 1
+        if self._skip:
+            self._skip -= 1
+            return False
+        if time.perf_counter() < self._next_time:
+            return False
+
+        if statistics is None:
+            statistics = image_statistics(
+                data, valid_range, subsample=self._subsample, percentiles=()
+            )
+        maximum = float(valid_range[1])
+        self._brightness = brightness = \
+            float(statistics["mean"].mean()) / maximum
+        self._saturated = saturated = float(statistics["saturated"].max())
+
+        factor = self._target / max(brightness, 1 / maximum)
+        if saturated > self._max_saturation:
+            # The more pixels are saturated, the less the mean tells, so the
+            # reduction grows from 4 to 256 times.
+            factor = min(factor, 0.25 ** (1 + 3 * saturated))
+        return self._apply(factor)
+
+    def _apply(self, factor):
+        """Scale the total exposure by a factor within the limits."""
+        low, high = self._exposure_limits
+        total = self._exposure_time * 10 ** (self._gain_db / 20) * factor
+        exposure_time = min(max(total, low), high)
+        gain_db = self._gain_db
+        if self._gain is not None:
+            low, high = self._gain_limits
+            gain_db = min(max(20 * math.log10(total / exposure_time), low),
+                          high)
+
+        threshold = math.log1p(self._threshold)
+        write_exposure = \
+            abs(math.log(exposure_time / self._exposure_time)) > threshold
+        write_gain = abs(gain_db - self._gain_db) / 20 * math.log(10) > \
+            threshold
+
+        if not (write_exposure or write_gain):
+            # Either close enough to the target, or at the limits.
+            self._status = ("converged" if abs(math.log(factor)) <= threshold
+                            else "limited")
+            return False
+
+        if write_exposure:
+            self._exposure.value = exposure_time
+            self._exposure_time = exposure_time
+        if write_gain:
+            self._gain.value = gain_db
+            self._gain_db = gain_db
+        self._status = "converging"
+        self.updates += 1
+        self._skip = self._settle_frames
+        self._next_time = time.perf_counter() + self._min_interval
+        logger.debug(
+            f"Auto exposure: brightness {self._brightness:.3f}, exposure "
+            f"time {self._exposure_time:.1f} us, gain {self._gain_db:.2f} dB."
+        )
+        return True
+
+    def state(self):
+        """Get the state of the controller.
+
+        Returns
+        -------
+        dict
+            `status` ('waiting' before the first analyzed frame, then
+            'converging', 'converged' or 'limited' when the target can't be
+            reached within the limits), the `target` and latest measured
+            `brightness`, the `saturated` fraction of pixels, the current
+            `exposure_time` and `gain`, and the numbers of `frames` seen and
+            `updates` written.
+        """
+        return {
+            "status": self._status,
+            "target": self._target,
+            "brightness": self._brightness,
+            "saturated": self._saturated,
+            "exposure_time": self._exposure_time,
+            "gain": self._gain_db if self._gain is not None else None,
+            "frames": self.frames,
+            "updates": self.updates,
+        }
+
+    def close(self):
+        """Stop controlling the camera."""
+        if self.detach is not None:
+            self.detach(self)
+            self.detach = None
@@ -0,0 +1,102 @@
+"""Sizing of the buffer pool used for image acquisition."""
+
+import math
+
+# Buffers on top of the frames in flight: one being filled by the producer
+# and one being decoded.
+MARGIN = 2
+
+
+def estimate_buffer_count(frame_rate, payload_size, latency=0.1,
+                          memory_budget=None, minimum=1):
+    """Estimate how many buffers are needed to acquire without underruns.
+
+    The producer keeps filling buffers while the consumer is busy, so there
+    must be a queued buffer for every frame arriving during the longest
+    expected delay of the consumer, plus the buffers being filled and
+    decoded.
+
+    Parameters
+    ----------
+    frame_rate : float or None
+        Frame rate in frames per second, or `None` if unknown.
+    payload_size : int
+        Size of a buffer in bytes.
+    latency : float, optional
+        Longest expected time in seconds between two `get_frame` calls.
+    memory_budget : int, optional
+        Maximum total size of the buffers in bytes.
+    minimum : int, optional
+        Minimum number of buffers, e.g. required by the producer.
+
+    Returns
+    -------
+    n_buffers : int
+        Number of buffers.
+    reason : str
+        Explanation of how the number was chosen.
+
+    Raises
+    ------
+    ValueError
+        If the memory budget doesn't fit the minimum number of buffers.
+    """
+    if frame_rate:
+        in_flight = math.ceil(frame_rate * latency)
+        n_buffers = max(minimum, in_flight + MARGIN)
+        reason = (
+            f"{frame_rate:.4g} frames/s for {latency:.4g} s of consumer "
+            f"latency is {in_flight} frames, plus {MARGIN} buffers being "
+            f"filled and decoded"
+        )
+        if in_flight + MARGIN < minimum:
+            reason += f", raised to the minimum of {minimum}"
+    else:
+        n_buffers = minimum
+        reason = f"the frame rate is unknown, using the minimum of {minimum}"
+
+    if memory_budget is not None:
+        limit = memory_budget // payload_size
+        if limit < minimum:
+            raise ValueError(
+                f"A memory budget of {memory_budget} bytes fits {limit} "
+                f"buffers of {payload_size} bytes, but at least {minimum} "
+                f"are required."
+            )
+        if n_buffers > limit:
+            n_buffers = limit
+            reason += (
+                f", limited to {limit} by the memory budget of "
+                f"{memory_budget} bytes"
+            )
+
+    return n_buffers, reason
+
+
+def grow_buffer_count(n_buffers, underruns, payload_size, memory_budget=None):
+    """Get a larger number of buffers after underruns.
+
+    The pool grows by the number of frames lost to underruns, but at least
+    by half, so that a few steps are enough to reach a sufficient size.
+
+    Parameters
+    ----------
+    n_buffers : int
+        Current number of buffers.
+    underruns : int
+        Number of frames lost for lack of a queued buffer.
+    payload_size : int
+        Size of a buffer in bytes.
+    memory_budget : int, optional
+        Maximum total size of the buffers in bytes.
+
+    Returns
+    -------
+    int
+        New number of buffers, which equals `n_buffers` if the memory budget
+        doesn't allow growing.
+    """
+    new = n_buffers + max(underruns, math.ceil(n_buffers / 2))
+    if memory_budget is not None:
+        new = max(n_buffers, min(new, memory_budget // payload_size))
+    return new
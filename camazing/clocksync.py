@@ -0,0 +1,233 @@
+"""Mapping of device timestamps to host time."""
+
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Latch command, latched value and tick frequency features, by naming
+# convention.
+_LATCH_FEATURES = (
+    ("TimestampLatch", "TimestampLatchValue", None),
+    ("GevTimestampControlLatch", "GevTimestampValue",
+     "GevTimestampTickFrequency"),
+)
+
+
+class ClockSync:
+    """Fits the offset and drift of a camera's clock relative to the host.
+
+    The device clock is sampled by latching its timestamp and reading the
+    latched value. Each sample is paired with the midpoint of the host time
+    before latching and after reading, so its error is at most half of the
+    round trip. Of each burst of latches only the one with the shortest
+    round trip is kept, and a line is fitted to the kept samples of the
+    recent window, discarding samples with a round trip much longer than the
+    shortest one.
+
+    After `start`, the clock is synchronized every `interval` seconds in a
+    background thread. The latches are done under the feature lock of the
+    camera, between the metadata reads of frames, so converting timestamps
+    with `to_host` never waits for the device.
+
+    Examples
+    --------
+    >>> sync = ClockSync(camera)
+    >>> sync.synchronize()
+    >>> sync.to_host(buffer.timestamp_ns)
+    1612345678.123456
+    """
+
+    def __init__(self, camera, interval=10.0, samples=8, window=32):
+        """Find the timestamp features of a camera.
+
+        Parameters
+        ----------
+        camera : camazing.core.Camera
+            Initialized camera.
+        interval : float, optional
+            Time in seconds between synchronizations done by the thread
+            started with `start`.
+        samples : int, optional
+            Number of latches in each synchronization.
+        window : int, optional
+            Number of synchronizations used in the fit.
+
+        Raises
+        ------
+        ValueError
+            If the camera has no timestamp latch features.
+        """
+        for latch, value, frequency in _LATCH_FEATURES:
+            if latch in camera and value in camera:
+                break
+        else:
+            raise ValueError(
+                "The camera has no `TimestampLatch` and `TimestampLatchValue` "
+                "features."
+            )
+        self._lock = camera._feature_lock
+        self._latch = camera[latch]
+        self._value = camera[value]
+        # The latched value is in nanoseconds unless a tick frequency is
+        # given, like buffer timestamps in `timestamp_ns`.
+        self._tick = 1.0
+        if frequency is not None and frequency in camera:
+            self._tick = 1e9 / camera[frequency].value
+
+        self._interval = interval
+        self._samples = samples
+        self._points = collections.deque(maxlen=window)
+        # Host time = host_origin + rate * (device time - device_origin),
+        # with device time in nanoseconds and host time in seconds. The
+        # three are replaced together, so `to_host` needs no lock.
+        self._mapping = None
+        self._rate = 1e-9
+        self._residual = None
+
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.errors = 0
+        self.detach = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def _sample(self):
+        """Latch the device clock once.
+
+        Returns
+        -------
+        device : float
+            Latched device time in nanoseconds.
+        host : float
+            Host time at the middle of the round trip in seconds.
+        rtt : float
+            Round trip time in seconds.
+        """
+        before = time.time()
+        self._latch.execute()
+        device = self._value.value
+        after = time.time()
+        return device * self._tick, (before + after) / 2, after - before
+
+    def synchronize(self):
+        """Sample the device clock and update the fit."""
+        with self._lock:
+            points = [self._sample() for _ in range(self._samples)]
+        self._points.append(min(points, key=lambda point: point[2]))
+        self._fit()
+
+    def start(self):
+        """Start synchronizing every `interval` seconds in a thread."""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="camazing-clocksync", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: not self._running, self._interval
+                )
+                if not self._running:
+                    return
+            try:
+                self.synchronize()
+            except Exception as e:
+                self.errors += 1
+                logger.debug(f"Clock synchronization failed: {e}")
+
+    def _fit(self):
+        """Fit the offset and drift to the samples with short round trips."""
+        shortest = min(point[2] for point in self._points)
+        points = [
+            point for point in self._points
+            if point[2] <= 2 * shortest + 1e-4
+        ]
+        device_origin, host_origin, _ = points[-1]
+
+        if len(points) > 1:
+            x = [point[0] - device_origin for point in points]
+            y = [point[1] - host_origin for point in points]
+            mean_x = sum(x) / len(x)
+            mean_y = sum(y) / len(y)
+            sxx = sum((a - mean_x) ** 2 for a in x)
+            if sxx > 0:
+                self._rate = sum(
+                    (a - mean_x) * (b - mean_y) for a, b in zip(x, y)
+                ) / sxx
+            intercept = mean_y - self._rate * mean_x
+            self._residual = max(
+                abs(b - intercept - self._rate * a) for a, b in zip(x, y)
+            )
+            host_origin += intercept
+        self._mapping = (device_origin, host_origin, self._rate)
+
+    def to_host(self, device_ns):
+        """Convert a device timestamp to host time.
+
+        Parameters
+        ----------
+        device_ns : int
+            Device timestamp in nanoseconds, e.g. `timestamp_ns` of a
+            buffer.
+
+        Returns
+        -------
+        float
+            Host time in seconds since the epoch, as `time.time`.
+
+        Raises
+        ------
+        RuntimeError
+            If the clock has not been synchronized.
+        """
+        mapping = self._mapping
+        if mapping is None:
+            raise RuntimeError("The clock has not been synchronized.")
+        device_origin, host_origin, rate = mapping
+        return host_origin + (device_ns - device_origin) * rate
+
+    def state(self):
+        """Get the state of the fit.
+
+        Returns
+        -------
+        dict
+            `drift_ppm` of the device clock relative to the host clock
+            (positive when it runs fast), the number of `samples` in the fit,
+            the shortest round trip `rtt` and the largest `residual` of the
+            fit in seconds (`None` with a single sample).
+        """
+        return {
+            "drift_ppm": (1e-9 / self._rate - 1) * 1e6,
+            "samples": len(self._points),
+            "rtt": min((point[2] for point in self._points), default=None),
+            "residual": self._residual,
+        }
+
+    def close(self):
+        """Stop synchronizing and detach the synchronization from the camera.
+
+        The current fit is kept, so `to_host` still works.
+        """
+        if self.detach is not None:
+            self.detach(self)
+            self.detach = None
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
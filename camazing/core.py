@@ -1,38 +1,99 @@
 import atexit
+import collections
 import datetime as dt
 import io
 import logging
 import os
 import platform
+import threading
+import time
 import urllib
 import sys
-from functools import wraps
-
-import genicam2.gentl as gtl
-import genicam2.genapi as gapi
-import numpy as np
-import tabulate
-import toml
-import xarray as xr
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
 
+# The heavier dependencies (genicam2, numpy, xarray, tabulate, toml and
+# zipfile) are imported where they are first needed, which keeps importing
+# camazing fast for short-lived programs.
 import camazing.feature_types
 from camazing.util import Singleton
-from camazing.pixelformats import get_decoder, get_valid_range
-
-# Some cameras are incompatible with zipfile package when Python version >= 3.7
-if sys.version_info >= (3, 7):
-    import zipfile36 as zipfile
-else:
-    import zipfile
+from camazing.buffers import estimate_buffer_count, grow_buffer_count
+from camazing.frames import wrap_frame
+from camazing.metrics import AcquisitionStats, FrameTracker
+from camazing.sequencer import Sequencer
 
 # Initialize the logger.
 logger = logging.getLogger(__name__)
 
+# Cameras which have created a device. Weak references don't keep the
+# cameras alive, and a single exit handler frees the resources of the ones
+# still around when the program exits.
+_cameras = weakref.WeakSet()
+
+
+@atexit.register
+def _finalize_cameras():
+    """Make sure that `finalize` is called when one exits the program."""
+    for camera in list(_cameras):
+        camera.finalize()
+
 
 class AcquisitionException(Exception):
     pass
 
 
+@lru_cache(maxsize=None)
+def _port_class():
+    """Get the GenApi port class, defined on first use with genicam2."""
+    import genicam2.genapi as gapi
+
+    class Port(gapi.AbstractPort):
+        """A concrete implementation of port."""
+
+        def __init__(self, port):
+            """Initialize the port.
+
+            Parameters
+            ----------
+            port
+                Remote port of an device info object.
+            """
+            gapi.AbstractPort.__init__(self)
+            self._port = port
+
+        def read(self, address, size):
+            """Read number of bytes from the port.
+
+            Parameters
+            ----------
+            address : int
+                Memory address from which we start reading the bytes.
+            size : int
+                Number of bytes to read.
+            """
+            buffer = self._port.read(address, size)
+            return buffer[1]
+
+        def write(self, address, value):
+            """Write number of bytes to the port.
+
+            Parameters
+            ----------
+            address : int
+                Memory address from which we start writing the bytes.
+            size : int
+                Number of bytes to write.
+            """
+            self._port.write(address, value)
+
+        def get_access_mode(self):
+            """Get the access mode of a node."""
+            return gapi.EAccessMode.RW
+
+    return Port
+
+
 def check_initialization(method):
     """Decorator for checking camera initialization.
 
@@ -123,7 +184,7 @@ class CameraList(metaclass=Singleton):
 
     _headers = ["Vendor", "Model", "Serial number", "TL type"]
 
-    def __init__(self, cti_file=None):
+    def __init__(self, cti_file=None, timeout=200, gentl=None):
         """Initializes the `CameraList`.
 
         Parameters
@@ -131,10 +192,25 @@ class CameraList(metaclass=Singleton):
         cti_file : str, optional
             Path to the GenICam Producer file (.cti). If no file path is given,
             automatic lookup of the Producer file is performed.
+        timeout : int, optional
+            Default timeout of device discovery in milliseconds, see `update`.
+        gentl : module, optional
+            GenTL binding used to load the Producer, `genicam2.gentl` by
+            default. `camazing.emulator.EmulatedGenTL` can be passed for
+            emulated cameras, in which case no Producer file is needed.
         """
+        self._timeout = timeout
+        if gentl is None:
+            import genicam2.gentl as gtl
+            self._gentl = gtl
+        else:
+            self._gentl = gentl
+
         # If GenICam Producer file is not given as an argument, try to find an
         # existing one automatically.
-        if cti_file is None:
+        if cti_file is None and gentl is not None:
+            self._cti_file = None
+        elif cti_file is None:
             # `get_cti_file` contains logging, so no need to do it here.
             self._cti_file = get_cti_file()
         else:
@@ -146,7 +222,7 @@ class CameraList(metaclass=Singleton):
             self._cti_file = cti_file
 
         # Initialize the GenICam Producer.
-        self._producer = gtl.GenTLProducer.create_producer()
+        self._producer = self._gentl.GenTLProducer.create_producer()
         self._producer.open(self._cti_file)
         logger.debug(
             "Initialized GenICam Producer, which is compliant with version "
@@ -164,7 +240,7 @@ class CameraList(metaclass=Singleton):
         ))
 
         # Interface info list has all available interfaces listed. Update it.
-        self._system.update_interface_info_list(200)  # Timeout is 200 ms.
+        self._system.update_interface_info_list(timeout)
 
         # Initialize the interfaces (see section 2.2.2 in GenICam GenTL
         # standard, version 1.5).
@@ -182,6 +258,8 @@ class CameraList(metaclass=Singleton):
                 )
 
         # Update the list of available cameras.
+        self._cameras = []
+        self._cameras_by_id = {}
         self.update()
 
     def __del__(self):
@@ -210,6 +288,8 @@ class CameraList(metaclass=Singleton):
         str
             Tabular representation of the `CameraList`.
         """
+        import tabulate
+
         return tabulate.tabulate(
             self._repr_items,
             self._headers,
@@ -229,6 +309,8 @@ class CameraList(metaclass=Singleton):
         -----
         This method is mainly used by Jupyter Notebook.
         """
+        import tabulate
+
         return tabulate.tabulate(
             self._repr_items,
             self._headers,
@@ -260,35 +342,133 @@ class CameraList(metaclass=Singleton):
 
         Parameters
         -------
-        index : int
-            A list index (just like in regular Python lists).
+        index : int or str
+            A list index (just like in regular Python lists), or a serial
+            number of the camera.
 
         Returns
         -------
         Camera
             A `Camera` object.
+
+        Raises
+        ------
+        KeyError
+            If no camera has the given serial number.
         """
+        if isinstance(index, str):
+            try:
+                return self._index["serial_number"][index][0]
+            except KeyError:
+                raise KeyError(
+                    f"No camera with serial number `{index}`."
+                ) from None
         return self._cameras[index]
 
-    def update(self):
-        """Update the list of available cameras."""
+    def find(self, serial_number=None, model=None, user_defined_name=None):
+        """Find cameras by their device info.
+
+        Parameters
+        ----------
+        serial_number : str, optional
+            Serial number of the camera.
+        model : str, optional
+            Model name of the camera.
+        user_defined_name : str, optional
+            User-defined name of the camera.
+
+        Returns
+        -------
+        list of Camera
+            Cameras matching all the given criteria, in list order.
+        """
+        criteria = {
+            "serial_number": serial_number,
+            "model": model,
+            "user_defined_name": user_defined_name,
+        }
+        found = None
+        for key, value in criteria.items():
+            if value is not None:
+                matches = self._index[key].get(value, [])
+                if found is None:
+                    found = matches
+                else:
+                    found = [c for c in found if any(c is m for m in matches)]
+        return list(self._cameras if found is None else found)
+
+    def update(self, timeout=None):
+        """Update the list of available cameras.
+
+        Device discovery is run concurrently on all the interfaces. The
+        `Camera` objects of devices that are still present are kept, so that
+        references to them stay valid, and objects are created only for newly
+        found devices. Devices are matched by their interface and GenTL
+        device IDs, since serial numbers may be empty or repeated. Cameras
+        that are no longer found are finalized.
+
+        Parameters
+        ----------
+        timeout : int, optional
+            Timeout of device discovery on each interface in milliseconds. If
+            not given, the timeout given when creating the list is used.
+        """
         logger.debug("Trying to update the camera list...")
 
-        self._device_infos = []  # Reset device infos.
+        if timeout is None:
+            timeout = self._timeout
 
-        # Update device info lists in case of newly connected cameras.
-        for interface in self._interfaces:
-            interface.update_device_info_list(200)
-            self._device_infos.extend(interface.device_info_list)
+        def discover(interface):
+            # Update device info list in case of newly connected cameras.
+            interface.update_device_info_list(timeout)
+            return list(interface.device_info_list)
+
+        # Device discovery mostly waits for the devices to respond, so the
+        # interfaces can be handled in parallel threads.
+        with ThreadPoolExecutor(
+                max_workers=max(len(self._interfaces), 1)) as executor:
+            device_info_lists = list(executor.map(discover, self._interfaces))
+
+        found = [
+            ((interface.id_, device_info.id_), device_info)
+            for interface, device_infos in zip(self._interfaces,
+                                               device_info_lists)
+            for device_info in device_infos
+        ]
+        self._device_infos = [device_info for _, device_info in found]
 
-        # self._cameras = [Camera(di) for di in self._device_infos]
-        # logger.info("Updated the list of cameras.")
+        previous = self._cameras_by_id
+        self._cameras_by_id = {}
 
         self._cameras = []  # Reset the list of cameras.
         self._repr_items = []  # Reset the representable camera info.
-
-        for device_info in self._device_infos:
-            self._cameras.append(Camera(device_info))
+        # Reset the lookup tables from device info to cameras.
+        self._index = {"serial_number": {}, "model": {},
+                       "user_defined_name": {}}
+
+        for key, device_info in found:
+            camera = previous.pop(key, None)
+            if camera is None:
+                camera = Camera(device_info, gentl=self._gentl)
+                logger.debug(
+                    f"Found a new camera `{device_info.serial_number}`."
+                )
+            self._cameras.append(camera)
+            self._cameras_by_id[key] = camera
+
+            # User-defined name is optional in the GenTL standard.
+            try:
+                user_defined_name = device_info.user_defined_name
+            except Exception:
+                user_defined_name = None
+            keys = {
+                "serial_number": device_info.serial_number,
+                "model": device_info.model,
+                "user_defined_name": user_defined_name,
+            }
+            for key, value in keys.items():
+                if value:
+                    self._index[key].setdefault(value, []).append(camera)
             self._repr_items.append([
                 device_info.vendor,
                 device_info.model,
@@ -296,64 +476,168 @@ class CameraList(metaclass=Singleton):
                 device_info.tl_type
             ])
 
+        for camera in previous.values():
+            logger.debug(
+                f"Camera `{camera._device_info.serial_number}` is no longer "
+                f"available."
+            )
+            # Close the device and data streams it may have left open.
+            try:
+                camera.finalize()
+            except Exception as e:
+                logger.warning(
+                    f"Finalizing camera `{camera._device_info.serial_number}` "
+                    f"failed: {e}"
+                )
+
+    def initialize_all(self, configs=None, max_workers=None):
+        """Initialize and configure all the cameras concurrently.
+
+        Each camera is opened, initialized and configured in its own worker
+        thread, so the total time is set by the slowest camera. The GenTL
+        devices are created in the calling thread beforehand, and afterwards
+        each camera is only used by a single worker.
+
+        Parameters
+        ----------
+        configs : dict, optional
+            Dictionary of configurations by serial number or by `Camera`. A
+            configuration is either a path to a TOML configuration file or a
+            dictionary of feature names and values. Cameras without a
+            configuration are only initialized.
+        max_workers : int, optional
+            Maximum number of worker threads. By default one thread is used
+            per camera.
+
+        Returns
+        -------
+        dict
+            Dictionary of cameras and reports. Each report is a dictionary
+            with keys `camera`, `initialize`, `configure` and `total`
+            (durations in seconds, `None` if the step wasn't run), `unset`
+            (settings that could not be set) and `error` (exception raised,
+            or `None`).
+
+        Raises
+        ------
+        ValueError
+            If a serial number in `configs` is shared by several cameras.
+        """
+        configs = configs or {}
+
+        # Serial numbers may be empty or repeated, so a configuration given
+        # by serial number must identify a single camera.
+        serial_numbers = collections.Counter(
+            camera._device_info.serial_number for camera in self._cameras
+        )
+        for key in configs:
+            if isinstance(key, str) and serial_numbers[key] > 1:
+                raise ValueError(
+                    f"Serial number {key!r} is shared by "
+                    f"{serial_numbers[key]} cameras. Give their "
+                    f"configurations by `Camera` instead."
+                )
+
+        # Device creation goes through the shared interface handles, so it's
+        # done here one camera at a time.
+        for camera in self._cameras:
+            camera._device
+
+        def run(camera, config):
+            report = {"camera": camera, "initialize": None, "configure": None,
+                      "total": None, "unset": {}, "error": None}
+            start = time.perf_counter()
+            try:
+                camera.initialize()
+                report["initialize"] = time.perf_counter() - start
+                if config is not None:
+                    configured = time.perf_counter()
+                    if isinstance(config, dict):
+                        # `load_config_from_dict` consumes the dictionary.
+                        unset, _ = camera.load_config_from_dict(dict(config))
+                    else:
+                        unset, _ = camera.load_config_from_file(config)
+                    report["unset"] = unset
+                    report["configure"] = time.perf_counter() - configured
+            except Exception as e:
+                report["error"] = e
+            report["total"] = time.perf_counter() - start
+            return report
+
+        reports = {}
+        if not self._cameras:
+            return reports
+
+        with ThreadPoolExecutor(
+                max_workers=max_workers or len(self._cameras)) as executor:
+            futures = {}
+            for camera in self._cameras:
+                config = configs.get(camera)
+                if config is None:
+                    config = configs.get(camera._device_info.serial_number)
+                futures[camera] = executor.submit(run, camera, config)
+            for camera, future in futures.items():
+                reports[camera] = report = future.result()
+                serial_number = camera._device_info.serial_number
+                if report["error"] is not None:
+                    logger.warning(
+                        f"Initializing camera `{serial_number}` failed: "
+                        f"{report['error']}"
+                    )
+                else:
+                    logger.debug(
+                        f"Initialized camera `{serial_number}` in "
+                        f"{report['total']:.3f} s."
+                    )
+
+        return reports
+
     @property
     def cti_file(self):
         """CTI file used to detect cameras."""
         return self._cti_file
 
 
-class Camera:
+# Longest single wait for the event data in milliseconds, when waiting
+# until a deadline.
+_EVENT_WAIT = 100
 
-    class _Port(gapi.AbstractPort):
-        """A concrete implementation of port."""
+# Buffer handling modes of `Camera.start_acquisition`, named after the
+# `StreamBufferHandlingMode` values of the GenICam SFNC.
+_BUFFER_HANDLING_MODES = ("OldestFirst", "NewestOnly", "OldestFirstOverwrite")
 
-        def __init__(self, port):
-            """Initialize the port.
 
-            Parameters
-            ----------
-            port
-                Remote port of an device info object.
-            """
-            gapi.AbstractPort.__init__(self)
-            self._port = port
+def _is_complete(buffer):
+    """Check if a buffer was filled completely.
 
-        def read(self, address, size):
-            """Read number of bytes from the port.
+    Producers that don't report it are trusted to deliver complete buffers.
+    """
+    try:
+        return buffer.is_complete()
+    except Exception:
+        return True
 
-            Parameters
-            ----------
-            address : int
-                Memory address from which we start reading the bytes.
-            size : int
-                Number of bytes to read.
-            """
-            buffer = self._port.read(address, size)
-            return buffer[1]
 
-        def write(self, address, value):
-            """Write number of bytes to the port.
+def _frame_id(buffer):
+    """Get the frame ID of a buffer, or `None` if it's not reported."""
+    try:
+        return buffer.frame_id
+    except Exception:
+        return None
 
-            Parameters
-            ----------
-            address : int
-                Memory address from which we start writing the bytes.
-            size : int
-                Number of bytes to write.
-            """
-            self._port.write(address, value)
 
-        def get_access_mode(self):
-            """Get the access mode of a node."""
-            return gapi.EAccessMode.RW
+class Camera:
 
-    def __init__(self, device_info):
+    def __init__(self, device_info, gentl=None):
         """Initialize Camera object.
 
         Parameters
         ----------
         device_info : genicam2.genapi.IDeviceInfo
             GenICam DeviceInfo object.
+        gentl : module, optional
+            GenTL binding that `device_info` comes from, `genicam2.gentl` by
+            default.
 
         Notes
         -----
@@ -361,10 +645,16 @@ class Camera:
         achieved with the `initialize` method). The benefit of this is that we
         can have many Camera objects (for example in the `CameraList`) without
         reserving any resources for the camera internals, and we can reserve
-        the resources only when needed.
+        the resources only when needed. Even the GenTL device is created only
+        when it's first used.
         """
         self._device_info = device_info
-        self._device = device_info.create_device()
+        self._device_handle = None
+        if gentl is None:
+            import genicam2.gentl as gtl
+            self._gtl = gtl
+        else:
+            self._gtl = gentl
 
         # Needs to be defined in order to get `finalize` method working.
         self._node_map = None
@@ -373,8 +663,40 @@ class Camera:
         # working.
         self._is_acquiring = False
 
-        # Make sure that `finalize` is called when one exits the program.
-        atexit.register(self.finalize)
+        # Parameter sequence cycled frame by frame, see `set_sequence`.
+        self._sequencer = None
+
+        # Timings and counters of the acquisition, see `stats`.
+        self._stats = AcquisitionStats()
+
+        # Frame ID continuity of the latest acquisition, see `loss_report`.
+        self._frame_tracker = FrameTracker()
+
+        # Live previews fed with the decoded images, see `preview`.
+        self._previews = []
+
+        # Options of the per-frame statistics, see `enable_statistics`.
+        self._statistics = None
+
+        # Software exposure controller, see `auto_exposure`.
+        self._auto_exposure = None
+
+        # Metadata log of the latest acquisition, see `frame_log`.
+        self._frame_log = None
+
+        # Mapping of buffer timestamps to host time, see `enable_clock_sync`.
+        self._clock_sync = None
+
+        # Values of the metadata features as (generation, value), and the
+        # generations counted up on every change, see `start_acquisition`.
+        self._meta_cache = None
+        self._meta_generations = {}
+        self._meta_subscriptions = []
+
+        # Background reader of features, see `poll_features`. It reads under
+        # the same lock as the metadata of the frames.
+        self._poller = None
+        self._feature_lock = threading.Lock()
 
     def __del__(self):
         """Does clean up when `Camera` object is deleted."""
@@ -483,6 +805,189 @@ class Camera:
         """
         return self._features.items()
 
+    def _get_features_by_name(self, names):
+        """Look up features, raising one error for all the missing ones."""
+        missing = [name for name in names if name not in self._features]
+        if missing:
+            raise KeyError(
+                f"The camera has no features {', '.join(missing)}."
+            )
+        return {name: self._features[name] for name in names}
+
+    @check_initialization
+    def get_values(self, names):
+        """Read the values of several features.
+
+        Parameters
+        ----------
+        names : iterable of str
+            Names of the features.
+
+        Returns
+        -------
+        dict
+            Values of the features by name.
+
+        Raises
+        ------
+        KeyError
+            If the camera has no feature of a given name.
+        AccessModeError
+            If a feature is not readable.
+
+        Examples
+        --------
+        >>> camera.get_values(["Width", "Height", "PixelFormat"])
+        {'Width': 1280, 'Height': 1024, 'PixelFormat': 'Mono8'}
+        """
+        return {
+            name: feature.value
+            for name, feature in self._get_features_by_name(names).items()
+        }
+
+    @check_initialization
+    def set_values(self, values, atomic=True):
+        """Write several features at once.
+
+        All the values are converted and checked against the access modes
+        and bounds of the features before anything is written. The features
+        are written in the order selectors, enumerations and booleans (e.g.
+        `GainAuto` or `PixelFormat`), and the rest, keeping the given order
+        within each group. A feature that is not writable, or whose value
+        is out of its bounds or rejected by the camera, is tried again after
+        the others, as writing them may change that. The features are
+        written under the lock that `poll_features` reads them under, so
+        the poller never sees a partly written set of values.
+
+        Parameters
+        ----------
+        values : dict
+            Values by feature name.
+        atomic : bool, optional
+            Whether to restore the written features to their previous values
+            if some feature can't be written.
+
+        Raises
+        ------
+        KeyError
+            If the camera has no feature of a given name. Nothing is written.
+        TypeError
+            If a feature has no value, e.g. a command. Nothing is written.
+        AccessModeError
+            If some features were not writable even after writing the
+            others.
+        ValueError
+            If some values were invalid even after writing the others.
+
+        Examples
+        --------
+        >>> camera.set_values({"Gain": 6.0, "GainAuto": "Off",
+        ...                    "ExposureTime": 2000.0})
+        """
+        feature_types = camazing.feature_types
+        features = self._get_features_by_name(values)
+        groups = {}
+        for name, feature in features.items():
+            if not isinstance(feature, feature_types.Valuable):
+                raise TypeError(f"Feature '{name}' has no value to set.")
+            if feature.is_selector:
+                groups[name] = 0
+            elif isinstance(feature, (feature_types.Enumeration,
+                                      feature_types.Boolean)):
+                groups[name] = 1
+            else:
+                groups[name] = 2
+
+        def validate(name):
+            feature = features[name]
+            mode = feature.access_mode
+            if "w" not in mode:
+                raise feature_types.AccessModeError(
+                    f"Cannot set value of '{name}', because the feature is "
+                    f"not writable."
+                )
+            return feature._convert(values[name]), mode
+
+        # Previous values of the written features, read right before each
+        # write, so that restoring them in reverse order undoes selectors.
+        written = []
+
+        def write(name, value, mode):
+            feature = features[name]
+            previous = None
+            if atomic and "r" in mode:
+                previous = feature._read()
+            feature._write(value)
+            written.append((name, previous))
+
+        # The feature poller and the clock synchronization read features
+        # under the lock, so they never see a partly applied batch.
+        with self._feature_lock:
+            # Validate everything first. Values that fail are retried after the
+            # others have been written.
+            validated = {}
+            errors = {}
+            for name in sorted(values, key=groups.__getitem__):
+                try:
+                    validated[name] = validate(name)
+                except (feature_types.AccessModeError, ValueError,
+                        TypeError) as e:
+                    errors[name] = e
+            deferred = list(errors)
+
+            for name, (value, mode) in validated.items():
+                try:
+                    write(name, value, mode)
+                except Exception as e:
+                    errors[name] = e
+                    deferred.append(name)
+
+            while deferred:
+                remaining = []
+                for name in sorted(deferred, key=groups.__getitem__):
+                    try:
+                        write(name, *validate(name))
+                    except Exception as e:
+                        errors[name] = e
+                        remaining.append(name)
+                    else:
+                        errors.pop(name)
+                if len(remaining) == len(deferred):
+                    break
+                deferred = remaining
+
+            if not deferred:
+                return
+
+            reasons = {name: errors[name] for name in deferred}
+            if atomic:
+                for name, previous in reversed(written):
+                    if previous is None:
+                        logger.warning(
+                            f"Cannot restore '{name}', because its previous "
+                            f"value was not readable."
+                        )
+                        continue
+                    try:
+                        features[name]._write(previous)
+                    except Exception as e:
+                        logger.warning(f"Restoring '{name}' failed: {e}")
+        message = "Could not set features: " + "; ".join(
+            f"{name}: {e}" for name, e in reasons.items()
+        )
+        if all(isinstance(e, camazing.feature_types.AccessModeError)
+               for e in reasons.values()):
+            raise camazing.feature_types.AccessModeError(message)
+        raise ValueError(message) from next(iter(reasons.values()))
+
+    @property
+    def _device(self):
+        """GenTL device, which is created on first use."""
+        if self._device_handle is None:
+            self._device_handle = self._device_info.create_device()
+            _cameras.add(self)
+        return self._device_handle
+
     def is_initialized(self):
         """Check if camera is initialized.
 
@@ -491,7 +996,8 @@ class Camera:
         bool
             `True` if camera is initialized. Otherwise `False`.
         """
-        return self._device.is_open()
+        return (self._device_handle is not None and
+                self._device_handle.is_open())
 
     def is_acquiring(self):
         """Check if camera is acquiring images.
@@ -524,7 +1030,7 @@ class Camera:
             # flag is described in section 6.4.3.1 of the GenICam GenTL
             # Standard (version 1.5).
             self._device.open(
-                gtl.DEVICE_ACCESS_FLAGS_LIST.DEVICE_ACCESS_EXCLUSIVE
+                self._gtl.DEVICE_ACCESS_FLAGS_LIST.DEVICE_ACCESS_EXCLUSIVE
             )
             port = self._device.remote_port
             # Here we parse the URL, which tells the location of the XML
@@ -537,8 +1043,10 @@ class Camera:
                 if len(splitted_url) == 2:
                     others, schema_version = splitted_url
                 else:
-                    others = splitted_url
-                location, others = others.split(":")
+                    others = splitted_url[0]
+                # The scheme is case-insensitive (e.g. `Local:`).
+                location, others = others.split(":", 1)
+                location = location.lower()
                 if location == "local":
                     _, address, size = others.split(";")
                     xml_files["local"] = (int(address, 16), int(size, 16))
@@ -578,6 +1086,12 @@ class Camera:
             # Zip-compressed file (using DEFLATE and STORE compression methods).
             # Here we check if the file is a zip file, and extract the contents
             # if it is.
+            # Some cameras are incompatible with zipfile package when Python
+            # version >= 3.7
+            if sys.version_info >= (3, 7):
+                import zipfile36 as zipfile
+            else:
+                import zipfile
             if zipfile.is_zipfile(file_content):
                 with zipfile.ZipFile(file_content, "r") as zip_file:
                     # Iterate over the files inside the zip.
@@ -586,7 +1100,9 @@ class Camera:
                         if os.path.splitext(file.filename)[1].lower() == ".xml":
                             content = zip_file.read(file).decode("utf8")
 
-            _port = self._Port(port)
+            import genicam2.genapi as gapi
+
+            _port = _port_class()(port)
 
             self._node_map = gapi.NodeMap()  # Crate a node map
             # Load the XML description file contents to the node map.
@@ -620,189 +1136,737 @@ class Camera:
         if self.is_acquiring():
             self.stop_acquisition()
 
+        if self._poller is not None:
+            self._poller.close()
+        if self._clock_sync is not None:
+            self._clock_sync.close()
+
         # If camera is initialized, free the resources.
-        if self.is_initialized:
+        if self.is_initialized():
+            # GenApi callbacks can't be deregistered, so the subscribers are
+            # dropped before the node map stops calling them.
+            for feature in self._features.values():
+                feature._subscribers.clear()
             if self._node_map is not None:
                 self._node_map.disconnect()
                 self._node_map = None
             self._device.close()
 
     @check_initialization
-    def start_acquisition(self, n_buffers=None, payload_size=None, meta=None):
+    def start_acquisition(self, n_buffers=None, payload_size=None, meta=None,
+                          incomplete="drop", latency=0.1, memory_budget=None,
+                          grow_buffers=False, buffer_handling="OldestFirst",
+                          trigger_depth=0, frame_log=False, cache_meta=False):
         """Start image acquisition.
 
         Parameters
         ----------
-        n_buffers : int
-            Number of buffers.
+        n_buffers : int or 'auto'
+            Number of buffers of each data stream. With 'auto', the number is
+            estimated from the frame rate, `latency` and `memory_budget`. By
+            default, the minimum number required by the producer is used.
         payload_size : int
-            Payload size.
+            Payload size. By default, the payload size of each data stream
+            is used.
         meta : list of str
             List of GenICam metadata fields to include in frames.
+        incomplete : {'drop', 'flag'}
+            How to handle buffers that the producer reports as incomplete.
+            With 'drop' they are discarded without decoding, and with 'flag'
+            they are delivered with the `complete` coordinate set to `False`.
+        latency : float, optional
+            Longest expected time in seconds between `get_frame` calls, used
+            with ``n_buffers='auto'``.
+        memory_budget : int, optional
+            Maximum total size in bytes of the buffers of the camera, used
+            with ``n_buffers='auto'`` and `grow_buffers`.
+        grow_buffers : bool, optional
+            Whether to announce more buffers when the producer reports
+            underruns during acquisition.
+        buffer_handling : {'OldestFirst', 'NewestOnly', 'OldestFirstOverwrite'}
+            Which filled buffer `get_frame` returns. With 'OldestFirst',
+            frames are returned in order, and frames are lost when the
+            producer runs out of buffers. With 'NewestOnly', only the newest
+            filled buffer is returned and older ones are discarded. With
+            'OldestFirstOverwrite', frames are returned in order, but the
+            oldest ones are discarded when otherwise no buffer would be left
+            for the producer. Discarded buffers are not decoded, and they are
+            counted in the `discarded_buffers` statistic.
+        trigger_depth : int, optional
+            With software triggering, the number of frames triggered ahead
+            of the frame being processed. Each trigger is sent as soon as a
+            buffer arrives, before it's decoded, so that the exposure and
+            transfer of the next frames overlap with processing. With 0,
+            a frame is triggered only when `get_frame` is called.
+        frame_log : bool, optional
+            Whether to log the frame ID, timestamps, flags and numeric
+            metadata features of every frame from `get_frame` in a compact
+            `camazing.framelog.FrameLog`. See `frame_log`.
+        cache_meta : bool, optional
+            Whether to read the metadata features only after GenApi reports
+            that they may have changed (see `Feature.subscribe`), instead of
+            for every frame. This saves a register read per feature and frame
+            for features that GenApi doesn't cache, but changes the device
+            makes by itself, e.g. with `ExposureAuto`, are missed.
+
+        Raises
+        ------
+        ValueError
+            If `incomplete`, `n_buffers` or `buffer_handling` is invalid, if
+            `trigger_depth` is negative, or if `memory_budget` is too small
+            for the minimum number of buffers.
+        AcquisitionException
+            If the device has no data streams, or if a parameter sequence
+            can't be run, e.g. when one run in software is combined with a
+            `trigger_depth` larger than 1.
         """
+        if incomplete not in ("drop", "flag"):
+            raise ValueError(
+                f"Expected `incomplete` to be 'drop' or 'flag', but got "
+                f"{incomplete!r}."
+            )
+        if buffer_handling not in _BUFFER_HANDLING_MODES:
+            raise ValueError(
+                f"Expected `buffer_handling` to be one of "
+                f"{', '.join(_BUFFER_HANDLING_MODES)}, but got "
+                f"{buffer_handling!r}."
+            )
+        if trigger_depth < 0:
+            raise ValueError(
+                f"Expected a non-negative `trigger_depth`, but got "
+                f"{trigger_depth}."
+            )
+        if isinstance(n_buffers, str) and n_buffers != "auto":
+            raise ValueError(
+                f"Expected `n_buffers` to be an integer or 'auto', but got "
+                f"{n_buffers!r}."
+            )
+
         if not self.is_acquiring():
 
+            self._incomplete = incomplete
+            self._buffer_handling = buffer_handling
+            self._trigger_depth = trigger_depth
+            self._frame_tracker.reset()
+
+            stream_ids = self._device.data_stream_ids
+            if not stream_ids:
+                raise AcquisitionException(
+                    "The device has no data streams to acquire images from."
+                )
+
+            # The budget is shared evenly by the data streams.
+            if memory_budget is not None:
+                memory_budget //= len(stream_ids)
+            self._buffer_growth = {
+                "enabled": grow_buffers,
+                "memory_budget": memory_budget,
+                "payload_sizes": {},
+                "underruns": {},
+                "checked": time.perf_counter(),
+            }
+
+            if self._sequencer is not None:
+                self._arm_sequencer(trigger_depth)
+
+            # Frames are wrapped with xarray, which takes longer to import
+            # than many frame intervals, so it's imported before the device
+            # starts instead of by the first `get_frame`.
+            import xarray  # noqa: F401
+
             # Initilize containers for buffers, events and data streams.
             self._buffers = {}
             self._events = []
             self._data_streams = []
 
             # Iterate over data stream IDs.
-            for idx, stream_id in enumerate(self._device.data_stream_ids):
-
-                # Create a data stream and open it.
-                data_stream = self._device.create_data_stream()
-                data_stream.open(stream_id)
-
-                # An event object must be registered with `EVENT_NEW_BUFFER` in
-                # order to be notified on newly filled buffers. See section
-                # 5.2.4 of GenICam GenTL v1.5.
-                event_token = data_stream.register_event(
-                    gtl.EVENT_TYPE_LIST.EVENT_NEW_BUFFER
-                )
-
-                # Add the event to our container of events.
-                self._events.append(gtl.EventManagerNewBuffer(event_token))
+            try:
+                for stream_id in stream_ids:
+                    self._open_data_stream(
+                        stream_id, n_buffers, payload_size, latency,
+                        memory_budget
+                    )
 
-                # If payload size is not given as a parameter, see if it is
-                # defined in the data stream or in the `PayloadSize` feature.
-                if payload_size is None:
-                    if data_stream.defines_payload_size():
-                        payload_size = data_stream.payload_size
-                    else:
-                        payload_size = self["PayloadSize"].value
+                # The device starts acquiring on all of its data streams at
+                # once.
+                self["AcquisitionStart"].execute()
+            except Exception:
+                self._close_data_streams()
+                if self._sequencer is not None:
+                    self._sequencer.disable_device(self)
+                raise
+            self._is_acquiring = True
 
-                # Create a container for all the buffer tokens.
-                buffer_tokens = []
+            self._prepare_frames()
 
-                # If the number of buffers is not given as a parameter, see
-                # if the minimum number of buffers to be announced is defined
-                # in the data stream.
-                if n_buffers is None:
-                    n_buffers = data_stream.buffer_announce_min
+            # Not always implemented, even though this is defined as
+            # mandatory by the GenICam standard. When acquisition is
+            # ongoing, this prevents the adjusting of features critical
+            # to the acquisition.
+            if "TLParamsLocked" in self:
+                self["TLParamsLocked"].value = 1
 
-                for idx in range(n_buffers):
-                    buffer = bytes(payload_size)
-                    buffer_tokens.append(gtl.BufferToken(buffer, idx))
+            if cache_meta:
+                self._meta_cache = {}
+                self._meta_generations = generations = {}
 
-                # Create a container for the buffers.
-                self._buffers[data_stream] = []
+                def invalidate(name):
+                    generations[name] = generations.get(name, 0) + 1
 
-                # Announce buffers.
-                for buffer_token in buffer_tokens:
-                    self._buffers[data_stream].append(
-                        data_stream.announce_buffer(buffer_token)
+                for name in self._meta:
+                    feature = self._features[name]
+                    handle = feature.subscribe(
+                        lambda feature, name=name: invalidate(name)
                     )
-
-                # Start the acquisition engine, using the default behaviour.
-                data_stream.start_acquisition(
-                    gtl.ACQ_START_FLAGS_LIST.ACQ_START_FLAGS_DEFAULT
+                    self._meta_subscriptions.append((feature, handle))
+
+            self._frame_log = None
+            if frame_log:
+                from camazing.framelog import FrameLog
+
+                numeric = (camazing.feature_types.Float,
+                           camazing.feature_types.Integer)
+                self._frame_log = FrameLog(features=[
+                    name for name in self._meta
+                    if isinstance(self._features[name], numeric)
+                ])
+
+    def _open_data_stream(self, stream_id, n_buffers, payload_size, latency,
+                          memory_budget):
+        """Open a data stream, announce its buffers and start it.
+
+        The payload size and the number of buffers are determined for each
+        data stream separately, unless they are given. See
+        `start_acquisition` for the parameters.
+        """
+        # Create a data stream and open it.
+        data_stream = self._device.create_data_stream()
+        data_stream.open(stream_id)
+
+        # An event object must be registered with `EVENT_NEW_BUFFER` in
+        # order to be notified on newly filled buffers. See section
+        # 5.2.4 of GenICam GenTL v1.5.
+        event_token = data_stream.register_event(
+            self._gtl.EVENT_TYPE_LIST.EVENT_NEW_BUFFER
+        )
+        event = self._gtl.EventManagerNewBuffer(event_token)
+
+        # Create a container for the buffers.
+        self._buffers[data_stream] = []
+        try:
+            # If payload size is not given as a parameter, see if it is
+            # defined in the data stream or in the `PayloadSize` feature.
+            if payload_size is None:
+                if data_stream.defines_payload_size():
+                    payload_size = data_stream.payload_size
+                else:
+                    payload_size = self["PayloadSize"].value
+
+            # If the number of buffers is not given as a parameter, see
+            # if the minimum number of buffers to be announced is defined
+            # in the data stream.
+            if n_buffers is None:
+                n_buffers = data_stream.buffer_announce_min
+            elif n_buffers == "auto":
+                n_buffers, reason = estimate_buffer_count(
+                    self._estimate_frame_rate(), payload_size,
+                    latency=latency, memory_budget=memory_budget,
+                    minimum=data_stream.buffer_announce_min
+                )
+                logger.info(
+                    f"Using {n_buffers} buffers of {payload_size} bytes "
+                    f"for data stream {stream_id}: {reason}."
                 )
 
-                # Add the data stream to the list of available data streams.
-                self._data_streams.append(data_stream)
-
-                self["AcquisitionStart"].execute()
-                self._is_acquiring = True
+            self._announce_buffers(data_stream, n_buffers, payload_size)
 
-                # The pixel format doesn't change during image acquisition, so
-                # we can save pixel format to attribute, and access it faster
-                # later.
-                self._pixel_format = self["PixelFormat"].value
+            # Start the acquisition engine, using the default behaviour.
+            data_stream.start_acquisition(
+                self._gtl.ACQ_START_FLAGS_LIST.ACQ_START_FLAGS_DEFAULT
+            )
+        except Exception:
+            event.unregister_event()
+            for buffer in self._buffers.pop(data_stream):
+                data_stream.revoke_buffer(buffer)
+            data_stream.close()
+            raise
+
+        self._buffer_growth["payload_sizes"][data_stream] = payload_size
+
+        # Add the event and the data stream to the lists of available ones.
+        self._events.append(event)
+        self._data_streams.append(data_stream)
+
+    def _close_data_streams(self):
+        """Stop and close the data streams and revoke their buffers."""
+        # Flush the event queues and unregister the events.
+        for event in self._events:
+            event.flush_event_queue()
+            event.unregister_event()
 
-                # Determine the decoder and range for the pixel format
-                self._buffer_decoder = get_decoder(self._pixel_format)
-                self._image_range = get_valid_range(self._pixel_format)
+        # Clear the list of events.
+        self._events.clear()
 
-                # Keep some meta by default, if available
-                self._meta = []
-                for feature in ['Gain', 'ExposureTime', 'PixelFormat', 'PixelColorFilter']:
-                    if feature in self._features:
-                        self._meta.append(feature)
+        # Iterate over available data streams.
+        for data_stream in self._data_streams:
 
-                self._frame_generator = self._get_frame_generator()
+            # Stop the acquisition engine immediately. The Producer can
+            # return a partially filled buffer through the regular
+            # mechanism.
+            data_stream.stop_acquisition(
+                self._gtl.ACQ_STOP_FLAGS_LIST.ACQ_STOP_FLAGS_KILL
+            )
 
-                # Not always implemented, even though this is defined as
-                # mandatory by the GenICam standard. When acquisition is
-                # ongoing, this prevents the adjusting of features critical
-                # to the acquisition.
-                if "TLParamsLocked" in self:
-                    self["TLParamsLocked"].value = 1
+            # Discard all the buffers in the input pool and the buffers in
+            # the output queue.
+            data_stream.flush_buffer_queue(
+                self._gtl.ACQ_QUEUE_TYPE_LIST.ACQ_QUEUE_ALL_DISCARD
+            )
 
-    @check_initialization
-    def stop_acquisition(self):
-        """Stop image acquisition.
+            # Remove announced buffers from the acquisition engine.
+            for buffer in self._buffers[data_stream]:
+                data_stream.revoke_buffer(buffer)
 
-        Notes
-        -----
-        If acquisition has not been started, this function won't do anything.
-        """
-        # If acquisition is on, stop the acquisition. Otherwise do nothing.
-        if self.is_acquiring():
-            self["AcquisitionStop"].execute()
+            data_stream.close()  # Finally close the data stream.
 
-            # Not always implemented, even though this is defined as
-            # mandatory by the GenICam standard. When acquisition is
-            # ongoing, this prevents the adjusting of features critical
-            # to the acquisition.
-            if "TLParamsLocked" in self:
-                self["TLParamsLocked"].value = 0
+        # Clear the lists containing the buffers and data streams.
+        self._buffers.clear()
+        self._data_streams.clear()
 
-            # Flush the event queues and unregister the events.
-            for event in self._events:
-                event.flush_event_queue()
-                event.unregister_event()
+    def _prepare_frames(self):
+        """Set up decoding and metadata for the current camera settings."""
+        # The pixel format doesn't change during image acquisition, so
+        # we can save pixel format to attribute, and access it faster
+        # later.
+        self._pixel_format = self["PixelFormat"].value
 
-            # Clear the list of events.
-            self._events.clear()
+        # Determine the decoder and range for the pixel format
+        from camazing.pixelformats import get_decoder, get_valid_range
 
-            # Iterate over available data streams.
-            for data_stream in self._data_streams:
+        self._buffer_decoder = get_decoder(self._pixel_format)
+        self._image_range = get_valid_range(self._pixel_format)
 
-                # Stop the acquisition engine immediately. The Producer can
-                # return a partially filled buffer through the regular
-                # mechanism.
-                data_stream.stop_acquisition(
-                    gtl.ACQ_STOP_FLAGS_LIST.ACQ_STOP_FLAGS_KILL
-                )
+        # Decoding of each data stream. The other data streams are set up
+        # when their first buffer arrives.
+        self._decoding = {self._data_streams[0]: (
+            self._pixel_format, self._buffer_decoder, self._image_range
+        )}
 
-                # Discard all the buffers in the input pool and the buffers in
-                # the output queue.
-                data_stream.flush_buffer_queue(
-                    gtl.ACQ_QUEUE_TYPE_LIST.ACQ_QUEUE_ALL_DISCARD
-                )
+        # Keep some meta by default, if available
+        self._meta = []
+        for feature in ['Gain', 'ExposureTime', 'PixelFormat', 'PixelColorFilter']:
+            if feature in self._features:
+                self._meta.append(feature)
 
-                # Remove announced buffers from the acquisition engine.
-                for buffer in self._buffers[data_stream]:
-                    data_stream.revoke_buffer(buffer)
+        self._frame_generator = self._get_frame_generator()
 
-                data_stream.close()  # Finally close the data stream.
+    @check_initialization
+    def reconfigure(self, **features):
+        """Change features that are locked during acquisition.
 
-            # Clear the lists containing the buffers and data streams.
-            self._buffers.clear()
-            self._data_streams.clear()
+        Features such as `Width`, `Height`, `OffsetX` and `PixelFormat` can
+        only be changed while the camera is not acquiring. Instead of
+        stopping and starting the acquisition, this pauses it, writes the
+        features and resumes it with the same data streams. The announced
+        buffers are reused if the new payload fits in them, so that only the
+        decoder and the metadata are set up again.
 
-            self._is_acquiring = False
-            self._buffer_decoder = None
-            self._image_range = None
-            self._meta = None
+        Parameters
+        ----------
+        **features
+            Feature names and values, written in the given order.
 
-    def _get_frame(self, timeout=1):
-        """Helper function"""
+        Returns
+        -------
+        bool
+            `True` if the buffers were reused, `False` if they had to be
+            announced again. If acquisition has not been started, the
+            features are just written and `True` is returned.
 
-        # Queue buffers
+        Examples
+        --------
+        >>> camera.reconfigure(OffsetX=0, Width=256, OffsetY=0, Height=256)
+        """
+        if not self.is_acquiring():
+            for name, value in features.items():
+                self[name].value = value
+            return True
+
+        self["AcquisitionStop"].execute()
+        if "TLParamsLocked" in self:
+            self["TLParamsLocked"].value = 0
+
+        # Filled buffers of the old format are discarded together with
+        # their events.
+        for event in self._events:
+            event.flush_event_queue()
         for data_stream in self._data_streams:
-            for buffer in self._buffers[data_stream]:
-                data_stream.queue_buffer(buffer)
+            data_stream.stop_acquisition(
+                self._gtl.ACQ_STOP_FLAGS_LIST.ACQ_STOP_FLAGS_KILL
+            )
+            data_stream.flush_buffer_queue(
+                self._gtl.ACQ_QUEUE_TYPE_LIST.ACQ_QUEUE_ALL_DISCARD
+            )
+
+        try:
+            for name, value in features.items():
+                self[name].value = value
+        finally:
+            reused = True
+            payload_sizes = self._buffer_growth["payload_sizes"]
+            for data_stream in self._data_streams:
+                if data_stream.defines_payload_size():
+                    payload_size = data_stream.payload_size
+                else:
+                    payload_size = self["PayloadSize"].value
+
+                buffers = self._buffers[data_stream]
+                if payload_size <= payload_sizes[data_stream]:
+                    for buffer in buffers:
+                        data_stream.queue_buffer(buffer)
+                else:
+                    reused = False
+                    n_buffers = len(buffers)
+                    for buffer in buffers:
+                        data_stream.revoke_buffer(buffer)
+                    buffers.clear()
+                    self._announce_buffers(
+                        data_stream, n_buffers, payload_size
+                    )
+                    payload_sizes[data_stream] = payload_size
+
+                data_stream.start_acquisition(
+                    self._gtl.ACQ_START_FLAGS_LIST.ACQ_START_FLAGS_DEFAULT
+                )
+
+            if self._sequencer is not None:
+                self._sequencer.reset()
+            # The producer may number the frames from the start again.
+            self._frame_tracker.restart()
+            self["AcquisitionStart"].execute()
+            self._prepare_frames()
+            if "TLParamsLocked" in self:
+                self["TLParamsLocked"].value = 1
+
+        logger.debug(
+            f"Reconfigured {', '.join(features)} "
+            f"{'reusing' if reused else 'reallocating'} the buffers."
+        )
+        return reused
 
+    @check_initialization
+    def stop_acquisition(self):
+        """Stop image acquisition.
+
+        Notes
+        -----
+        If acquisition has not been started, this function won't do anything.
+        """
+        # If acquisition is on, stop the acquisition. Otherwise do nothing.
+        if self.is_acquiring():
+            self["AcquisitionStop"].execute()
+
+            # Not always implemented, even though this is defined as
+            # mandatory by the GenICam standard. When acquisition is
+            # ongoing, this prevents the adjusting of features critical
+            # to the acquisition.
+            if "TLParamsLocked" in self:
+                self["TLParamsLocked"].value = 0
+
+            if self._sequencer is not None:
+                self._sequencer.disable_device(self)
+                self._sequencer.reset()
+
+            # Underrun counts live in the data streams, which are closed next.
+            self._stats.increment("buffer_underruns", self._count_underruns())
+
+            self._close_data_streams()
+
+            self._is_acquiring = False
+            self._buffer_decoder = None
+            self._decoding = {}
+            self._image_range = None
+            self._meta = None
+
+            for feature, handle in self._meta_subscriptions:
+                feature.unsubscribe(handle)
+            self._meta_subscriptions = []
+            self._meta_cache = None
+
+    def _announce_buffers(self, data_stream, n_buffers, payload_size):
+        """Announce new buffers to a data stream and queue them.
+
+        Each buffer is queued again after its contents have been decoded.
+        """
+        buffers = self._buffers[data_stream]
+        for idx in range(len(buffers), len(buffers) + n_buffers):
+            buffer_token = self._gtl.BufferToken(bytes(payload_size), idx)
+            buffer = data_stream.announce_buffer(buffer_token)
+            buffers.append(buffer)
+            data_stream.queue_buffer(buffer)
+
+    def _estimate_frame_rate(self):
+        """Get the expected frame rate from the camera features.
+
+        Returns
+        -------
+        float or None
+            Frame rate in frames per second, or `None` if the camera doesn't
+            tell it.
+        """
+        for name in ("AcquisitionResultingFrameRate", "ResultingFrameRate"):
+            if name in self:
+                return self[name].value
+        if "AcquisitionFrameRate" in self and (
+                "AcquisitionFrameRateEnable" not in self or
+                self["AcquisitionFrameRateEnable"].value):
+            return self["AcquisitionFrameRate"].value
+        # Without a frame rate limit, the exposure time (in microseconds by
+        # the SFNC) bounds the frame rate.
+        if "ExposureTime" in self and self["ExposureTime"].value > 0:
+            return 1e6 / self["ExposureTime"].value
+        return None
+
+    def _grow_buffers(self):
+        """Announce more buffers to data streams that have had underruns.
+
+        Called at most once per second during acquisition when enabled with
+        `start_acquisition(grow_buffers=True)`.
+        """
+        growth = self._buffer_growth
+        for data_stream, buffers in self._buffers.items():
+            try:
+                underruns = data_stream.num_underrun
+            except Exception:
+                continue
+            new_underruns = underruns - growth["underruns"].get(
+                data_stream, 0
+            )
+            growth["underruns"][data_stream] = underruns
+            if new_underruns <= 0:
+                continue
+
+            payload_size = growth["payload_sizes"][data_stream]
+            n_buffers = grow_buffer_count(
+                len(buffers), new_underruns, payload_size,
+                growth["memory_budget"]
+            )
+            if n_buffers > len(buffers):
+                logger.info(
+                    f"{new_underruns} frames lost for lack of buffers, "
+                    f"growing the buffer pool from {len(buffers)} to "
+                    f"{n_buffers} buffers."
+                )
+                self._announce_buffers(
+                    data_stream, n_buffers - len(buffers), payload_size
+                )
+            else:
+                logger.warning(
+                    f"{new_underruns} frames lost for lack of buffers, but "
+                    f"the memory budget doesn't allow more than "
+                    f"{len(buffers)} buffers."
+                )
+
+    def _wait_for_buffer(self, timeout, stream=0, on_discard=None,
+                         deadline=None):
+        """Wait for a filled buffer of a data stream.
+
+        Parameters
+        ----------
+        timeout : int
+            Timeout of updating the event data, in milliseconds. Without a
+            `deadline`, the event data is updated until a buffer arrives.
+        stream : int, optional
+            Index of the data stream.
+        on_discard : callable, optional
+            Function called without arguments for every buffer discarded to
+            keep only the newest frames (see `buffer_handling` in
+            `start_acquisition`).
+        deadline : float, optional
+            Value of `time.perf_counter` after which to stop waiting.
+
+        Returns
+        -------
+        buffer : genicam2.gentl.Buffer
+            The filled buffer.
+        data_stream : genicam2.gentl.DataStream
+            Data stream of the buffer, to which the buffer must be queued
+            again after use.
+
+        Raises
+        ------
+        TimeoutError
+            If no buffer arrived before `deadline`.
+        """
         buffer = None
+        event = self._events[stream]
+        data_stream = self._data_streams[stream]
+
+        # Block in updating the event data until a buffer arrives.
+        while buffer is None:
+            wait = timeout
+            if deadline is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"No buffer from data stream {stream} within the "
+                        f"timeout."
+                    )
+                wait = max(min(timeout, int(remaining * 1000)), 1)
+            try:
+                event.update_event_data(wait)
+            except self._gtl.TimeoutException:
+                continue
+            buffer = event.buffer
+
+        if self._buffer_handling == "NewestOnly":
+            stale = 0
+        elif self._buffer_handling == "OldestFirstOverwrite":
+            # Leave at least one buffer queued for the producer.
+            stale = max(len(self._buffers[data_stream]) - 2, 0)
+        else:
+            return buffer, data_stream
 
-        # Update the event data. There should be queued buffers available.
-        for event in self._events:
-            while buffer is None:
-                if event.num_in_queue > 0:
-                    event.update_event_data(timeout)
-                    buffer = event.buffer
+        while event.num_in_queue > stale:
+            self._discard_buffer(buffer, data_stream, track=stream == 0)
+            if on_discard is not None:
+                on_discard()
+            event.update_event_data(timeout)
+            buffer = event.buffer
+        return buffer, data_stream
+
+    def _discard_buffer(self, buffer, data_stream, track=True):
+        """Queue a filled buffer again without decoding it.
+
+        Frame IDs are tracked only for the first data stream, so `track`
+        is `False` for buffers of the other ones.
+        """
+        if track:
+            self._frame_tracker.update(
+                _frame_id(buffer), _is_complete(buffer), rejected=True
+            )
+        self._stats.increment("discarded_buffers")
+        data_stream.queue_buffer(buffer)
+
+    def _get_frame(self, timeout=1, on_buffer=None, on_discard=None):
+        """Wait for a buffer and decode it.
+
+        Buffers reported as incomplete are discarded without decoding, unless
+        they are set to be flagged (see `start_acquisition`).
+
+        Parameters
+        ----------
+        timeout : int, optional
+            Timeout of updating the event data, in milliseconds.
+        on_buffer : callable, optional
+            Function called as soon as a buffer has arrived and its frame ID
+            has been tracked, before it's decoded. It's given a boolean
+            telling whether the buffer will be delivered or was discarded,
+            and it returns a dictionary of extra coordinates for the frame,
+            or `None`.
+        on_discard : callable, optional
+            Function called for every buffer skipped by the buffer handling
+            mode, see `_wait_for_buffer`. `on_buffer` isn't called for them.
+
+        Returns
+        -------
+        data : numpy.ndarray
+            The decoded image.
+        info : dict
+            Information about the buffer: `frame_id` (`None` if not reported
+            by the producer), `complete`, the `coords` returned by
+            `on_buffer`, the number of `frames_lost` right before it, and its
+            `timestamp_ns` if the frame log or clock synchronization is
+            enabled.
+        """
+        stats = self._stats
+        start = time.perf_counter()
+
+        while True:
+            buffer, data_stream = self._wait_for_buffer(
+                timeout, on_discard=on_discard
+            )
+            received = time.perf_counter()
+            stats.observe("wait", received - start)
+
+            frame_id = _frame_id(buffer)
+            complete = _is_complete(buffer)
+
+            if complete:
+                break
+
+            stats.increment("incomplete_buffers")
+            if self._incomplete == "flag":
+                break
+
+            self._frame_tracker.update(frame_id, complete, rejected=True)
+            data_stream.queue_buffer(buffer)
+            if on_buffer is not None:
+                on_buffer(False)
+            start = time.perf_counter()
+
+        frames_lost = self._frame_tracker.update(frame_id, complete)
+        if frames_lost:
+            logger.debug(f"Frames lost before frame ID {frame_id}.")
+
+        coords = None
+        if on_buffer is not None:
+            coords = on_buffer(True)
+            received = time.perf_counter()
+
+        timestamp_ns = self._buffer_timestamp(buffer)
+
+        growth = self._buffer_growth
+        if growth["enabled"] and received - growth["checked"] >= 1:
+            growth["checked"] = received
+            self._grow_buffers()
+
+        data = self._decode_buffer(buffer, data_stream)
+        stats.observe("decode", time.perf_counter() - received)
+
+        for preview in self._previews:
+            preview.offer(data, self._pixel_format, frame_id)
+
+        return data, {
+            "frame_id": frame_id, "complete": complete, "coords": coords,
+            "frames_lost": frames_lost, "timestamp_ns": timestamp_ns,
+        }
+
+    def _buffer_timestamp(self, buffer):
+        """Get the timestamp of a buffer in nanoseconds, if it's needed."""
+        if self._frame_log is not None or self._clock_sync is not None:
+            try:
+                return buffer.timestamp_ns
+            except Exception:
+                pass
+        return None
+
+    def _decode_buffer(self, buffer, data_stream):
+        """Decode a filled buffer and queue it again.
+
+        The first data stream is decoded with the `PixelFormat` of the
+        camera, and the other ones with the pixel format of their first
+        buffer.
+
+        Returns
+        -------
+        numpy.ndarray
+            The decoded image.
+        """
+        decoding = self._decoding.get(data_stream)
+        if decoding is None:
+            from camazing.pixelformats import (get_decoder,
+                                               get_pixel_format_name,
+                                               get_valid_range)
+
+            try:
+                pixel_format = get_pixel_format_name(buffer.pixel_format)
+                decoding = (pixel_format, get_decoder(pixel_format),
+                            get_valid_range(pixel_format))
+            except Exception:
+                data_stream.queue_buffer(buffer)
+                raise
+            self._decoding[data_stream] = decoding
 
         # Check the payload type, and decide what to do with it. Payload types
         # are documented in section 6.4.4.5 in the version 1.5 of the GenICam
@@ -811,75 +1875,961 @@ class Camera:
         # When the payload type is unknown, the data in it can be handled as
         # raw data.
         if (buffer.payload_type ==
-                gtl.PAYLOADTYPE_INFO_IDS.PAYLOAD_TYPE_UNKNOWN):
+                self._gtl.PAYLOADTYPE_INFO_IDS.PAYLOAD_TYPE_UNKNOWN):
             width = self["Width"].value
             height = self["Height"].value
         elif (buffer.payload_type ==
-                gtl.PAYLOADTYPE_INFO_IDS.PAYLOAD_TYPE_IMAGE):
+                self._gtl.PAYLOADTYPE_INFO_IDS.PAYLOAD_TYPE_IMAGE):
             width = buffer.width
             height = buffer.height
         else:
+            data_stream.queue_buffer(buffer)
             raise Exception("Invalid payload type.")
 
-        data = self._buffer_decoder(buffer.raw_buffer, (height, width))
-
+        # The decoder copies the data, so the buffer can be filled again.
+        data = decoding[1](buffer.raw_buffer, (height, width))
+        data_stream.queue_buffer(buffer)
         return data
 
-    def _get_frame_with_meta(self):
-        """Fetch a frame and add metadata from the camera."""
+    def _frame_coords(self, info, extra_coords=None):
+        """Get the coordinates of a frame and log its metadata.
 
-        data = self._get_frame()
-        height, width = data.shape[0], data.shape[1]
+        Parameters
+        ----------
+        info : dict
+            Information about the buffer, see `_get_frame`.
+        extra_coords : dict, optional
+            Additional scalar coordinates.
+
+        Returns
+        -------
+        dict
+            The timestamp, frame ID, metadata features and extra coordinates.
+        """
+        sync = self._clock_sync
+        if sync is not None and info["timestamp_ns"] is not None:
+            timestamp = sync.to_host(info["timestamp_ns"])
+        else:
+            timestamp = dt.datetime.today().timestamp()
         coords = {
-            "x": ("x", np.arange(0, width) + 0.5),
-            "y": ("y", np.arange(0, height) + 0.5),
-            "timestamp": dt.datetime.today().timestamp(),
+            "timestamp": timestamp,
+            "frame_id": info["frame_id"],
         }
 
-        if 'RGB' in self._pixel_format:
-            dims = ('y', 'x', 'colour')
-            coords['colour'] = list('RGB')
-        elif 'YUV' in self._pixel_format:
-            dims = ('y', 'x', 'colour')
-            coords['colour'] = list('YUV')
-        elif 'YCbCr' in self._pixel_format:
-            dims = ('y', 'x', 'colour')
-            coords['colour'] = ['Y', 'Cb', 'Cr']
-        else:
-            dims = ('y', 'x')
+        if self._incomplete == "flag":
+            coords["complete"] = info["complete"]
 
-        # Add metadata as coordinates
+        # Add metadata as coordinates. Features already read when the buffer
+        # arrived are not read again.
+        extra = info["coords"] or {}
         if self._meta:
-            coords.update({k: self._features[k].value for k in self._meta})
-
-        frame = xr.DataArray(
-            data,
-            name="frame",
-            dims=dims,
-            coords=coords,
-            attrs={
-                'valid_range': self._image_range,
+            coords.update(self._read_meta(skip=extra))
+        coords.update(extra)
+
+        # The features of this frame have been read, so polled features can
+        # be read until the next frame arrives.
+        poller = self._poller
+        if poller is not None:
+            poller.frame_delivered()
+
+        if extra_coords:
+            coords.update(extra_coords)
+
+        log = self._frame_log
+        if log is not None:
+            log.append(
+                info["frame_id"], info["timestamp_ns"], coords["timestamp"],
+                info["complete"], info["frames_lost"],
+                [coords.get(name) for name in log.features]
+            )
+        return coords
+
+    def _read_meta(self, skip=()):
+        """Read the metadata features.
+
+        Parameters
+        ----------
+        skip : container of str, optional
+            Names of features not to read.
+
+        Returns
+        -------
+        dict
+            Values of the features by name.
+        """
+        cache = self._meta_cache
+        with self._feature_lock:
+            if cache is None:
+                return {
+                    k: self._features[k].value for k in self._meta
+                    if k not in skip
                 }
-        )
+
+            generations = self._meta_generations
+            values = {}
+            for k in self._meta:
+                if k in skip:
+                    continue
+                # The generation is taken before reading, so a change during
+                # the read leaves the value stale and it's read again next
+                # time.
+                generation = generations.get(k, 0)
+                cached = cache.get(k)
+                if cached is not None and cached[0] == generation:
+                    values[k] = cached[1]
+                else:
+                    values[k] = self._features[k].value
+                    cache[k] = (generation, values[k])
+            return values
+
+    def _get_frame_with_meta(self, extra_coords=None, on_buffer=None,
+                             on_discard=None):
+        """Fetch a frame and add metadata from the camera.
+
+        Parameters
+        ----------
+        extra_coords : dict, optional
+            Additional scalar coordinates to attach to the frame.
+        on_buffer : callable, optional
+            Function called when a buffer has arrived, see `_get_frame`.
+        on_discard : callable, optional
+            Function called when a buffer is skipped, see `_get_frame`.
+        """
+
+        data, info = self._get_frame(on_buffer=on_buffer,
+                                     on_discard=on_discard)
+        start = time.perf_counter()
+        coords = self._frame_coords(info, extra_coords)
+        wrapped = time.perf_counter()
+        self._stats.observe("meta", wrapped - start)
+
+        attrs = None
+        if self._statistics is not None:
+            from camazing.imagestats import image_statistics
+
+            attrs = {"statistics": image_statistics(
+                data, self._image_range, **self._statistics
+            )}
+            counted = time.perf_counter()
+            self._stats.observe("statistics", counted - wrapped)
+            wrapped = counted
+
+        controller = self._auto_exposure
+        if controller is not None:
+            controller.update(data, self._image_range,
+                              attrs and attrs["statistics"])
+            controlled = time.perf_counter()
+            self._stats.observe("control", controlled - wrapped)
+            wrapped = controlled
+
+        frame = wrap_frame(data, self._pixel_format, self._image_range, coords,
+                           attrs)
+        self._stats.observe("wrap", time.perf_counter() - wrapped)
 
         return frame
 
+    def _is_software_triggered(self):
+        """Check if frames are triggered with `TriggerSoftware`."""
+        return (self["TriggerMode"].value == "On" and
+                self["TriggerSource"].value == "Software")
+
     def _get_frame_generator(self):
-        if self["TriggerMode"].value == "On" and self["TriggerSource"].value == "Software":
-            while True:
+        sequencer = self._sequencer
+        if self._is_software_triggered():
+            depth = self._trigger_depth
+            # Sequence steps of the triggered frames not yet received.
+            steps = collections.deque()
+
+            def trigger():
+                # Parameters of the next step are written before triggering,
+                # so that the frame is exposed with them.
+                if sequencer is not None:
+                    steps.append(sequencer.advance(self))
+                else:
+                    steps.append(None)
+                start = time.perf_counter()
                 self["TriggerSoftware"].execute()
-                yield self._get_frame_with_meta()
+                self._stats.observe("trigger", time.perf_counter() - start)
+
+            def on_buffer(delivered):
+                step = steps.popleft()
+                coords = {}
+                if step is not None:
+                    coords["sequence_step"] = step
+                if delivered and depth and self._meta:
+                    # Read the metadata before the next step of a sequence
+                    # changes it.
+                    coords.update(self._read_meta())
+                # Keep `depth` frames triggered while this one is processed,
+                # and replace a discarded frame.
+                while len(steps) < (depth if delivered else max(depth, 1)):
+                    trigger()
+                return coords
+
+            def on_discard():
+                # A frame skipped for a newer one is no longer in flight.
+                # The delivered frame triggers its replacement.
+                steps.popleft()
+
+            while True:
+                if not steps:
+                    trigger()
+                yield self._get_frame_with_meta(on_buffer=on_buffer,
+                                                on_discard=on_discard)
         else:
-            self._get_frame_with_meta()
+            on_buffer = None
+            if sequencer is not None:
+                # Only a sequence run by the camera can get here. The camera
+                # moves to the next set with every frame it produces,
+                # including discarded and lost ones, so the step follows
+                # from the frames of the run counted by the frame tracker.
+                tracker = self._frame_tracker
+                n_steps = len(sequencer)
+
+                def on_buffer(delivered):
+                    return {"sequence_step": (tracker.run_frames - 1) % n_steps}
+
+            # The first frame is discarded, without reading its metadata.
+            self._get_frame()
             while True:
-                yield self._get_frame_with_meta()
+                yield self._get_frame_with_meta(on_buffer=on_buffer)
+
+    def _arm_sequencer(self, trigger_depth):
+        """Prepare the parameter sequence for a new acquisition.
+
+        The camera's own sequencer is used when it's available and allowed.
+        Otherwise the parameters are written from software between software
+        triggers. Everything is checked before the camera is programmed.
+
+        Parameters
+        ----------
+        trigger_depth : int
+            Trigger depth of the acquisition, see `start_acquisition`.
+
+        Raises
+        ------
+        AcquisitionException
+            If the sequence cannot be run on the camera and frames are not
+            software triggered, or if it's run in software with a
+            `trigger_depth` larger than 1.
+        """
+        sequencer = self._sequencer
+        sequencer.reset()
+        if (self._use_device_sequencer is not False and
+                Sequencer.is_device_capable(self)):
+            sequencer.program_device(self)
+        elif self._use_device_sequencer:
+            raise AcquisitionException(
+                "The camera doesn't implement the SFNC sequencer features."
+            )
+        elif not self._is_software_triggered():
+            raise AcquisitionException(
+                "Running a parameter sequence without the camera's sequencer "
+                "requires `TriggerMode` 'On' and `TriggerSource` 'Software'."
+            )
+        elif trigger_depth > 1:
+            # The features of a step would be written while the previous
+            # triggered frame may still be exposed.
+            raise AcquisitionException(
+                "A parameter sequence run in software allows a "
+                "`trigger_depth` of at most 1."
+            )
+
+    @check_initialization
+    def set_sequence(self, steps, device_sequencer=None):
+        """Cycle the camera through parameter sets frame by frame.
+
+        Each frame acquired after starting the acquisition is exposed with the
+        parameters of the next step, and is tagged with the step index in the
+        `sequence_step` coordinate. Only the features that change between
+        consecutive steps are written.
+
+        Parameters
+        ----------
+        steps : list of dict
+            Parameter sets as dictionaries of feature names and values, e.g.
+            ``[{"ExposureTime": 1000}, {"ExposureTime": 10000}]``.
+        device_sequencer : bool or None, optional
+            Whether to run the sequence with the camera's own sequencer
+            (`SequencerMode`). If `None`, the camera's sequencer is used when
+            available, and otherwise the features are written between
+            software triggers.
+
+        Raises
+        ------
+        AcquisitionException
+            If acquisition is ongoing.
+        KeyError
+            If a step contains a feature that the camera doesn't have.
+        """
+        if self.is_acquiring():
+            raise AcquisitionException(
+                "Cannot change the sequence while acquisition is ongoing."
+            )
+
+        sequencer = Sequencer(steps)
+        for step in sequencer.steps:
+            for name in step:
+                if name not in self._features:
+                    raise KeyError(f"Unknown feature `{name}` in sequence.")
+
+        self._sequencer = sequencer
+        self._use_device_sequencer = device_sequencer
+
+    @check_initialization
+    def clear_sequence(self):
+        """Stop cycling parameters set with `set_sequence`.
+
+        Raises
+        ------
+        AcquisitionException
+            If acquisition is ongoing.
+        """
+        if self.is_acquiring():
+            raise AcquisitionException(
+                "Cannot change the sequence while acquisition is ongoing."
+            )
+        self._sequencer = None
 
     @check_initialization
     def get_frame(self):
         if not self.is_acquiring():
             raise AcquisitionException("Acquisition not started.")
 
-        return next(self._frame_generator)
+        start = time.perf_counter()
+        frame = next(self._frame_generator)
+        self._stats.observe("total", time.perf_counter() - start)
+        self._stats.increment("frames_delivered")
+
+        return frame
+
+    @check_initialization
+    def get_frames(self, timeout=None):
+        """Get synchronized frames from all data streams of the camera.
+
+        Devices such as 3D cameras and dual-sensor cameras deliver the parts
+        of a frame through several data streams, each with its own buffers,
+        size and pixel format. This waits for a buffer from every data
+        stream and matches them by frame ID: buffers of frames which are
+        missing from some data stream are discarded. If the producer doesn't
+        report frame IDs, the next buffer of each data stream is taken.
+
+        `get_frame` returns frames from the first data stream only, and it
+        shouldn't be mixed with this method during an acquisition. Frame
+        statistics, auto exposure and parameter sequences are applied only
+        by `get_frame`.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time in seconds to wait for the buffers of all the data streams.
+            By default, wait until they arrive.
+
+        Returns
+        -------
+        list of xarray.DataArray
+            One frame for each data stream, with the same coordinates and
+            a `stream` coordinate with the index of the data stream.
+
+        Raises
+        ------
+        AcquisitionException
+            If acquisition has not been started.
+        TimeoutError
+            If a data stream didn't deliver a matching buffer within
+            `timeout`. The buffers received from the other data streams are
+            discarded.
+
+        Examples
+        --------
+        >>> with camera:
+        ...     depth, intensity = camera.get_frames()
+        """
+        if not self.is_acquiring():
+            raise AcquisitionException("Acquisition not started.")
+
+        stats = self._stats
+        start = time.perf_counter()
+        # All the data streams fill their buffers at the same time, so they
+        # share one deadline.
+        deadline = None if timeout is None else start + timeout
+        if self._is_software_triggered():
+            self["TriggerSoftware"].execute()
+            triggered = time.perf_counter()
+            stats.observe("trigger", triggered - start)
+        else:
+            triggered = start
+
+        while True:
+            buffers = self._wait_for_matching_buffers(deadline)
+            received = time.perf_counter()
+            stats.observe("wait", received - triggered)
+            complete = [_is_complete(buffer) for buffer in buffers]
+            if all(complete):
+                break
+            stats.increment("incomplete_buffers", complete.count(False))
+            if self._incomplete == "flag":
+                break
+            for stream, buffer in enumerate(buffers):
+                self._discard_buffer(buffer, self._data_streams[stream],
+                                     track=stream == 0)
+            triggered = time.perf_counter()
+
+        # Frame IDs and time stamps are taken from the first data stream.
+        frame_id = _frame_id(buffers[0])
+        frames_lost = self._frame_tracker.update(frame_id, complete[0])
+        info = {
+            "frame_id": frame_id, "complete": complete[0], "coords": None,
+            "frames_lost": frames_lost,
+            "timestamp_ns": self._buffer_timestamp(buffers[0]),
+        }
+
+        growth = self._buffer_growth
+        if growth["enabled"] and received - growth["checked"] >= 1:
+            growth["checked"] = received
+            self._grow_buffers()
+
+        images = [
+            self._decode_buffer(buffer, data_stream)
+            for buffer, data_stream in zip(buffers, self._data_streams)
+        ]
+        decoded = time.perf_counter()
+        stats.observe("decode", decoded - received)
+
+        for preview in self._previews:
+            preview.offer(images[0], self._pixel_format, frame_id)
+
+        coords = self._frame_coords(info)
+        wrapped = time.perf_counter()
+        stats.observe("meta", wrapped - decoded)
+
+        frames = []
+        for stream, (data, data_stream) in enumerate(
+                zip(images, self._data_streams)):
+            pixel_format, _, valid_range = self._decoding[data_stream]
+            stream_coords = {**coords, "stream": stream}
+            if "PixelFormat" in coords:
+                stream_coords["PixelFormat"] = pixel_format
+            if self._incomplete == "flag":
+                stream_coords["complete"] = complete[stream]
+            frames.append(
+                wrap_frame(data, pixel_format, valid_range, stream_coords)
+            )
+        end = time.perf_counter()
+        stats.observe("wrap", end - wrapped)
+        stats.observe("total", end - start)
+        stats.increment("frames_delivered")
+
+        return frames
+
+    def _wait_for_matching_buffers(self, deadline):
+        """Wait for a buffer of the same frame from every data stream.
+
+        Parameters
+        ----------
+        deadline : float or None
+            Value of `time.perf_counter` after which to stop waiting, or
+            `None` to wait until the buffers arrive.
+
+        Returns
+        -------
+        list of genicam2.gentl.Buffer
+            One buffer for each data stream.
+
+        Raises
+        ------
+        TimeoutError
+            If the deadline passed. The buffers already received are queued
+            again.
+        """
+        buffers = [None] * len(self._data_streams)
+        try:
+            return self._match_buffers(buffers, deadline)
+        except TimeoutError:
+            for stream, buffer in enumerate(buffers):
+                if buffer is not None:
+                    self._discard_buffer(buffer, self._data_streams[stream],
+                                         track=stream == 0)
+            raise
+
+    def _match_buffers(self, buffers, deadline):
+        """Fill in `buffers` with buffers of the same frame, see
+        `_wait_for_matching_buffers`."""
+        def wait(stream):
+            return self._wait_for_buffer(
+                _EVENT_WAIT, stream, deadline=deadline
+            )[0]
+
+        for stream in range(len(buffers)):
+            buffers[stream] = wait(stream)
+        while len(buffers) > 1:
+            frame_ids = [_frame_id(buffer) for buffer in buffers]
+            if None in frame_ids:
+                break
+            newest = max(frame_ids)
+            if min(frame_ids) == newest:
+                break
+            # Replace the buffers of older frames with the next ones.
+            for stream, frame_id in enumerate(frame_ids):
+                if frame_id < newest:
+                    self._discard_buffer(
+                        buffers[stream], self._data_streams[stream],
+                        track=stream == 0
+                    )
+                    # Not queued again if the wait times out.
+                    buffers[stream] = None
+                    buffers[stream] = wait(stream)
+        return buffers
+
+    @check_initialization
+    def imap(self, function, n_frames=None, max_workers=None, n_slots=None,
+             backpressure="block"):
+        """Apply a function to frames on a pool of processes.
+
+        Frames are passed to the worker processes through shared memory, and
+        the results are yielded in the order of the frames. See
+        `camazing.executor.FrameExecutor` for details.
+
+        Parameters
+        ----------
+        function : callable
+            Picklable function called as ``function(data, meta)`` for every
+            frame, with the image data as a read-only `numpy.ndarray` and the
+            scalar coordinates of the frame as a dictionary.
+        n_frames : int, optional
+            Number of frames to acquire. Acquires until the generator is
+            closed by default.
+        max_workers : int, optional
+            Number of worker processes. Defaults to the number of CPUs.
+        n_slots : int, optional
+            Maximum number of frames being processed at a time.
+        backpressure : {'block', 'drop'}, optional
+            Whether to wait for the workers or to drop frames when all slots
+            are in use.
+
+        Yields
+        ------
+        camazing.executor.FrameResult
+            Result of the function and metadata of the frame.
+
+        Raises
+        ------
+        AcquisitionException
+            If acquisition has not been started.
+        """
+        if not self.is_acquiring():
+            raise AcquisitionException("Acquisition not started.")
+
+        def frames():
+            count = 0
+            while n_frames is None or count < n_frames:
+                yield self.get_frame()
+                count += 1
+
+        from camazing.executor import FrameExecutor
+
+        with FrameExecutor(function, max_workers, n_slots,
+                           backpressure) as executor:
+            yield from executor.map(frames())
+
+    def record(self, path, n_frames, **options):
+        """Acquire frames into a lossless compressed recording.
+
+        The frames are compressed on a pool of threads while acquisition
+        continues. See `camazing.recording.Recorder` for details, and
+        `camazing.recording.RecordingReader` for reading the recording.
+
+        Parameters
+        ----------
+        path : str
+            Path of the recording file.
+        n_frames : int
+            Number of frames to acquire.
+        **options
+            Options of `camazing.recording.Recorder`, such as `codec`,
+            `level` and `chunk_frames`.
+
+        Returns
+        -------
+        dict
+            Compression statistics of the recording.
+
+        Raises
+        ------
+        AcquisitionException
+            If acquisition has not been started.
+        """
+        if not self.is_acquiring():
+            raise AcquisitionException("Acquisition not started.")
+
+        from camazing.recording import Recorder
+
+        with Recorder(path, **options) as recorder:
+            for _ in range(n_frames):
+                recorder.write(self.get_frame())
+        return recorder.stats()
+
+    def enable_statistics(self, subsample=1, percentiles=(1, 50, 99)):
+        """Compute histogram statistics of every frame.
+
+        The statistics of each frame from `get_frame` are stored in
+        ``frame.attrs["statistics"]``. See
+        `camazing.imagestats.image_statistics` for their contents.
+
+        Parameters
+        ----------
+        subsample : int, optional
+            Use every `subsample`:th pixel along both axes, which makes
+            the statistics faster to compute for large images.
+        percentiles : sequence of float, optional
+            Percentiles to compute, between 0 and 100.
+
+        Examples
+        --------
+        >>> camera.enable_statistics(subsample=4, percentiles=(50, 99.9))
+        >>> frame = camera.get_frame()
+        >>> frame.attrs["statistics"]["saturated"]
+        0.0003
+        """
+        if subsample < 1:
+            raise ValueError(
+                f"Expected `subsample` to be positive, but got {subsample}."
+            )
+        self._statistics = {
+            "subsample": subsample, "percentiles": tuple(percentiles)
+        }
+
+    def disable_statistics(self):
+        """Stop computing histogram statistics of frames."""
+        self._statistics = None
+
+    @check_initialization
+    def enable_clock_sync(self, interval=10.0, samples=8, window=32):
+        """Timestamp frames with the device clock mapped to host time.
+
+        By default, the `timestamp` of a frame is the host time when it was
+        decoded, which includes the delays of transfer, queueing and
+        processing. With clock synchronization, it's the timestamp of the
+        buffer, converted to host time (seconds since the epoch) with the
+        offset and drift of the device clock. These are fitted to samples of
+        `TimestampLatch` (or `GevTimestampControlLatch`), taken now and then
+        every `interval` seconds in a background thread, between the
+        metadata reads of frames. See `camazing.clocksync.ClockSync` for
+        details.
+
+        Parameters
+        ----------
+        interval : float, optional
+            Time in seconds between synchronizations.
+        samples : int, optional
+            Number of latches in each synchronization, of which the one with
+            the shortest round trip is used.
+        window : int, optional
+            Number of synchronizations used in the fit.
+
+        Returns
+        -------
+        camazing.clocksync.ClockSync
+            The running synchronization. Its `state` method reports the drift
+            and the accuracy of the fit, and `close` stops it.
+
+        Raises
+        ------
+        ValueError
+            If the camera has no timestamp latch features.
+        """
+        from camazing.clocksync import ClockSync
+
+        sync = ClockSync(self, interval, samples, window)
+        sync.synchronize()
+        if self._clock_sync is not None:
+            self._clock_sync.close()
+
+        def detach(sync):
+            if self._clock_sync is sync:
+                self._clock_sync = None
+
+        sync.detach = detach
+        self._clock_sync = sync
+        sync.start()
+        return sync
+
+    def disable_clock_sync(self):
+        """Timestamp frames with the host time when they are decoded."""
+        if self._clock_sync is not None:
+            self._clock_sync.close()
+
+    @check_initialization
+    def watch(self, features=None, maxlen=1000):
+        """Start collecting notifications of changed features.
+
+        The notifications come from GenApi when features are written or
+        invalidated, so no registers are read to find the changes. See
+        `camazing.notifications.FeatureChanges` for details.
+
+        Parameters
+        ----------
+        features : list of str, optional
+            Names of the features to watch. By default, all the features
+            with a value are watched.
+        maxlen : int, optional
+            Maximum number of queued notifications.
+
+        Returns
+        -------
+        camazing.notifications.FeatureChanges
+            Queue of the notifications. Its `close` method stops watching.
+
+        Examples
+        --------
+        >>> with camera.watch(["Gain", "ExposureTime"]) as changes:
+        ...     camera["Gain"].value = 6.0
+        ...     print([change.name for change in changes.get_all()])
+        ['Gain']
+        """
+        from camazing.notifications import FeatureChanges
+
+        return FeatureChanges(self, features, maxlen)
+
+    @check_initialization
+    def poll_features(self, features, interval=1.0, maxlen=10000, **options):
+        """Start reading features periodically in a background thread.
+
+        Slowly changing values, such as `DeviceTemperature`, can be followed
+        during acquisition without reading them in the acquisition loop.
+        During acquisition, the features are read right after the metadata
+        of a frame, so the reads don't delay frame delivery. See
+        `camazing.polling.FeaturePoller` for details.
+
+        Parameters
+        ----------
+        features : dict or list of str
+            Polling intervals in seconds by feature name, or names of
+            features polled every `interval` seconds.
+        interval : float, optional
+            Polling interval in seconds of the features given as a list.
+        maxlen : int, optional
+            Maximum number of values kept per feature.
+        **options
+            Options of `camazing.polling.FeaturePoller`, such as
+            `batch_window`.
+
+        Returns
+        -------
+        camazing.polling.FeaturePoller
+            The running poller. Its `history` and `latest` methods give the
+            values, and `close` stops it.
+
+        Examples
+        --------
+        >>> poller = camera.poll_features({"DeviceTemperature": 5.0})
+        >>> poller.latest()
+        {'DeviceTemperature': (1612345678.9, 40.2)}
+        """
+        from camazing.polling import FeaturePoller
+
+        if not isinstance(features, dict):
+            features = dict.fromkeys(features, interval)
+
+        if self._poller is not None:
+            self._poller.close()
+        poller = FeaturePoller(self, features, maxlen, **options)
+
+        def detach(poller):
+            if self._poller is poller:
+                self._poller = None
+
+        poller.detach = detach
+        self._poller = poller
+        poller.start()
+        return poller
+
+    @check_initialization
+    def auto_exposure(self, target=0.5, **options):
+        """Start controlling `ExposureTime` and `Gain` in software.
+
+        The controller measures the mean brightness of the frames fetched
+        with `get_frame` and scales the exposure time, and then the gain, to
+        reach the target. Writes are rate-limited, so the controller runs
+        in the acquisition loop without slowing it down. The camera's own
+        `ExposureAuto` and `GainAuto` are turned off. See
+        `camazing.autoexposure.AutoExposure` for details.
+
+        Parameters
+        ----------
+        target : float, optional
+            Target mean brightness as a fraction of the maximum pixel value.
+        **options
+            Options of `camazing.autoexposure.AutoExposure`, such as
+            `threshold`, `min_interval` and `exposure_limits`.
+
+        Returns
+        -------
+        camazing.autoexposure.AutoExposure
+            The controller. Its `state` method reports the progress, and
+            `close` stops the control.
+
+        Examples
+        --------
+        >>> with camera, camera.auto_exposure(0.4) as controller:
+        ...     frames = [camera.get_frame() for _ in range(100)]
+        ...     print(controller.state()["status"])
+        converged
+        """
+        from camazing.autoexposure import AutoExposure
+
+        for name in ("ExposureAuto", "GainAuto"):
+            if name in self and self[name].value != "Off":
+                self[name].value = "Off"
+
+        if self._auto_exposure is not None:
+            self._auto_exposure.close()
+        controller = AutoExposure(self, target, **options)
+
+        def detach(controller):
+            if self._auto_exposure is controller:
+                self._auto_exposure = None
+
+        controller.detach = detach
+        self._auto_exposure = controller
+        return controller
+
+    def preview(self, max_rate=10.0, factor=4, method="stride",
+                debayer=False, callback=None):
+        """Start a live preview of the acquired frames.
+
+        The preview takes the decoded images of frames fetched with
+        `get_frame`, at most `max_rate` times per second, and downsamples
+        them into buffers of its own, so the frames returned can be
+        modified freely. The preview frames are published in a separate
+        thread, and images arriving while the previous preview frame is
+        still being handled by `callback` are skipped.
+
+        Parameters
+        ----------
+        max_rate : float, optional
+            Maximum number of preview frames per second.
+        factor : int, optional
+            Downsampling factor along both axes.
+        method : {'stride', 'bin'}, optional
+            Whether to take every `factor`:th pixel or to average blocks of
+            pixels.
+        debayer : bool, optional
+            Whether to convert Bayer images to RGB.
+        callback : callable, optional
+            Function called with each preview frame in the preview thread.
+
+        Returns
+        -------
+        camazing.preview.PreviewTap
+            The preview, whose `latest` and `wait` methods give the
+            downsampled frames. It's stopped with `close`.
+
+        Examples
+        --------
+        >>> with camera, camera.preview(max_rate=15, factor=8) as preview:
+        ...     while recording:
+        ...         record(camera.get_frame())
+        ...         show(preview.latest())
+        """
+        from camazing.preview import PreviewTap
+
+        tap = PreviewTap(max_rate, factor, method, debayer, callback)
+
+        def detach(tap):
+            self._previews = [p for p in self._previews if p is not tap]
+
+        tap.detach = detach
+        self._previews = self._previews + [tap]
+        return tap
+
+    def _count_underruns(self):
+        """Get the number of lost frames reported by the open data streams.
+
+        A frame is lost when the producer has no queued buffer to fill.
+        Producers which don't implement the information count as zero.
+        """
+        underruns = 0
+        for data_stream in self._data_streams:
+            try:
+                underruns += data_stream.num_underrun
+            except Exception:
+                pass
+        return underruns
+
+    def loss_report(self):
+        """Get a frame loss report of the latest acquisition.
+
+        Lost frames are detected from gaps in the frame IDs of the buffers
+        delivered by the producer.
+
+        Returns
+        -------
+        dict
+            First and last frame ID, numbers of received, lost, incomplete and
+            rejected (incomplete and dropped) frames, number of gaps in the
+            frame IDs, and fraction of frames lost or rejected.
+        """
+        return self._frame_tracker.report()
+
+    @property
+    def frame_log(self):
+        """camazing.framelog.FrameLog or None: Metadata of the frames of the
+        latest acquisition started with ``frame_log=True``.
+
+        Examples
+        --------
+        >>> camera.start_acquisition(frame_log=True)
+        >>> frames = [camera.get_frame() for _ in range(1000)]
+        >>> camera.stop_acquisition()
+        >>> camera.frame_log.save("run.npz")
+        """
+        return self._frame_log
+
+    def stats(self):
+        """Get timing and event statistics of the image acquisition.
+
+        The statistics accumulate over acquisitions until `reset_stats` is
+        called. Recording them costs a few timer calls per frame.
+
+        Returns
+        -------
+        dict
+            Dictionary with `stages`, containing the count, sum, mean,
+            maximum and estimated median and 99th percentile of the durations
+            (in seconds) of each acquisition stage, and `counters`, containing
+            the numbers of delivered frames, buffer underruns, incomplete
+            buffers and discarded buffers. See
+            `camazing.metrics.AcquisitionStats` for the stages.
+        """
+        return self._stats.as_dict(counters=self._live_counters())
+
+    def stats_prometheus(self):
+        """Get the statistics in the Prometheus text exposition format.
+
+        Returns
+        -------
+        str
+            Statistics of `stats` as histograms and counters, labeled with
+            the serial number of the camera.
+        """
+        return self._stats.to_prometheus(
+            labels={"serial_number": self._device_info.serial_number},
+            counters=self._live_counters()
+        )
+
+    def reset_stats(self):
+        """Clear the acquisition statistics."""
+        self._stats.reset()
+
+    def _live_counters(self):
+        """Add underruns of the ongoing acquisition to the recorded ones."""
+        if not self.is_acquiring():
+            return {}
+        return {
+            "buffer_underruns": (self._stats.counters["buffer_underruns"] +
+                                 self._count_underruns())
+        }
 
     def read_config_from_file(self, filepath=None):
         """Read configuration file and return it as a dict.
@@ -919,6 +2869,8 @@ class Camera:
         configuration file contains very few general settings, it's very
         likely that the file works with multiple cameras.
         """
+        import toml
+
         with open(filepath, "r") as file:
             settings = toml.load(file)  # Load the settings from a file.
         logger.info(f'Read list of settings from file `{filepath}`.')
@@ -1117,6 +3069,8 @@ class Camera:
 
         features = {k: fun(v) for k, v in self.get_features(**kwargs).items()}
 
+        import toml
+
         with open(filepath, "w") as file:
             toml.dump(features, file)  # Dump the settings to a file.
 
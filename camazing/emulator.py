@@ -0,0 +1,1038 @@
+"""Software emulation of a GenTL producer and GenICam cameras.
+
+The emulator stands in for the `genicam2.gentl` module, so that the whole
+acquisition path of `CameraList` and `Camera` can be run without hardware,
+e.g. for load testing::
+
+    from camazing import CameraList, emulator
+
+    gentl = emulator.EmulatedGenTL([
+        emulator.EmulatedCamera(width=2048, height=1536, frame_rate=200,
+                                drop_rate=0.001),
+    ])
+    cameras = CameraList(gentl=gentl)
+
+The cameras serve a GenICam XML description and a register map through
+their remote ports, so the features are accessed through a real GenApi node
+map. Frames are produced by a background thread for each data stream, either
+at `AcquisitionFrameRate` or on `TriggerSoftware`, and delivered through
+events compatible with `genicam2.gentl.EventManagerNewBuffer`.
+"""
+
+import collections
+import enum
+import functools
+import itertools
+import logging
+import math
+import random
+import struct
+import threading
+import time
+
+import numpy as np
+
+from camazing.pixelformats import (get_pixel_format_code, get_pixel_formats,
+                                   get_valid_range)
+
+logger = logging.getLogger(__name__)
+
+
+class EVENT_TYPE_LIST(enum.IntEnum):
+    EVENT_NEW_BUFFER = 1
+
+
+class ACQ_START_FLAGS_LIST(enum.IntEnum):
+    ACQ_START_FLAGS_DEFAULT = 0
+
+
+class ACQ_STOP_FLAGS_LIST(enum.IntEnum):
+    ACQ_STOP_FLAGS_DEFAULT = 0
+    ACQ_STOP_FLAGS_KILL = 1
+
+
+class ACQ_QUEUE_TYPE_LIST(enum.IntEnum):
+    ACQ_QUEUE_INPUT_TO_OUTPUT = 0
+    ACQ_QUEUE_OUTPUT_DISCARD = 1
+    ACQ_QUEUE_ALL_TO_INPUT = 2
+    ACQ_QUEUE_UNQUEUED_TO_INPUT = 3
+    ACQ_QUEUE_ALL_DISCARD = 4
+
+
+class PAYLOADTYPE_INFO_IDS(enum.IntEnum):
+    PAYLOAD_TYPE_UNKNOWN = 0
+    PAYLOAD_TYPE_IMAGE = 1
+
+
+class DEVICE_ACCESS_FLAGS_LIST(enum.IntEnum):
+    DEVICE_ACCESS_READONLY = 2
+    DEVICE_ACCESS_CONTROL = 3
+    DEVICE_ACCESS_EXCLUSIVE = 4
+
+
+class TimeoutException(Exception):
+    """Raised when no event arrives within the timeout."""
+
+
+class EmulatedCamera:
+    """Specification of an emulated camera.
+
+    The parameters define the initial feature values and the faults injected
+    into the image stream.
+    """
+
+    _serial_numbers = itertools.count()
+
+    def __init__(self, serial_number=None, model="Emulator",
+                 width=640, height=480, pixel_format="Mono8",
+                 frame_rate=30.0, exposure_time=10000.0, gain=0.0,
+                 drop_rate=0.0, incomplete_rate=0.0, latency=0.0,
+                 clock_drift=0.0, extra_streams=(), sequencer_sets=0,
+                 seed=None):
+        """Initialize the specification.
+
+        Parameters
+        ----------
+        serial_number : str, optional
+            Serial number of the camera. Generated if not given.
+        model : str, optional
+            Model name of the camera.
+        width, height : int, optional
+            Initial size of the image.
+        pixel_format : str, optional
+            Initial pixel format. Must be supported by
+            `camazing.pixelformats`.
+        frame_rate : float, optional
+            Initial `AcquisitionFrameRate` in frames per second.
+        exposure_time : float, optional
+            Initial `ExposureTime` in microseconds.
+        gain : float, optional
+            Initial `Gain` in decibels.
+        drop_rate : float, optional
+            Probability of a frame being lost before reaching the host. Its
+            frame ID is skipped.
+        incomplete_rate : float, optional
+            Probability of a buffer being delivered only partially filled.
+        latency : float, optional
+            Delay in seconds between the end of a frame and its delivery.
+        clock_drift : float, optional
+            Relative rate error of the device clock, e.g. 1e-5 for a clock
+            running 10 ppm fast.
+        extra_streams : sequence of tuple, optional
+            Width, height and pixel format of each additional data stream,
+            e.g. the intensity stream of a 3D camera. Their frames are
+            produced at the same time as those of the first stream, with the
+            same frame IDs.
+        sequencer_sets : int, optional
+            Number of sets of the SFNC sequencer, which cycles
+            `ExposureTime` and `Gain` frame by frame. With 0, the camera has
+            no sequencer features.
+        seed : int, optional
+            Seed of the fault injection.
+        """
+        for _, _, name in [(width, height, pixel_format), *extra_streams]:
+            if name not in get_pixel_formats():
+                raise ValueError(f"Unsupported pixel format `{name}`.")
+        if serial_number is None:
+            serial_number = f"EMU{next(self._serial_numbers):04d}"
+        self.serial_number = serial_number
+        self.model = model
+        self.width = width
+        self.height = height
+        self.pixel_format = pixel_format
+        self.frame_rate = frame_rate
+        self.exposure_time = exposure_time
+        self.gain = gain
+        self.drop_rate = drop_rate
+        self.incomplete_rate = incomplete_rate
+        self.latency = latency
+        self.clock_drift = clock_drift
+        self.extra_streams = list(extra_streams)
+        self.sequencer_sets = sequencer_sets
+        self.seed = seed
+
+
+# Registers of the emulated cameras. Features with a register of their own
+# have the same name as the register without the `Reg` suffix.
+_XML_ADDRESS = 0x100000
+_REGISTERS = {
+    # name: (address, length)
+    "DeviceVendorNameReg": (0x0000, 32),
+    "DeviceModelNameReg": (0x0020, 32),
+    "DeviceSerialNumberReg": (0x0040, 32),
+    "WidthReg": (0x1000, 8),
+    "HeightReg": (0x1008, 8),
+    "PixelFormatReg": (0x1010, 8),
+    "PayloadSizeReg": (0x1018, 8),
+    "TLParamsLockedReg": (0x1020, 8),
+    "AcquisitionModeReg": (0x2000, 8),
+    "AcquisitionStartReg": (0x2008, 8),
+    "AcquisitionStopReg": (0x2010, 8),
+    "AcquisitionFrameRateReg": (0x2018, 8),
+    "ExposureTimeReg": (0x2020, 8),
+    "GainReg": (0x2028, 8),
+    "TriggerModeReg": (0x2030, 8),
+    "TriggerSourceReg": (0x2038, 8),
+    "TriggerSoftwareReg": (0x2040, 8),
+    "TimestampLatchReg": (0x3000, 8),
+    "TimestampLatchValueReg": (0x3008, 8),
+    "DeviceTemperatureReg": (0x3010, 8),
+}
+
+# Registers of the sequencer, which exist only with `sequencer_sets`.
+_SEQUENCER_REGISTERS = {
+    "SequencerModeReg": (0x3800, 8),
+    "SequencerConfigurationModeReg": (0x3808, 8),
+    "SequencerSetSelectorReg": (0x3810, 8),
+    "SequencerSetSaveReg": (0x3818, 8),
+    "SequencerSetNextReg": (0x3820, 8),
+    "SequencerSetStartReg": (0x3828, 8),
+}
+_REGISTERS.update(_SEQUENCER_REGISTERS)
+
+# Registers of the features stored in the sequencer sets.
+_SEQUENCED_REGISTERS = ("ExposureTimeReg", "GainReg")
+
+
+def _register(name, kind, access="RW", cachable=True, extra=""):
+    address, length = _REGISTERS[name]
+    cache = "" if cachable else "<Cachable>NoCache</Cachable>"
+    return (
+        f'<{kind} Name="{name}"><Address>{address:#x}</Address>'
+        f'<Length>{length}</Length><AccessMode>{access}</AccessMode>'
+        f'<pPort>Device</pPort>{cache}{extra}</{kind}>'
+    )
+
+
+def _int_reg(name, access="RW", cachable=True):
+    return _register(name, "IntReg", access, cachable,
+                     "<Sign>Unsigned</Sign><Endianess>LittleEndian</Endianess>")
+
+
+def _float_reg(name, access="RW", cachable=True):
+    return _register(name, "FloatReg", access, cachable,
+                     "<Endianess>LittleEndian</Endianess>")
+
+
+def _locked(locked):
+    return "<pIsLocked>TLParamsLocked</pIsLocked>" if locked else ""
+
+
+def _integer(name, minimum, maximum, increment=1, access="RW", locked=False,
+             cachable=True):
+    return (
+        f'<Integer Name="{name}" NameSpace="Standard">{_locked(locked)}'
+        f'<pValue>{name}Reg</pValue><Min>{minimum}</Min><Max>{maximum}</Max>'
+        f'<Inc>{increment}</Inc></Integer>'
+        + _int_reg(f"{name}Reg", access, cachable)
+    )
+
+
+def _float(name, minimum, maximum, unit, access="RW", cachable=True):
+    return (
+        f'<Float Name="{name}" NameSpace="Standard">'
+        f'<pValue>{name}Reg</pValue><Min>{minimum}</Min><Max>{maximum}</Max>'
+        f'<Unit>{unit}</Unit></Float>'
+        + _float_reg(f"{name}Reg", access, cachable)
+    )
+
+
+def _enumeration(name, entries, locked=False):
+    values = "".join(
+        f'<EnumEntry Name="{entry}"><Value>{value}</Value></EnumEntry>'
+        for entry, value in entries.items()
+    )
+    return (
+        f'<Enumeration Name="{name}" NameSpace="Standard">{_locked(locked)}'
+        f'{values}<pValue>{name}Reg</pValue></Enumeration>'
+        + _int_reg(f"{name}Reg")
+    )
+
+
+def _command(name):
+    return (
+        f'<Command Name="{name}" NameSpace="Standard">'
+        f'<pValue>{name}Reg</pValue><CommandValue>1</CommandValue></Command>'
+        + _int_reg(f"{name}Reg", cachable=False)
+    )
+
+
+def _string(name):
+    return _register(f"{name}Reg", "StringReg", "RO").replace(
+        f'<StringReg Name="{name}Reg">',
+        f'<StringReg Name="{name}" NameSpace="Standard">'
+    )
+
+
+_PIXEL_FORMATS = {name: get_pixel_format_code(name)
+                  for name in get_pixel_formats()}
+_ACQUISITION_MODES = {"Continuous": 0}
+_SWITCH = {"Off": 0, "On": 1}
+_TRIGGER_MODES = {"Off": 0, "On": 1}
+_TRIGGER_SOURCES = {"Software": 0}
+
+_FEATURES = [
+    _string("DeviceVendorName"),
+    _string("DeviceModelName"),
+    _string("DeviceSerialNumber"),
+    _integer("Width", 8, 16384, 8, locked=True),
+    _integer("Height", 8, 16384, 8, locked=True),
+    _enumeration("PixelFormat", _PIXEL_FORMATS, locked=True),
+    _integer("PayloadSize", 0, 2 ** 32 - 1, access="RO", cachable=False),
+    _integer("TLParamsLocked", 0, 1),
+    _enumeration("AcquisitionMode", _ACQUISITION_MODES),
+    _command("AcquisitionStart"),
+    _command("AcquisitionStop"),
+    _float("AcquisitionFrameRate", 0.1, 100000.0, "Hz"),
+    _float("ExposureTime", 1.0, 10000000.0, "us"),
+    _float("Gain", 0.0, 48.0, "dB"),
+    _enumeration("TriggerMode", _TRIGGER_MODES),
+    _enumeration("TriggerSource", _TRIGGER_SOURCES),
+    _command("TriggerSoftware"),
+    _command("TimestampLatch"),
+    _integer("TimestampLatchValue", 0, 2 ** 63 - 1, access="RO",
+             cachable=False),
+    _float("DeviceTemperature", -50.0, 150.0, "C", access="RO",
+           cachable=False),
+]
+
+_FEATURE_NAMES = [
+    name[:-3] for name in _REGISTERS if name not in _SEQUENCER_REGISTERS
+]
+
+
+def _sequencer_features(n_sets):
+    return [
+        _enumeration("SequencerMode", _SWITCH),
+        _enumeration("SequencerConfigurationMode", _SWITCH),
+        _integer("SequencerSetSelector", 0, n_sets - 1),
+        _command("SequencerSetSave"),
+        _integer("SequencerSetNext", 0, n_sets - 1),
+        _integer("SequencerSetStart", 0, n_sets - 1),
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def _xml(sequencer_sets):
+    """Get the XML description of a camera."""
+    features = list(_FEATURES)
+    names = list(_FEATURE_NAMES)
+    if sequencer_sets:
+        features += _sequencer_features(sequencer_sets)
+        names += [name[:-3] for name in _SEQUENCER_REGISTERS]
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<RegisterDescription ModelName="Emulator" VendorName="camazing" '
+        'ToolTip="Emulated camera" StandardNameSpace="None" '
+        'SchemaMajorVersion="1" SchemaMinorVersion="1" SchemaSubMinorVersion="0" '
+        'MajorVersion="1" MinorVersion="0" SubMinorVersion="0" '
+        'ProductGuid="5a0bd2a8-2e3c-4fcb-9d35-4a4fb1bd5c10" '
+        'VersionGuid="8cf0c5e5-3d1e-4ad6-8a26-0c1c8f0b3d21" '
+        'xmlns="http://www.genicam.org/GenApi/Version_1_1" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        'xsi:schemaLocation="http://www.genicam.org/GenApi/Version_1_1 '
+        'http://www.genicam.org/GenApi/GenApiSchema_Version_1_1.xsd">'
+        '<Category Name="Root" NameSpace="Standard">'
+        + "".join(f"<pFeature>{name}</pFeature>" for name in names)
+        + '</Category>'
+        + "".join(features)
+        + '<Port Name="Device" NameSpace="Standard"/>'
+        '</RegisterDescription>'
+    ).encode("utf8")
+
+
+class _URLInfo:
+
+    def __init__(self, url):
+        self.url = url
+
+
+class _RemotePort:
+    """Remote port of an emulated device, giving access to its registers."""
+
+    name = "Device"
+
+    def __init__(self, device):
+        self._device = device
+        self.url_info_list = [_URLInfo(
+            f"local:camazing_emulator.xml;{_XML_ADDRESS:x};"
+            f"{len(device.xml):x}"
+        )]
+
+    def read(self, address, size):
+        return size, self._device._read(address, size)
+
+    def write(self, address, value):
+        self._device._write(address, bytes(value))
+
+
+def _payload_size(width, height, pixel_format):
+    channels = 3 if "RGB" in pixel_format else 1
+    itemsize = get_valid_range(pixel_format).dtype.itemsize
+    return width * height * channels * itemsize
+
+
+class _Device:
+    """The emulated hardware, shared by all handles of a device."""
+
+    _ids = itertools.count()
+
+    def __init__(self, spec):
+        self.spec = spec
+        # Unique like GenTL device IDs, unlike serial numbers.
+        self.id_ = f"Device{next(self._ids)}"
+        self._lock = threading.RLock()
+        self._memory = bytearray(0x4000)
+        self._clock_origin = time.perf_counter()
+        self._streams = []
+        self.acquiring = False
+        self.is_open = False
+        self.xml = _xml(spec.sequencer_sets)
+        # Saved sequencer sets as the values of the sequenced registers and
+        # the next set, and the set of the next frame.
+        self._sequencer_sets = [None] * spec.sequencer_sets
+        self._sequencer_set = 0
+        self.remote_port = _RemotePort(self)
+
+        self._set_string("DeviceVendorNameReg", "camazing")
+        self._set_string("DeviceModelNameReg", spec.model)
+        self._set_string("DeviceSerialNumberReg", spec.serial_number)
+        self._set("WidthReg", spec.width)
+        self._set("HeightReg", spec.height)
+        self._set("PixelFormatReg", _PIXEL_FORMATS[spec.pixel_format])
+        self._set_float("AcquisitionFrameRateReg", spec.frame_rate)
+        self._set_float("ExposureTimeReg", spec.exposure_time)
+        self._set_float("GainReg", spec.gain)
+
+        self._write_hooks = {
+            _REGISTERS["AcquisitionStartReg"][0]: self._acquisition_start,
+            _REGISTERS["AcquisitionStopReg"][0]: self._acquisition_stop,
+            _REGISTERS["TriggerSoftwareReg"][0]: self._trigger_software,
+            _REGISTERS["TimestampLatchReg"][0]: self._timestamp_latch,
+            _REGISTERS["SequencerSetSaveReg"][0]: self._sequencer_set_save,
+        }
+        self._read_hooks = {
+            _REGISTERS["PayloadSizeReg"][0]: self._update_payload_size,
+            _REGISTERS["DeviceTemperatureReg"][0]: self._update_temperature,
+        }
+
+    def _get(self, name):
+        address, length = _REGISTERS[name]
+        return int.from_bytes(self._memory[address:address + length],
+                              "little")
+
+    def _set(self, name, value):
+        address, length = _REGISTERS[name]
+        self._memory[address:address + length] = value.to_bytes(length,
+                                                                 "little")
+
+    def _get_float(self, name):
+        address, _ = _REGISTERS[name]
+        return struct.unpack_from("<d", self._memory, address)[0]
+
+    def _set_float(self, name, value):
+        address, _ = _REGISTERS[name]
+        struct.pack_into("<d", self._memory, address, value)
+
+    def _set_string(self, name, value):
+        address, length = _REGISTERS[name]
+        self._memory[address:address + length] = \
+            value.encode("ascii")[:length - 1].ljust(length, b"\0")
+
+    def _read(self, address, size):
+        if address >= _XML_ADDRESS:
+            offset = address - _XML_ADDRESS
+            return self.xml[offset:offset + size]
+        with self._lock:
+            hook = self._read_hooks.get(address)
+            if hook is not None:
+                hook()
+            return bytes(self._memory[address:address + size])
+
+    def _write(self, address, value):
+        with self._lock:
+            self._memory[address:address + len(value)] = value
+            hook = self._write_hooks.get(address)
+            if hook is not None:
+                hook()
+                # Commands are done immediately.
+                self._memory[address:address + len(value)] = bytes(len(value))
+
+    def timestamp(self):
+        """Device time in nanoseconds."""
+        elapsed = time.perf_counter() - self._clock_origin
+        return int(elapsed * (1 + self.spec.clock_drift) * 1e9)
+
+    @property
+    def pixel_format(self):
+        code = self._get("PixelFormatReg")
+        for name, value in _PIXEL_FORMATS.items():
+            if value == code:
+                return name
+
+    @property
+    def payload_size(self):
+        return _payload_size(self._get("WidthReg"), self._get("HeightReg"),
+                             self.pixel_format)
+
+    @property
+    def stream_ids(self):
+        return [f"Stream{i}" for i in range(len(self.spec.extra_streams) + 1)]
+
+    def layout(self, stream_index):
+        """Get the width, height, pixel format and payload size of the
+        frames of a data stream."""
+        if stream_index:
+            width, height, pixel_format = \
+                self.spec.extra_streams[stream_index - 1]
+            return (width, height, pixel_format,
+                    _payload_size(width, height, pixel_format))
+        with self._lock:
+            return (self._get("WidthReg"), self._get("HeightReg"),
+                    self.pixel_format, self.payload_size)
+
+    @property
+    def frame_rate(self):
+        return self._get_float("AcquisitionFrameRateReg")
+
+    @property
+    def software_triggered(self):
+        return self._get("TriggerModeReg") == _TRIGGER_MODES["On"]
+
+    def _update_payload_size(self):
+        self._set("PayloadSizeReg", self.payload_size)
+
+    def _update_temperature(self):
+        minutes = (time.perf_counter() - self._clock_origin) / 60
+        self._set_float("DeviceTemperatureReg",
+                        40.0 + 5.0 * math.sin(minutes))
+
+    def _acquisition_start(self):
+        self._sequencer_set = self._get("SequencerSetStartReg")
+        self.acquiring = True
+        for stream in self._streams:
+            stream._notify()
+
+    def _acquisition_stop(self):
+        self.acquiring = False
+        for stream in self._streams:
+            stream._notify()
+
+    def _trigger_software(self):
+        if self.acquiring and self.software_triggered:
+            for stream in self._streams:
+                stream._trigger()
+
+    def _timestamp_latch(self):
+        self._set("TimestampLatchValueReg", self.timestamp())
+
+    def _sequencer_set_save(self):
+        registers = {}
+        for name in _SEQUENCED_REGISTERS:
+            address, length = _REGISTERS[name]
+            registers[name] = bytes(self._memory[address:address + length])
+        self._sequencer_sets[self._get("SequencerSetSelectorReg")] = (
+            registers, self._get("SequencerSetNextReg")
+        )
+
+    def sequencer_step(self):
+        """Apply the sequencer set of a new frame, if the sequencer is on."""
+        with self._lock:
+            if self._get("SequencerModeReg") != _SWITCH["On"]:
+                return
+            saved = self._sequencer_sets[self._sequencer_set]
+            if saved is None:
+                return
+            registers, self._sequencer_set = saved
+            for name, value in registers.items():
+                address, length = _REGISTERS[name]
+                self._memory[address:address + length] = value
+
+
+class Buffer:
+    """An announced buffer of an emulated data stream."""
+
+    def __init__(self, size, user_data):
+        self._data = bytearray(size)
+        self.user_data = user_data
+        self.size = size
+        self.payload_type = PAYLOADTYPE_INFO_IDS.PAYLOAD_TYPE_IMAGE
+        self.width = 0
+        self.height = 0
+        self.pixel_format = 0
+        self.frame_id = 0
+        self.timestamp = 0
+        self.timestamp_ns = 0
+        self.size_filled = 0
+        self.delivered_image_height = 0
+        self._complete = False
+
+    @property
+    def raw_buffer(self):
+        return memoryview(self._data)
+
+    def is_complete(self):
+        return self._complete
+
+
+class BufferToken:
+    """Memory and user data of a buffer to be announced."""
+
+    def __init__(self, buffer, user_data):
+        self.buffer = buffer
+        self.user_data = user_data
+
+
+class _EventQueue:
+    """Queue of new buffer events of a data stream."""
+
+    def __init__(self):
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+
+    def put(self, buffer):
+        with self._condition:
+            self._queue.append(buffer)
+            self._condition.notify()
+
+    def get(self, timeout):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._queue, timeout):
+                raise TimeoutException("No new buffer within the timeout.")
+            return self._queue.popleft()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def clear(self):
+        with self._condition:
+            buffers = list(self._queue)
+            self._queue.clear()
+            return buffers
+
+
+class EventManagerNewBuffer:
+    """Stand-in for `genicam2.gentl.EventManagerNewBuffer`."""
+
+    def __init__(self, event_token):
+        self._queue = event_token
+        self.buffer = None
+
+    @property
+    def num_in_queue(self):
+        return len(self._queue)
+
+    def update_event_data(self, timeout):
+        """Wait for the next filled buffer.
+
+        Parameters
+        ----------
+        timeout : int
+            Timeout in milliseconds.
+
+        Raises
+        ------
+        TimeoutException
+            If no buffer is filled within the timeout.
+        """
+        self.buffer = self._queue.get(timeout / 1000)
+
+    def flush_event_queue(self):
+        self._queue.clear()
+
+    def unregister_event(self):
+        self._queue.clear()
+
+
+class _Patterns:
+    """Precomputed synthetic images, cycled from frame to frame."""
+
+    N_PATTERNS = 8
+
+    def __init__(self, width, height, pixel_format):
+        valid_range = get_valid_range(pixel_format)
+        dtype = valid_range.dtype
+        maximum = int(valid_range[1])
+        y, x = np.mgrid[0:height, 0:width]
+        self.images = []
+        for k in range(self.N_PATTERNS):
+            image = ((x + y + 16 * k) * (maximum // 255 or 1)) % (maximum + 1)
+            image = image.astype(dtype)
+            if "RGB" in pixel_format:
+                image = np.stack([image, image[::-1], image[:, ::-1]], -1)
+            self.images.append(image.tobytes())
+
+
+class DataStream:
+    """An emulated GenTL data stream."""
+
+    def __init__(self, device):
+        self._device = device
+        self._buffers = []
+        self._input = collections.deque()
+        self._events = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._triggers = 0
+        self.num_underrun = 0
+        self.num_delivered = 0
+        self.buffer_announce_min = 4
+
+    def open(self, stream_id):
+        self.id_ = stream_id
+        self._index = self._device.stream_ids.index(stream_id)
+        self._device._streams.append(self)
+
+    def close(self):
+        self.stop_acquisition(ACQ_STOP_FLAGS_LIST.ACQ_STOP_FLAGS_KILL)
+        if self in self._device._streams:
+            self._device._streams.remove(self)
+
+    def register_event(self, event_type):
+        self._events = _EventQueue()
+        return self._events
+
+    def defines_payload_size(self):
+        return True
+
+    @property
+    def payload_size(self):
+        return self._device.layout(self._index)[3]
+
+    @property
+    def num_announced(self):
+        return len(self._buffers)
+
+    @property
+    def num_queued(self):
+        return len(self._input)
+
+    @property
+    def num_awaiting_delivery(self):
+        return len(self._events) if self._events is not None else 0
+
+    @property
+    def is_grabbing(self):
+        return self._running
+
+    def announce_buffer(self, buffer_token):
+        buffer = Buffer(len(buffer_token.buffer), buffer_token.user_data)
+        self._buffers.append(buffer)
+        return buffer
+
+    def revoke_buffer(self, buffer):
+        with self._condition:
+            if buffer in self._input:
+                self._input.remove(buffer)
+        self._buffers.remove(buffer)
+
+    def queue_buffer(self, buffer):
+        with self._condition:
+            if not any(b is buffer for b in self._input):
+                self._input.append(buffer)
+
+    def flush_buffer_queue(self, queue_type):
+        with self._condition:
+            if queue_type == ACQ_QUEUE_TYPE_LIST.ACQ_QUEUE_INPUT_TO_OUTPUT:
+                while self._input:
+                    self._events.put(self._input.popleft())
+            elif queue_type == ACQ_QUEUE_TYPE_LIST.ACQ_QUEUE_OUTPUT_DISCARD:
+                self._events.clear()
+            elif queue_type in (ACQ_QUEUE_TYPE_LIST.ACQ_QUEUE_ALL_TO_INPUT,
+                                ACQ_QUEUE_TYPE_LIST.ACQ_QUEUE_UNQUEUED_TO_INPUT):
+                self._events.clear()
+                self._input = collections.deque(self._buffers)
+            elif queue_type == ACQ_QUEUE_TYPE_LIST.ACQ_QUEUE_ALL_DISCARD:
+                self._events.clear()
+                self._input.clear()
+
+    def start_acquisition(self, flags):
+        if self._running:
+            return
+        self._running = True
+        self._triggers = 0
+        self._thread = threading.Thread(
+            target=self._run, name=f"emulator-{self._device.spec.serial_number}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop_acquisition(self, flags):
+        if not self._running:
+            return
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+        self._thread = None
+
+    def _notify(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def _trigger(self):
+        with self._condition:
+            self._triggers += 1
+            self._condition.notify_all()
+
+    def _run(self):
+        """Produce frames until the acquisition is stopped."""
+        device = self._device
+        spec = device.spec
+        rng = random.Random(spec.seed)
+        patterns = {}
+        pending = collections.deque()  # Frames waiting for delivery.
+        frame_id = 0
+        next_frame = time.perf_counter()
+
+        while True:
+            with self._condition:
+                now = time.perf_counter()
+                # Deliver frames whose latency has passed.
+                while pending and pending[0][0] <= now:
+                    self._events.put(pending.popleft()[1])
+                    self.num_delivered += 1
+
+                if not self._running:
+                    return
+
+                ready = False
+                if device.acquiring:
+                    if device.software_triggered:
+                        if self._triggers:
+                            self._triggers -= 1
+                            ready = True
+                    elif now >= next_frame:
+                        ready = True
+                        # Don't try to catch up if the producer has fallen
+                        # behind by more than a frame.
+                        period = 1 / device.frame_rate
+                        next_frame = max(next_frame + period, now - period)
+                else:
+                    next_frame = now
+
+                if not ready:
+                    timeouts = [0.1]
+                    if pending:
+                        timeouts.append(pending[0][0] - now)
+                    if device.acquiring and not device.software_triggered:
+                        timeouts.append(next_frame - now)
+                    self._condition.wait(max(min(timeouts), 0))
+                    continue
+
+                frame_id += 1
+                if self._index == 0:
+                    device.sequencer_step()
+                if rng.random() < spec.drop_rate:
+                    continue
+                if not self._input:
+                    self.num_underrun += 1
+                    continue
+                buffer = self._input.popleft()
+
+            width, height, pixel_format, payload_size = \
+                device.layout(self._index)
+
+            key = (width, height, pixel_format)
+            if key not in patterns:
+                patterns[key] = _Patterns(width, height, pixel_format)
+            image = patterns[key].images[frame_id % _Patterns.N_PATTERNS]
+
+            filled = min(payload_size, buffer.size)
+            complete = filled == payload_size
+            if rng.random() < spec.incomplete_rate:
+                filled = filled // 2
+                complete = False
+            buffer._data[:filled] = image[:filled]
+
+            buffer.width = width
+            buffer.height = height
+            buffer.pixel_format = _PIXEL_FORMATS[pixel_format]
+            buffer.frame_id = frame_id
+            buffer.timestamp = buffer.timestamp_ns = device.timestamp()
+            buffer.size_filled = filled
+            buffer.delivered_image_height = (
+                filled // (payload_size // height) if payload_size else 0
+            )
+            buffer._complete = complete
+
+            pending.append((time.perf_counter() + spec.latency, buffer))
+
+
+class Device:
+    """A handle to an emulated device."""
+
+    def __init__(self, device, device_info):
+        self._device = device
+        self._info = device_info
+        self.data_stream_ids = device.stream_ids
+        self.timestamp_frequency = 1000000000
+
+    def __getattr__(self, name):
+        # Device info attributes (vendor, model, ...) are available also
+        # through the device.
+        return getattr(self._info, name)
+
+    def open(self, flags):
+        if self._device.is_open:
+            raise RuntimeError("Device is already open.")
+        self._device.is_open = True
+
+    def close(self):
+        self._device.is_open = False
+
+    def is_open(self):
+        return self._device.is_open
+
+    @property
+    def remote_port(self):
+        return self._device.remote_port
+
+    def create_data_stream(self):
+        return DataStream(self._device)
+
+
+class DeviceInfo:
+    """Information about an emulated device."""
+
+    def __init__(self, device, interface_id):
+        spec = device.spec
+        self._device = device
+        self.vendor = "camazing"
+        self.model = spec.model
+        self.serial_number = spec.serial_number
+        self.user_defined_name = spec.serial_number
+        self.display_name = f"{spec.model} ({spec.serial_number})"
+        self.id_ = f"{interface_id}::{device.id_}"
+        self.tl_type = "Custom"
+        self.version = "1.0"
+
+    def create_device(self):
+        return Device(self._device, self)
+
+
+class Interface:
+    """An emulated interface, to which the emulated cameras are attached.
+
+    Devices can be removed from and added to `devices` to emulate
+    disconnecting and connecting cameras.
+    """
+
+    def __init__(self, interface_id, devices):
+        self.id_ = interface_id
+        self.display_name = f"Emulated interface {interface_id}"
+        self.tl_type = "Custom"
+        self.devices = devices
+        self._open = False
+        self.device_info_list = []
+
+    def is_open(self):
+        return self._open
+
+    def open(self):
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def update_device_info_list(self, timeout):
+        self.device_info_list = [
+            DeviceInfo(device, self.id_) for device in self.devices
+        ]
+
+
+class InterfaceInfo:
+
+    def __init__(self, interface):
+        self._interface = interface
+        self.id_ = interface.id_
+
+    def create_interface(self):
+        return self._interface
+
+
+class System:
+    """The emulated GenTL system."""
+
+    display_name = "camazing emulator"
+
+    def __init__(self, interfaces):
+        self._interfaces = interfaces
+        self.interface_info_list = []
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def update_interface_info_list(self, timeout):
+        self.interface_info_list = [
+            InterfaceInfo(interface) for interface in self._interfaces
+        ]
+
+
+class GenTLProducer:
+    """The emulated GenTL producer."""
+
+    def __init__(self, interfaces):
+        self._interfaces = interfaces
+
+    def open(self, cti_file):
+        pass
+
+    def close(self):
+        pass
+
+    def get_compliant_version(self):
+        return "1.5"
+
+    def create_system(self):
+        return System(self._interfaces)
+
+
+class _ProducerFactory:
+
+    def __init__(self, interfaces):
+        self._interfaces = interfaces
+
+    def create_producer(self):
+        return GenTLProducer(self._interfaces)
+
+
+class EmulatedGenTL:
+    """A stand-in for the `genicam2.gentl` module serving emulated cameras.
+
+    Pass an instance as the `gentl` argument of `CameraList`.
+    """
+
+    EVENT_TYPE_LIST = EVENT_TYPE_LIST
+    ACQ_START_FLAGS_LIST = ACQ_START_FLAGS_LIST
+    ACQ_STOP_FLAGS_LIST = ACQ_STOP_FLAGS_LIST
+    ACQ_QUEUE_TYPE_LIST = ACQ_QUEUE_TYPE_LIST
+    PAYLOADTYPE_INFO_IDS = PAYLOADTYPE_INFO_IDS
+    DEVICE_ACCESS_FLAGS_LIST = DEVICE_ACCESS_FLAGS_LIST
+    TimeoutException = TimeoutException
+    EventManagerNewBuffer = EventManagerNewBuffer
+    BufferToken = BufferToken
+
+    def __init__(self, cameras=None, n_interfaces=1):
+        """Initialize the emulated transport layer.
+
+        Parameters
+        ----------
+        cameras : list of EmulatedCamera, optional
+            Cameras to emulate. By default a single camera with default
+            settings is emulated.
+        n_interfaces : int, optional
+            Number of interfaces, among which the cameras are distributed.
+        """
+        if cameras is None:
+            cameras = [EmulatedCamera()]
+        devices = [_Device(spec) for spec in cameras]
+        self.interfaces = [
+            Interface(f"EmulatedInterface{i}", devices[i::n_interfaces])
+            for i in range(n_interfaces)
+        ]
+        self.GenTLProducer = _ProducerFactory(self.interfaces)
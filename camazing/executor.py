@@ -0,0 +1,212 @@
+"""Per-frame analysis on a pool of processes.
+
+Frames are passed to the worker processes through a shared memory ring (see
+`camazing.sharedmem`), so only the sequence number of a frame and the result
+of the analysis are pickled.
+"""
+
+import collections
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from camazing.sharedmem import FramePublisher, FrameSubscriber
+
+logger = logging.getLogger(__name__)
+
+FrameResult = collections.namedtuple("FrameResult", ["result", "meta"])
+FrameResult.__doc__ = """Result of a function applied to a frame.
+
+Attributes
+----------
+result
+    Return value of the function.
+meta : dict
+    Metadata of the frame, such as its `timestamp` and `frame_id`.
+"""
+
+# Subscribers of the worker processes, by shared memory name.
+_subscribers = {}
+
+
+def _apply(function, name, sequence):
+    """Apply a function to a frame in shared memory, in a worker process."""
+    subscriber = _subscribers.get(name)
+    if subscriber is None:
+        subscriber = _subscribers[name] = FrameSubscriber(name)
+    frame = subscriber.read(sequence)
+    return FrameResult(function(frame.data, frame.meta), frame.meta)
+
+
+class FrameExecutor:
+    """Maps a function over frames on a pool of processes.
+
+    Results are returned in the order of the frames. A frame stays in shared
+    memory until its result is ready, so at most `n_slots` frames are being
+    processed at a time. When that many are in progress, `submit` either
+    waits for the oldest one or drops the new frame, depending on
+    `backpressure`. Results are kept until they are taken with `results` or
+    `map`.
+
+    Examples
+    --------
+    >>> def brightest(data, meta):
+    ...     return data.argmax()
+    ...
+    >>> with FrameExecutor(brightest) as executor:
+    ...     for result in executor.map(camera.get_frame() for _ in range(100)):
+    ...         print(result.meta["frame_id"], result.result)
+    """
+
+    def __init__(self, function, max_workers=None, n_slots=None,
+                 backpressure="block"):
+        """Start the worker processes.
+
+        Parameters
+        ----------
+        function : callable
+            Function called as ``function(data, meta)`` for every frame, where
+            `data` is a read-only `numpy.ndarray` and `meta` a dictionary of
+            the scalar coordinates of the frame. It must be picklable, e.g.
+            defined at the top level of a module.
+        max_workers : int, optional
+            Number of worker processes. Defaults to the number of CPUs.
+        n_slots : int, optional
+            Maximum number of frames being processed. Defaults to twice the
+            number of workers.
+        backpressure : {'block', 'drop'}, optional
+            Whether `submit` waits for a free slot or drops the frame when
+            all slots are in use.
+
+        Raises
+        ------
+        ValueError
+            If `backpressure` is invalid.
+        """
+        if backpressure not in ("block", "drop"):
+            raise ValueError(
+                f"Expected `backpressure` to be 'block' or 'drop', but got "
+                f"{backpressure!r}."
+            )
+        max_workers = max_workers or os.cpu_count() or 1
+        self._function = function
+        self._pool = ProcessPoolExecutor(max_workers)
+        self._n_slots = n_slots or 2 * max_workers
+        self._backpressure = backpressure
+        self._publisher = None
+        # Futures of all frames whose results have not been taken, and of
+        # the ones which may still be reading the shared memory.
+        self._pending = collections.deque()
+        self._in_flight = collections.deque()
+        self.dropped = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.shutdown()
+
+    @property
+    def pending(self):
+        """Number of frames submitted whose results have not been taken."""
+        return len(self._pending)
+
+    def submit(self, frame):
+        """Publish a frame to the workers.
+
+        The shared memory ring is created for the first frame, and later
+        frames must have the same shape and type.
+
+        Parameters
+        ----------
+        frame : xarray.DataArray or numpy.ndarray
+            The frame.
+
+        Returns
+        -------
+        bool
+            `False` if the frame was dropped because of backpressure.
+        """
+        if self._publisher is None:
+            # One slot more than can be pending, so that the slot being
+            # written never holds a frame that a worker may still read.
+            self._publisher = FramePublisher.for_frame(
+                frame, n_slots=self._n_slots + 1
+            )
+
+        in_flight = self._in_flight
+        while in_flight and in_flight[0].done():
+            in_flight.popleft()
+        if len(in_flight) >= self._n_slots:
+            if self._backpressure == "drop":
+                self.dropped += 1
+                return False
+            # Waits for the frame without raising its exception.
+            in_flight.popleft().exception()
+
+        sequence = self._publisher.publish(frame)
+        future = self._pool.submit(
+            _apply, self._function, self._publisher.name, sequence
+        )
+        self._pending.append(future)
+        in_flight.append(future)
+        return True
+
+    def results(self, wait=False):
+        """Get the results of the processed frames in order.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Whether to wait for all the submitted frames, or to stop at the
+            first one still being processed.
+
+        Yields
+        ------
+        FrameResult
+            Result of the function and metadata of the frame.
+
+        Raises
+        ------
+        Exception
+            Any exception raised by the function.
+        """
+        pending = self._pending
+        while pending and (wait or pending[0].done()):
+            yield pending.popleft().result()
+
+    def map(self, frames):
+        """Apply the function to frames, yielding results as they are ready.
+
+        Parameters
+        ----------
+        frames : iterable
+            Frames, e.g. from `Camera.get_frame`.
+
+        Yields
+        ------
+        FrameResult
+            Result of the function and metadata of each frame, in order.
+            Dropped frames are skipped.
+        """
+        for frame in frames:
+            self.submit(frame)
+            yield from self.results()
+        yield from self.results(wait=True)
+
+    def shutdown(self):
+        """Stop the worker processes and free the shared memory.
+
+        Results that have not been taken are discarded.
+        """
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._in_flight.clear()
+        self._pool.shutdown()
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher.unlink()
+            self._publisher = None
+        if self.dropped:
+            logger.info(f"{self.dropped} frames dropped by backpressure.")
@@ -1,9 +1,15 @@
 import abc
+import itertools
+import logging
+import weakref
 
-from genicam2.genapi import IBoolean, IEnumeration, IInteger, IFloat, \
-                            IString, ICommand
 from .util import to_bool
 
+logger = logging.getLogger(__name__)
+
+# Handles of the subscriptions of all features.
+_handles = itertools.count()
+
 
 class AccessModeError(Exception):
     pass
@@ -23,7 +29,13 @@ class Feature(abc.ABC):
         self._feature = feature
         self.name = feature.node.display_name
         self.description = feature.node.description
-        self._exclude_from_info = ['info']
+        self._exclude_from_info = ['info', 'subscribe', 'unsubscribe',
+                                   'invalidate']
+        # Callbacks subscribed to changes, by handle.
+        self._subscribers = {}
+        self._registered = False
+        self._is_selector = None
+
     def _getinfo(self, attr):
             try:
                 return self.__getattribute__(attr)
@@ -59,6 +71,116 @@ class Feature(abc.ABC):
         else:
             raise Exception("Unexpected access mode")
 
+    @property
+    def is_selector(self):
+        """Whether the feature selects which instance of other features is
+        accessed, e.g. `GainSelector`.
+
+        Returns
+        -------
+        bool
+            `True` if the feature is a selector.
+        """
+        # Given by the camera description, so it never changes.
+        if self._is_selector is None:
+            self._is_selector = self._feature.node.is_selector()
+        return self._is_selector
+
+    def invalidate(self):
+        """Discard the value cached by GenApi.
+
+        The next read of the feature reads the device, and the subscribers
+        of the feature are notified.
+        """
+        self._feature.node.invalidate_node()
+
+    def subscribe(self, callback):
+        """Call a function whenever the feature may have changed.
+
+        GenApi notifies of a change when the feature is written, when a
+        feature it depends on is written (e.g. a selector), and when it is
+        invalidated by polling (see `camazing.notifications.FeatureChanges`).
+        The value itself is not read, so a notification doesn't always mean
+        that the value is different.
+
+        The callback runs in the thread that caused the change, while GenApi
+        holds the lock of the node map, so it should return quickly and must
+        not write features. Exceptions raised by it are logged and ignored.
+
+        Parameters
+        ----------
+        callback : callable
+            Function called with the feature as its only argument.
+
+        Returns
+        -------
+        int
+            Handle for `unsubscribe`.
+
+        Examples
+        --------
+        >>> handle = camera["Gain"].subscribe(lambda f: print(f.name))
+        >>> camera["Gain"].value = 6.0
+        Gain
+        >>> camera["Gain"].unsubscribe(handle)
+        """
+        if not self._registered:
+            from genicam2 import genapi
+
+            # A single GenApi callback per node dispatches to the
+            # subscribers. It can't be deregistered (see `unsubscribe`), so
+            # it only holds a weak reference to the wrapper.
+            genapi.register(self._feature.node, _notifier(self))
+            self._registered = True
+        handle = next(_handles)
+        self._subscribers[handle] = callback
+        return handle
+
+    def unsubscribe(self, handle):
+        """Stop calling a function subscribed with `subscribe`.
+
+        The callback is forgotten right away. The GenApi callback that
+        dispatches to the subscribers stays registered until the node map is
+        disconnected, because the handles returned by the genicam2 bindings
+        are truncated and can't be used to deregister it. Without
+        subscribers it does nothing, and it holds no reference to the
+        feature or to the callbacks.
+
+        Parameters
+        ----------
+        handle : int
+            Handle returned by `subscribe`.
+
+        Raises
+        ------
+        KeyError
+            If there is no subscription with the handle.
+        """
+        del self._subscribers[handle]
+
+    def _notify(self, node):
+        """Call the subscribers of the feature."""
+        for callback in list(self._subscribers.values()):
+            try:
+                callback(self)
+            except Exception:
+                logger.exception(
+                    f"A subscriber of '{self.name}' raised an exception."
+                )
+
+
+def _notifier(feature):
+    """Make a GenApi callback notifying the subscribers of a feature."""
+    ref = weakref.ref(feature)
+
+    def notify(node):
+        feature = ref()
+        if feature is not None:
+            feature._notify(node)
+
+    return notify
+
+
 class Bounded(abc.ABC):
     """A base class for features that are numeric values."""
 
@@ -108,8 +230,25 @@ class Valuable(Feature, abc.ABC):
         Feature.__init__(self, feature)
 
     @abc.abstractmethod
-    def _set_value(self):
-        pass
+    def _convert(self, value):
+        """Convert a value to the type of the feature and validate it.
+
+        Raises
+        ------
+        ValueError
+            If the value is invalid in any way.
+        """
+
+    def _read(self):
+        """Read the value without checking the access mode."""
+        return self._feature.value
+
+    def _write(self, value):
+        """Write a value returned by `_convert`."""
+        self._feature.value = value
+
+    def _set_value(self, value):
+        self._write(self._convert(value))
 
     @property
     def value(self):
@@ -171,9 +310,8 @@ class Boolean(Valuable):
     def __init__(self, feature):
         Valuable.__init__(self, feature)
 
-    def _set_value(self, value):
-        value = to_bool(value)
-        self._feature.value = value
+    def _convert(self, value):
+        return to_bool(value)
 
 
 class Command(Feature):
@@ -193,11 +331,11 @@ class Enumeration(Valuable):
     def __init__(self, feature):
         Valuable.__init__(self, feature)
 
-    def _set_value(self, value):
+    def _convert(self, value):
         if value not in self.valid_values:
             raise ValueError(f"'{self.name}' expected one of "
                              f"{self.valid_values} but got {value}.")
-        self._feature.value = value
+        return value
 
     @property
     def valid_values(self):
@@ -218,10 +356,10 @@ class Integer(Valuable, Bounded):
     def __init__(self, feature):
         Valuable.__init__(self, feature)
 
-    def _set_value(self, value):
+    def _convert(self, value):
         value = int(value)
         self._check_if_in_range(value)
-        self._feature.value = value
+        return value
 
     @property
     def increment(self):
@@ -241,10 +379,10 @@ class Float(Valuable, Bounded):
     def __init__(self, feature):
         Valuable.__init__(self, feature)
 
-    def _set_value(self, value):
+    def _convert(self, value):
         value = float(value)
         self._check_if_in_range(value)
-        self._feature.value = value
+        return value
 
     @property
     def unit(self):
@@ -265,16 +403,26 @@ class String(Valuable):
     def __init__(self, feature):
         Valuable.__init__(self, feature)
 
-    def _set_value(self, value):
-        value = str(value)
-        self._feature.value = value
-
-
-mapping = {
-    IBoolean: Boolean,
-    IEnumeration: Enumeration,
-    IInteger: Integer,
-    IFloat: Float,
-    IString: String,
-    ICommand: Command
-}
+    def _convert(self, value):
+        return str(value)
+
+
+def __getattr__(name):
+    """Create `mapping` from genicam2 types to wrappers on first access.
+
+    Deferring it avoids importing genicam2 together with camazing.
+    """
+    global mapping
+    if name == "mapping":
+        from genicam2.genapi import IBoolean, IEnumeration, IInteger, \
+                                    IFloat, IString, ICommand
+        mapping = {
+            IBoolean: Boolean,
+            IEnumeration: Enumeration,
+            IInteger: Integer,
+            IFloat: Float,
+            IString: String,
+            ICommand: Command
+        }
+        return mapping
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,140 @@
+"""Compact columnar log of per-frame metadata."""
+
+import numpy as np
+
+# Bits of the `flags` field.
+FLAG_INCOMPLETE = 1
+FLAG_FRAMES_LOST = 2
+
+_BASE_FIELDS = [
+    ("frame_id", np.int64),
+    ("device_timestamp", np.uint64),
+    ("host_timestamp", np.float64),
+    ("flags", np.uint8),
+]
+
+
+class FrameLog:
+    """Append-only log of frame metadata in a structured numpy array.
+
+    The records are stored in preallocated chunks, so appending never copies
+    earlier records. A missing `frame_id` is stored as -1, and missing
+    feature values as NaN.
+
+    Attributes
+    ----------
+    dtype : numpy.dtype
+        Structured type of the records: `frame_id`, `device_timestamp` in
+        nanoseconds, `host_timestamp` in seconds since the epoch, `flags`
+        (`FLAG_INCOMPLETE` and `FLAG_FRAMES_LOST`) and one `float64` field
+        for every feature.
+
+    Examples
+    --------
+    >>> log = FrameLog(features=("ExposureTime", "Gain"))
+    >>> log.append(0, 1234567, 1612345678.9, values=(1000.0, 6.0))
+    >>> log.array()["ExposureTime"]
+    array([1000.])
+    """
+
+    def __init__(self, features=(), chunk_size=65536):
+        """Create an empty log.
+
+        Parameters
+        ----------
+        features : sequence of str, optional
+            Names of the numeric features logged with each frame.
+        chunk_size : int, optional
+            Number of records allocated at a time.
+        """
+        self.features = tuple(features)
+        self.dtype = np.dtype(
+            _BASE_FIELDS + [(name, np.float64) for name in self.features]
+        )
+        self._chunk_size = chunk_size
+        self._chunks = []
+        self._n = chunk_size  # Records in the latest chunk.
+        self._full = 0  # Records in the earlier chunks.
+
+    def __len__(self):
+        return self._full + (self._n if self._chunks else 0)
+
+    def append(self, frame_id, device_timestamp, host_timestamp,
+               complete=True, frames_lost=0, values=()):
+        """Add the record of a frame.
+
+        Parameters
+        ----------
+        frame_id : int or None
+            Frame ID reported by the producer.
+        device_timestamp : int or None
+            Timestamp of the buffer in nanoseconds.
+        host_timestamp : float
+            Time when the frame was received in seconds since the epoch.
+        complete : bool, optional
+            Whether the buffer was filled completely.
+        frames_lost : int, optional
+            Number of frames lost right before this one.
+        values : sequence of float, optional
+            Values of the features, in the order of `features`.
+        """
+        if self._n == self._chunk_size:
+            if self._chunks:
+                self._full += self._chunk_size
+            self._chunks.append(np.empty(self._chunk_size, self.dtype))
+            self._n = 0
+        self._chunks[-1][self._n] = (
+            -1 if frame_id is None else frame_id,
+            device_timestamp or 0,
+            host_timestamp,
+            (0 if complete else FLAG_INCOMPLETE) |
+            (FLAG_FRAMES_LOST if frames_lost else 0),
+            *(np.nan if value is None else value for value in values),
+        )
+        self._n += 1
+
+    def array(self):
+        """Get the records as one array.
+
+        Returns
+        -------
+        numpy.ndarray
+            A copy of the records, with the structured type `dtype`.
+        """
+        if not self._chunks:
+            return np.empty(0, self.dtype)
+        return np.concatenate(self._chunks[:-1] + [self._chunks[-1][:self._n]])
+
+    def to_dataframe(self):
+        """Get the records as a pandas DataFrame.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per frame and one column per field.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.array())
+
+    def save(self, path):
+        """Export the records to a `.npz` file, one array per field.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file.
+
+        Examples
+        --------
+        >>> log.save("run.npz")
+        >>> np.load("run.npz")["host_timestamp"]
+        """
+        records = self.array()
+        np.savez(path, **{name: records[name] for name in self.dtype.names})
+
+    def clear(self):
+        """Remove all the records."""
+        self._chunks = []
+        self._n = self._chunk_size
+        self._full = 0
@@ -0,0 +1,83 @@
+"""Wrapping of decoded images into labeled frames."""
+
+
+def wrap_frame(data, pixel_format, valid_range, coords=None, attrs=None):
+    """Wrap a decoded image into a labeled frame.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Decoded image, with the colour channels (if any) in the last axis.
+    pixel_format : str
+        GenICam pixel format of the image.
+    valid_range : numpy.ndarray
+        Range of valid values for the pixel format.
+    coords : dict, optional
+        Scalar coordinates (e.g. timestamp and metadata features) to attach
+        to the frame.
+    attrs : dict, optional
+        Additional attributes of the frame, such as its statistics.
+
+    Returns
+    -------
+    xarray.DataArray
+        The frame, with dimensions `y`, `x` and `colour` for colour images.
+    """
+    # Imported here, as importing xarray takes longer than anything else
+    # when importing camazing.
+    import numpy as np
+    import xarray as xr
+
+    height, width = data.shape[0], data.shape[1]
+    frame_coords = {
+        "x": ("x", np.arange(0, width) + 0.5),
+        "y": ("y", np.arange(0, height) + 0.5),
+    }
+
+    if 'RGB' in pixel_format:
+        dims = ('y', 'x', 'colour')
+        frame_coords['colour'] = list('RGB')
+    elif 'YUV' in pixel_format:
+        dims = ('y', 'x', 'colour')
+        frame_coords['colour'] = list('YUV')
+    elif 'YCbCr' in pixel_format:
+        dims = ('y', 'x', 'colour')
+        frame_coords['colour'] = ['Y', 'Cb', 'Cr']
+    else:
+        dims = ('y', 'x')
+
+    if coords:
+        frame_coords.update(coords)
+
+    return xr.DataArray(
+        data,
+        name="frame",
+        dims=dims,
+        coords=frame_coords,
+        attrs={
+            'valid_range': valid_range,
+            **(attrs or {}),
+            }
+    )
+
+
+def frame_metadata(frame):
+    """Get the scalar coordinates of a frame as JSON-compatible values.
+
+    Parameters
+    ----------
+    frame : xarray.DataArray
+        A frame, e.g. from `Camera.get_frame`.
+
+    Returns
+    -------
+    dict
+        Names and values of the scalar coordinates, such as `timestamp`,
+        `frame_id` and the metadata features.
+    """
+    meta = {}
+    for name, coord in frame.coords.items():
+        if coord.ndim == 0:
+            value = coord.values.item()
+            meta[name] = value.decode() if isinstance(value, bytes) else value
+    return meta
@@ -0,0 +1,105 @@
+"""Per-frame histogram and saturation statistics.
+
+The histogram is counted with `numpy.bincount` over the integer pixel values,
+optionally of every `subsample`:th pixel along both axes. The mean, the
+percentiles and the fraction of saturated pixels are derived from the
+histogram, so the image is read only once.
+"""
+
+import numpy as np
+
+# Number of pixels counted at a time.
+_BLOCK_SIZE = 1 << 16
+
+
+def image_statistics(data, valid_range, subsample=1,
+                     percentiles=(1, 50, 99)):
+    """Compute the histogram and statistics of an image.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Decoded image of type `uint8` or `uint16`, with the colour channels
+        (if any) in the last axis.
+    valid_range : numpy.ndarray
+        Range of valid values for the pixel format, see
+        `camazing.pixelformats.get_valid_range`. Its maximum is the
+        saturation level.
+    subsample : int, optional
+        Use every `subsample`:th pixel along both axes.
+    percentiles : sequence of float, optional
+        Percentiles to compute, between 0 and 100.
+
+    Returns
+    -------
+    dict
+        `histogram` with one bin per value from 0 to the maximum of
+        `valid_range`, `mean`, `percentiles` as a dictionary, the fraction
+        of `saturated` pixels and the number of `pixels` counted. For colour
+        images, the histogram has one row per channel and the other values
+        are arrays with one value per channel.
+
+    Raises
+    ------
+    ValueError
+        If `data` is not of type `uint8` or `uint16`.
+
+    Examples
+    --------
+    >>> stats = image_statistics(frame.values, frame.attrs["valid_range"],
+    ...                          subsample=4)
+    >>> stats["saturated"]
+    0.0021
+    """
+    if data.dtype not in (np.uint8, np.uint16):
+        raise ValueError(
+            f"Expected an image of type uint8 or uint16, but got {data.dtype}."
+        )
+
+    maximum = int(valid_range[1])
+    n_bins = maximum + 1
+    view = data[::subsample, ::subsample]
+    n_channels = view.shape[2] if view.ndim == 3 else 1
+    # The values of each channel are counted in their own range of bins.
+    offsets = np.arange(n_channels) * n_bins if n_channels > 1 else None
+
+    # Counting in blocks of rows keeps the temporary arrays of `bincount`
+    # in the CPU cache.
+    rows = max(1, _BLOCK_SIZE // (view.shape[1] * n_channels))
+    counts = np.zeros(n_channels * n_bins, np.intp)
+    for start in range(0, view.shape[0], rows):
+        block = view[start:start + rows]
+        if offsets is not None:
+            block = np.minimum(block, maximum).astype(np.intp)
+            block += offsets
+        block = np.bincount(block.reshape(-1), minlength=counts.size)
+        # Values over the valid range (e.g. garbage bits of a packed
+        # format) are counted as saturated.
+        counts[-1] += block[counts.size:].sum()
+        counts += block[:counts.size]
+    histogram = counts.reshape(n_channels, n_bins) if offsets is not None \
+        else counts
+
+    pixels = histogram.sum(axis=-1)
+    cumulative = np.cumsum(histogram, axis=-1)
+    levels = np.arange(n_bins)
+    mean = (histogram @ levels) / pixels
+
+    # Nearest-rank percentiles, found from the cumulative histogram.
+    result = {}
+    for q in percentiles:
+        rank = np.clip(np.ceil(q / 100 * pixels), 1, None)
+        if cumulative.ndim == 2:
+            result[q] = np.array([
+                np.searchsorted(c, r) for c, r in zip(cumulative, rank)
+            ])
+        else:
+            result[q] = int(np.searchsorted(cumulative, rank))
+
+    return {
+        "histogram": histogram,
+        "mean": mean,
+        "percentiles": result,
+        "saturated": histogram[..., maximum] / pixels,
+        "pixels": pixels,
+    }
@@ -0,0 +1,340 @@
+"""Low-overhead instrumentation of the image acquisition."""
+
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets in seconds, from 10 µs to 10 s.
+BUCKETS = tuple(
+    round(mantissa * 10.0 ** exponent, 6)
+    for exponent in range(-5, 1)
+    for mantissa in (1, 2.5, 5)
+) + (10.0,)
+
+
+class Histogram:
+    """Histogram of durations with fixed buckets."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        # The last bucket collects everything above the largest bound.
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Add a duration to the histogram.
+
+        Parameters
+        ----------
+        value : float
+            Duration in seconds.
+        """
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the containing bucket.
+
+        Parameters
+        ----------
+        q : float
+            Quantile between 0 and 1.
+
+        Returns
+        -------
+        float or None
+            Estimated quantile in seconds, or `None` if the histogram is
+            empty.
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        """Get a summary of the histogram.
+
+        Returns
+        -------
+        dict
+            Number of observations, total, mean and maximum duration, and
+            estimated median and 99th percentile.
+        """
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+class AcquisitionStats:
+    """Stage timings and event counters of the acquisition of a camera.
+
+    Notes
+    -----
+    The stages are: `wait` for waiting for a filled buffer, `decode` for
+    decoding the buffer to an array, `meta` for reading metadata features,
+    `statistics` for the histogram statistics (see
+    `Camera.enable_statistics`), `control` for the software auto exposure
+    (see `Camera.auto_exposure`), `wrap` for building the `xarray.DataArray`,
+    `trigger` for executing `TriggerSoftware` and `total` for the whole
+    `get_frame` call.
+
+    The counters are: `frames_delivered` by `get_frame`, `buffer_underruns`
+    reported by the producer, `incomplete_buffers` received and
+    `discarded_buffers` skipped by the buffer handling mode.
+    """
+
+    STAGES = ("wait", "decode", "meta", "statistics", "control", "wrap",
+              "trigger", "total")
+    COUNTERS = ("frames_delivered", "buffer_underruns", "incomplete_buffers",
+                "discarded_buffers")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clear all the statistics."""
+        self.stages = {stage: Histogram() for stage in self.STAGES}
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def observe(self, stage, seconds):
+        """Record the duration of a stage.
+
+        Parameters
+        ----------
+        stage : str
+            Name of the stage, one of `STAGES`.
+        seconds : float
+            Duration of the stage.
+        """
+        self.stages[stage].observe(seconds)
+
+    def increment(self, counter, n=1):
+        """Increment an event counter.
+
+        Parameters
+        ----------
+        counter : str
+            Name of the counter, one of `COUNTERS`.
+        n : int, optional
+            Amount to add.
+        """
+        self.counters[counter] += n
+
+    def as_dict(self, counters=None):
+        """Get the statistics as a dictionary.
+
+        Parameters
+        ----------
+        counters : dict, optional
+            Counter values overriding the recorded ones.
+
+        Returns
+        -------
+        dict
+            Dictionary with `stages` (summaries of the stage histograms) and
+            `counters`.
+        """
+        return {
+            "stages": {k: v.as_dict() for k, v in self.stages.items()},
+            "counters": {**self.counters, **(counters or {})},
+        }
+
+    def to_prometheus(self, labels=None, counters=None, prefix="camazing"):
+        """Format the statistics in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        labels : dict, optional
+            Labels added to every sample, e.g. the camera serial number.
+        counters : dict, optional
+            Counter values overriding the recorded ones.
+        prefix : str, optional
+            Prefix of the metric names.
+
+        Returns
+        -------
+        str
+            The statistics as text.
+        """
+        labels = labels or {}
+
+        def format_labels(**extra):
+            items = {**labels, **extra}
+            if not items:
+                return ""
+            return "{" + ",".join(
+                f'{k}="{v}"' for k, v in items.items()
+            ) + "}"
+
+        name = f"{prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent in image acquisition stages.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, histogram in self.stages.items():
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{format_labels(stage=stage, le=bound)} "
+                    f"{cumulative}"
+                )
+            lines.append(
+                f"{name}_bucket{format_labels(stage=stage, le='+Inf')} "
+                f"{histogram.count}"
+            )
+            lines.append(
+                f"{name}_sum{format_labels(stage=stage)} {histogram.sum}"
+            )
+            lines.append(
+                f"{name}_count{format_labels(stage=stage)} {histogram.count}"
+            )
+
+        for counter, value in {**self.counters, **(counters or {})}.items():
+            name = f"{prefix}_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{format_labels()} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+class FrameTracker:
+    """Continuity of GenTL frame IDs over an acquisition.
+
+    Frame IDs are expected to increase by one from buffer to buffer, so a
+    jump reveals frames that were lost before reaching the host. A repeated
+    ID is counted as a duplicate, and any other backward jump as a restart
+    of the producer, which starts a new continuity run without counting
+    lost frames.
+    """
+
+    # GigE Vision block IDs are 16 bits wide and skip zero when wrapping.
+    _GEV_MAX_ID = 0xFFFF
+    # A backward jump is a wrap of a GigE Vision block ID only if it goes
+    # from this close to the maximum to this close to zero.
+    _GEV_WRAP_WINDOW = 0x400
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clear the tracking state for a new acquisition."""
+        self.first_id = None
+        self.last_id = None
+        self.received = 0
+        self.lost = 0
+        self.gaps = 0
+        self.incomplete = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.restarts = 0
+        # Frames produced in the current continuity run, received or lost.
+        self.run_frames = 0
+
+    def restart(self):
+        """Start a new continuity run, keeping the totals.
+
+        Used when the producer is known to restart its frame IDs, e.g. when
+        the data streams are restarted.
+        """
+        self.last_id = None
+        self.run_frames = 0
+
+    def update(self, frame_id, complete=True, rejected=False):
+        """Record a received buffer.
+
+        Parameters
+        ----------
+        frame_id : int or None
+            Frame ID of the buffer, or `None` if the producer doesn't report
+            it.
+        complete : bool, optional
+            Whether the buffer was filled completely.
+        rejected : bool, optional
+            Whether the buffer was discarded instead of being delivered.
+
+        Returns
+        -------
+        int
+            Number of frames lost between the previous buffer and this one.
+        """
+        lost = 0
+        duplicate = False
+        if frame_id is not None:
+            last_id = self.last_id
+            if last_id is None:
+                if self.first_id is None:
+                    self.first_id = frame_id
+            elif frame_id > last_id:
+                lost = frame_id - last_id - 1
+            elif frame_id == last_id:
+                duplicate = True
+                self.duplicates += 1
+                logger.warning(f"Received frame ID {frame_id} twice.")
+            elif (self._GEV_MAX_ID - self._GEV_WRAP_WINDOW < last_id
+                    <= self._GEV_MAX_ID and
+                    frame_id <= self._GEV_WRAP_WINDOW):
+                lost = self._GEV_MAX_ID - last_id + frame_id - 1
+            else:
+                self.restarts += 1
+                self.run_frames = 0
+                logger.warning(
+                    f"Frame ID jumped back from {last_id} to {frame_id}, "
+                    f"assuming that the producer restarted."
+                )
+            self.last_id = frame_id
+        if not duplicate:
+            self.run_frames += 1 + lost
+
+        if lost:
+            self.lost += lost
+            self.gaps += 1
+        self.received += 1
+        if not complete:
+            self.incomplete += 1
+        if rejected:
+            self.rejected += 1
+        return lost
+
+    def report(self):
+        """Get a summary of frame loss.
+
+        Returns
+        -------
+        dict
+            First and last frame ID, numbers of received, lost, incomplete,
+            rejected and duplicate frames, number of gaps in the frame IDs,
+            number of restarts of the frame IDs and the fraction of frames
+            lost or rejected.
+        """
+        expected = self.received + self.lost
+        return {
+            "first_frame_id": self.first_id,
+            "last_frame_id": self.last_id,
+            "frames_received": self.received,
+            "frames_lost": self.lost,
+            "gaps": self.gaps,
+            "incomplete": self.incomplete,
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "restarts": self.restarts,
+            "loss_ratio": ((self.lost + self.rejected) / expected
+                           if expected else 0.0),
+        }
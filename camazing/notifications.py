@@ -0,0 +1,163 @@
+"""Notifications of changed GenICam features."""
+
+import collections
+import threading
+import time
+
+FeatureChange = collections.namedtuple("FeatureChange", ["name", "timestamp"])
+FeatureChange.__doc__ = """A notification that a feature may have changed.
+
+Attributes
+----------
+name : str
+    Name of the feature.
+timestamp : float
+    Time of the notification in seconds since the epoch.
+"""
+
+
+class FeatureChanges:
+    """Queue of change notifications of the features of a camera.
+
+    The features are subscribed to with `Feature.subscribe`, so the changes
+    are reported by GenApi without reading any registers. A change of a
+    feature that is already queued is not queued again until it has been
+    taken out, so a feature written in a loop doesn't flood the queue. When
+    the queue is full, the oldest notifications are dropped and counted in
+    `dropped`.
+
+    Features that GenApi doesn't cache are only noticed to change when they
+    are written, or when their polling time passes in `poll`.
+
+    Examples
+    --------
+    >>> with camera.watch(["Gain", "ExposureTime"]) as changes:
+    ...     camera["Gain"].value = 6.0
+    ...     changes.get(timeout=1)
+    FeatureChange(name='Gain', timestamp=1612345678.9)
+    """
+
+    def __init__(self, camera, features=None, maxlen=1000):
+        """Subscribe to the features of a camera.
+
+        Use `Camera.watch` to create the queue.
+
+        Parameters
+        ----------
+        camera : camazing.core.Camera
+            Initialized camera.
+        features : list of str, optional
+            Names of the features to watch. By default, all the features
+            with a value are watched.
+        maxlen : int, optional
+            Maximum number of queued notifications.
+        """
+        import camazing.feature_types
+
+        if features is None:
+            features = [
+                name for name, feature in camera.items()
+                if isinstance(feature, camazing.feature_types.Valuable)
+            ]
+        self._node_map = camera._node_map
+        self._queue = collections.deque()
+        self._maxlen = maxlen
+        self._queued = set()
+        self._condition = threading.Condition()
+        self._last_poll = time.perf_counter()
+        self.dropped = 0
+        self._subscriptions = []
+        for name in features:
+            feature = camera[name]
+            handle = feature.subscribe(
+                lambda feature, name=name: self._put(name)
+            )
+            self._subscriptions.append((feature, handle))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        """Iterate over the notifications as they arrive, until closed."""
+        while self._subscriptions or self._queue:
+            change = self.get(timeout=0.1)
+            if change is not None:
+                yield change
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _put(self, name):
+        """Queue a notification, called by GenApi."""
+        with self._condition:
+            if name in self._queued:
+                return
+            if len(self._queue) >= self._maxlen:
+                self._queued.discard(self._queue.popleft().name)
+                self.dropped += 1
+            self._queue.append(FeatureChange(name, time.time()))
+            self._queued.add(name)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Take the oldest notification out of the queue.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time in seconds to wait for a notification. By default, wait
+            until one arrives.
+
+        Returns
+        -------
+        FeatureChange or None
+            The notification, or `None` if none arrived in time.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._queue, timeout):
+                return None
+            change = self._queue.popleft()
+            self._queued.discard(change.name)
+            return change
+
+    def get_all(self):
+        """Take all the queued notifications without waiting.
+
+        Returns
+        -------
+        list of FeatureChange
+            The notifications, oldest first.
+        """
+        with self._condition:
+            changes = list(self._queue)
+            self._queue.clear()
+            self._queued.clear()
+        return changes
+
+    def poll(self):
+        """Let GenApi invalidate the features whose polling time has passed.
+
+        Features with a polling time in the camera description are
+        notified as changed after that time, which is how GenApi follows
+        values the device changes by itself, e.g. a temperature. The
+        elapsed time is measured from the previous call.
+        """
+        now = time.perf_counter()
+        elapsed = int((now - self._last_poll) * 1000)
+        if elapsed > 0:
+            self._node_map.poll(elapsed)
+            self._last_poll = now
+
+    def close(self):
+        """Stop watching the features.
+
+        Notifications already queued can still be taken out.
+        """
+        for feature, handle in self._subscriptions:
+            feature.unsubscribe(handle)
+        self._subscriptions = []
+        with self._condition:
+            self._condition.notify_all()
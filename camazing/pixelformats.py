@@ -48,22 +48,83 @@ def get_decoder(pxformat):
     return decoder
 
 
+def get_pixel_format_code(pxformat):
+    """Return the GenICam PFNC code of a pixel format.
+
+    Parameters
+    ----------
+    pxformat: str
+        Pixel format as given by cameras PixelFormat.
+
+    Returns
+    -------
+    int
+        The 32-bit pixel format code, as reported in GenTL buffer info.
+    """
+    try:
+        code = _codes[pxformat]
+    except KeyError:
+        raise PixelFormatError(f'No code known for the pixel format `{pxformat}`')
+
+    return code
+
+
+def get_pixel_format_name(code):
+    """Return the name of a pixel format given its GenICam PFNC code.
+
+    Parameters
+    ----------
+    code: int
+        The 32-bit pixel format code, as reported in GenTL buffer info.
+
+    Returns
+    -------
+    str
+        Pixel format as given by cameras PixelFormat.
+    """
+    for pxformat, pxcode in _codes.items():
+        if pxcode == code:
+            return pxformat
+    raise PixelFormatError(f'No pixel format known for the code `{code:#010x}`')
+
+
+def get_pixel_formats():
+    """Return the pixel formats that have a decoder.
+
+    Returns
+    -------
+    tuple of str
+        Names of the supported pixel formats.
+    """
+    return tuple(_decoders)
+
+
 def decode_raw(dtype):
-    """Decode raw buffer with a given bit depth."""
+    """Decode raw buffer with a given bit depth.
+
+    The buffer may be larger than the image, e.g. when it was allocated for
+    a larger region of interest.
+    """
     def decode(buf, shape):
         return np.frombuffer(
             buf,
-            dtype=dtype
+            dtype=dtype,
+            count=shape[0] * shape[1]
             ).reshape(*shape).copy()
     return decode
 
 
 def decode_RGB(bpp):
-    """Decode RGB buffer with a given bit depth."""
+    """Decode RGB buffer with a given bit depth.
+
+    The buffer may be larger than the image, e.g. when it was allocated for
+    a larger region of interest.
+    """
     def decode(buf, shape):
         return np.frombuffer(
             buf,
             dtype=bpp,
+            count=shape[0] * shape[1] * 3
             ).reshape(*shape, 3).copy()
     return decode
 
@@ -94,3 +155,15 @@ _ranges = {
     'Mono8': np.uint8([0, 255]),
     'Mono16': np.uint16([0, 65535]),
     }
+
+# Pixel format codes of the GenICam Pixel Format Naming Convention (PFNC).
+_codes = {
+    'BayerRG8': 0x01080009,
+    'BayerGB8': 0x0108000A,
+    'BayerGB12': 0x01100012,
+    'BayerRG12': 0x01100011,
+    'BayerRG16': 0x0110002F,
+    'RGB8': 0x02180014,
+    'Mono8': 0x01080001,
+    'Mono16': 0x01100007,
+    }
@@ -0,0 +1,213 @@
+"""Background polling of slowly changing features."""
+
+import collections
+import heapq
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class FeaturePoller:
+    """Reads features periodically in a background thread.
+
+    Each feature is read at its own interval, and features that fall due
+    within `batch_window` of each other are read together. The value cached
+    by GenApi is invalidated before each read, so the device is always
+    read. The values are kept with their host timestamps in a bounded buffer
+    per feature.
+
+    During acquisition, a batch is read right after the metadata of a frame
+    has been read by `get_frame`, under the same lock, so the reads don't
+    delay the next frame unless they take longer than the frame interval.
+
+    Examples
+    --------
+    >>> with camera.poll_features({"DeviceTemperature": 5.0}) as poller:
+    ...     with camera:
+    ...         frames = [camera.get_frame() for _ in range(1000)]
+    ...     poller.history("DeviceTemperature")
+    [(1612345678.9, 40.2), (1612345683.9, 40.4), ...]
+    """
+
+    def __init__(self, camera, features, maxlen=10000, batch_window=0.1,
+                 frame_wait=1.0):
+        """Prepare polling of the features of a camera.
+
+        Use `Camera.poll_features` to create a poller that is synchronized
+        with the acquisition of the camera.
+
+        Parameters
+        ----------
+        camera : camazing.core.Camera
+            Initialized camera.
+        features : dict
+            Polling intervals in seconds by feature name.
+        maxlen : int, optional
+            Maximum number of values kept per feature.
+        batch_window : float, optional
+            Features due within this many seconds are read together.
+        frame_wait : float, optional
+            Longest time in seconds to wait for a frame during acquisition
+            before reading anyway.
+
+        Raises
+        ------
+        ValueError
+            If an interval is not positive.
+        """
+        for name, interval in features.items():
+            if interval <= 0:
+                raise ValueError(
+                    f"Expected a positive interval for '{name}', but got "
+                    f"{interval}."
+                )
+        self._camera = camera
+        self._features = {name: camera[name] for name in features}
+        self._intervals = dict(features)
+        self._batch_window = batch_window
+        self._frame_wait = frame_wait
+        self._series = {
+            name: collections.deque(maxlen=maxlen) for name in features
+        }
+        now = time.perf_counter()
+        self._schedule = [(now, name) for name in features]
+        heapq.heapify(self._schedule)
+
+        self._condition = threading.Condition()
+        self._running = False
+        self._waiting = False
+        self._frames = 0
+        self._thread = None
+        self.batches = 0
+        self.reads = 0
+        self.errors = 0
+        self.detach = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def start(self):
+        """Start the polling thread."""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="camazing-poller", daemon=True
+        )
+        self._thread.start()
+
+    def frame_delivered(self):
+        """Let a batch waiting for the acquisition to be read."""
+        if self._waiting:
+            with self._condition:
+                self._frames += 1
+                self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                delay = self._schedule[0][0] - time.perf_counter()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+                if self._camera.is_acquiring():
+                    frames = self._frames
+                    self._waiting = True
+                    self._condition.wait_for(
+                        lambda: self._frames != frames or not self._running,
+                        self._frame_wait
+                    )
+                    self._waiting = False
+                    if not self._running:
+                        return
+            self._read_due()
+
+    def _read_due(self):
+        """Read the features that are due and schedule their next reads."""
+        schedule = self._schedule
+        now = time.perf_counter()
+        batch = []
+        while schedule and schedule[0][0] <= now + self._batch_window:
+            batch.append(heapq.heappop(schedule))
+
+        values = []
+        with self._camera._feature_lock:
+            timestamp = time.time()
+            for _, name in batch:
+                feature = self._features[name]
+                try:
+                    feature.invalidate()
+                    values.append((name, feature.value))
+                except Exception as e:
+                    self.errors += 1
+                    logger.debug(f"Polling '{name}' failed: {e}")
+
+        with self._condition:
+            for name, value in values:
+                self._series[name].append((timestamp, value))
+            self.reads += len(values)
+            self.batches += 1
+
+        # Keep the cadence, unless the reads have fallen behind.
+        now = time.perf_counter()
+        for due, name in batch:
+            interval = self._intervals[name]
+            due += interval
+            if due < now:
+                due = now + interval
+            heapq.heappush(schedule, (due, name))
+
+    def history(self, name):
+        """Get the values read of a feature.
+
+        Parameters
+        ----------
+        name : str
+            Name of the feature.
+
+        Returns
+        -------
+        list of tuple
+            The host timestamps in seconds since the epoch and the values,
+            oldest first.
+        """
+        with self._condition:
+            return list(self._series[name])
+
+    def latest(self):
+        """Get the latest values of the features.
+
+        Returns
+        -------
+        dict
+            Timestamp and value by feature name, for the features read at
+            least once.
+        """
+        with self._condition:
+            return {
+                name: series[-1] for name, series in self._series.items()
+                if series
+            }
+
+    def close(self):
+        """Stop polling and detach the poller from the camera.
+
+        The values read so far are kept.
+        """
+        if self.detach is not None:
+            self.detach(self)
+            self.detach = None
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
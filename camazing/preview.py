@@ -0,0 +1,286 @@
+"""Decimated live preview of the acquired frames."""
+
+import collections
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PreviewFrame = collections.namedtuple(
+    "PreviewFrame", ["data", "frame_id", "timestamp", "sequence"]
+)
+PreviewFrame.__doc__ = """A downsampled frame of a preview.
+
+Attributes
+----------
+data : numpy.ndarray
+    Downsampled image, with the colour channels in the last axis if it was
+    debayered. The array is reused after the next two preview frames, so it
+    must be copied to be kept longer.
+frame_id : int or None
+    Frame ID of the source frame.
+timestamp : float
+    Time when the source frame was offered to the preview, in seconds
+    (`time.time`).
+sequence : int
+    Number of the preview frame, counting from zero.
+"""
+
+# Positions of the red, green and blue pixels in the 2x2 Bayer tiles.
+_BAYER_TILES = {
+    "BayerRG": ((0, 0), ((0, 1), (1, 0)), (1, 1)),
+    "BayerGB": ((1, 0), ((0, 0), (1, 1)), (0, 1)),
+    "BayerGR": ((0, 1), ((0, 0), (1, 1)), (1, 0)),
+    "BayerBG": ((1, 1), ((0, 1), (1, 0)), (0, 0)),
+}
+
+
+def _bayer_tile(pixel_format):
+    """Get the Bayer tile layout of a pixel format, or `None`."""
+    return _BAYER_TILES.get(pixel_format[:7])
+
+
+class PreviewTap:
+    """Produces downsampled frames at a capped rate from an acquisition.
+
+    The acquisition offers every decoded image to the tap, which takes one
+    only when the rate allows and the previous one has been processed, and
+    otherwise returns immediately. A taken image is downsampled right away
+    into preallocated buffers, so the tap never keeps a reference to the
+    frame returned to the caller, and the cost is paid at most `max_rate`
+    times per second. The preview frames are published and given to the
+    callback in a worker thread.
+    """
+
+    def __init__(self, max_rate=10.0, factor=4, method="stride",
+                 debayer=False, callback=None):
+        """Start the worker thread.
+
+        Parameters
+        ----------
+        max_rate : float, optional
+            Maximum number of preview frames per second.
+        factor : int, optional
+            Downsampling factor along both axes.
+        method : {'stride', 'bin'}, optional
+            Whether to take every `factor`:th pixel or to average blocks of
+            `factor` x `factor` pixels.
+        debayer : bool, optional
+            Whether to convert Bayer images to RGB. Each 2x2 Bayer tile gives
+            one RGB pixel, so `factor` must be even.
+        callback : callable, optional
+            Function called with each `PreviewFrame` in the worker thread.
+
+        Raises
+        ------
+        ValueError
+            If `method` is invalid, `factor` is less than 1, or `factor` is
+            odd with `debayer`.
+        """
+        if method not in ("stride", "bin"):
+            raise ValueError(
+                f"Expected `method` to be 'stride' or 'bin', but got "
+                f"{method!r}."
+            )
+        if factor < 1 or (debayer and factor % 2):
+            raise ValueError(
+                f"Invalid downsampling factor {factor}. It must be positive, "
+                f"and even when debayering."
+            )
+
+        self._interval = 1 / max_rate
+        self._factor = factor
+        self._method = method
+        self._debayer = debayer
+        self._callback = callback
+
+        self._next_time = 0.0
+        self._pending = None
+        self._busy = False
+        self._condition = threading.Condition()
+        self._latest = None
+        self._buffers = None
+        self._index = 0
+        self._layout = None
+        self._tile = None
+        self._sequence = 0
+        self.skipped = 0
+        self.detach = None
+
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="camazing-preview", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def offer(self, data, pixel_format, frame_id=None):
+        """Offer a decoded image to the preview without blocking.
+
+        Parameters
+        ----------
+        data : numpy.ndarray
+            Decoded image. It's only read during the call.
+        pixel_format : str
+            GenICam pixel format of the image.
+        frame_id : int, optional
+            Frame ID of the image.
+
+        Returns
+        -------
+        bool
+            `True` if the image was taken for the preview.
+        """
+        now = time.perf_counter()
+        if now < self._next_time:
+            return False
+        if self._busy:
+            self.skipped += 1
+            return False
+        self._next_time = now + self._interval
+        timestamp = time.time()
+
+        try:
+            if self._layout != (data.shape, data.dtype, pixel_format):
+                self._allocate(data, pixel_format)
+            out = self._buffers[self._index]
+            self._downsample(data, out)
+        except Exception:
+            logger.exception("Failed to downsample a preview frame.")
+            return False
+        self._index = 1 - self._index
+
+        self._busy = True
+        with self._condition:
+            self._pending = (out, frame_id, timestamp)
+            self._condition.notify()
+        return True
+
+    def latest(self):
+        """Get the most recent preview frame.
+
+        Returns
+        -------
+        PreviewFrame or None
+            The frame, or `None` if no frame has been produced yet.
+        """
+        return self._latest
+
+    def wait(self, timeout=None):
+        """Wait for the next preview frame.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds.
+
+        Returns
+        -------
+        PreviewFrame or None
+            The frame, or `None` if the timeout passed.
+        """
+        sequence = self._sequence
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._sequence != sequence or not self._running,
+                timeout
+            )
+        return self._latest if self._sequence != sequence else None
+
+    def close(self):
+        """Stop the preview and detach it from the camera."""
+        if self.detach is not None:
+            self.detach(self)
+            self.detach = None
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _allocate(self, data, pixel_format):
+        """Allocate the output buffers for images like the given one."""
+        factor = self._factor
+        tile = _bayer_tile(pixel_format) if self._debayer else None
+        if tile is not None:
+            factor //= 2
+            shape = (data.shape[0] // 2 // factor,
+                     data.shape[1] // 2 // factor, 3)
+        else:
+            shape = (data.shape[0] // factor, data.shape[1] // factor) + \
+                data.shape[2:]
+        dtype = data.dtype if self._method == "stride" and tile is None \
+            else np.float32
+        self._buffers = [np.empty(shape, dtype) for _ in range(2)]
+        self._layout = (data.shape, data.dtype, pixel_format)
+        self._tile = tile
+
+    def _downsample(self, data, out):
+        """Downsample an image into a preallocated array."""
+        factor = self._factor
+        if self._tile is not None:
+            # One RGB pixel from each 2x2 tile, then the rest of the factor.
+            red, greens, blue = self._tile
+            h, w = out.shape[0] * factor, out.shape[1] * factor
+            step = factor if self._method == "stride" else 2
+            planes = [
+                data[y:h:step, x:w:step]
+                for y, x in (red, greens[0], greens[1], blue)
+            ]
+            if self._method == "stride":
+                out[..., 0] = planes[0]
+                np.add(planes[1], planes[2], out=out[..., 1], dtype=np.float32)
+                out[..., 1] *= 0.5
+                out[..., 2] = planes[3]
+                return
+            f = factor // 2
+            binned = [
+                p.reshape(out.shape[0], f, out.shape[1], f)
+                .mean(axis=(1, 3), dtype=np.float32)
+                for p in planes
+            ]
+            out[..., 0] = binned[0]
+            np.add(binned[1], binned[2], out=out[..., 1])
+            out[..., 1] *= 0.5
+            out[..., 2] = binned[3]
+        elif self._method == "stride":
+            out[...] = data[:out.shape[0] * factor:factor,
+                            :out.shape[1] * factor:factor]
+        else:
+            h, w = out.shape[0], out.shape[1]
+            blocks = data[:h * factor, :w * factor].reshape(
+                (h, factor, w, factor) + data.shape[2:]
+            )
+            blocks.mean(axis=(1, 3), dtype=np.float32, out=out)
+
+    def _run(self):
+        """Publish the downsampled images until closed."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._pending is not None or not self._running
+                )
+                if not self._running:
+                    return
+                out, frame_id, timestamp = self._pending
+                self._pending = None
+
+            frame = PreviewFrame(out, frame_id, timestamp, self._sequence)
+            with self._condition:
+                self._latest = frame
+                self._sequence += 1
+                self._condition.notify_all()
+            self._busy = False
+
+            if self._callback is not None:
+                try:
+                    self._callback(frame)
+                except Exception:
+                    logger.exception("Preview callback failed.")
@@ -0,0 +1,514 @@
+"""Lossless compressed recording of frames.
+
+Frames are grouped into chunks, which are compressed in parallel on a thread
+pool and written one after another to a single file, each followed by the
+metadata of its frames. An index of the chunks is written at the end of the
+file, so that single frames can be read back without decompressing the whole
+recording. A recording that was not closed, e.g. after a crash, is read by
+scanning its chunks.
+
+File layout::
+
+    b"CAMZREC1"                       magic
+    header size (uint32, LE), header  JSON: shape, dtype, dims, codec
+    chunk, chunk, ...                 b"CHNK", number of frames (uint32),
+                                      sizes of the compressed frames
+                                      (uint64) and of the metadata (uint32),
+                                      compressed frames, metadata JSON
+    index                             JSON
+    index offset (uint64, LE), b"CAMZREC1"
+"""
+
+import bisect
+import collections
+import json
+import logging
+import lzma
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from camazing.frames import frame_metadata
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"CAMZREC1"
+_HEADER = struct.Struct("<I")
+_CHUNK_MAGIC = b"CHNK"
+_CHUNK = struct.Struct("<4sIQI")
+_FOOTER = struct.Struct("<Q8s")
+
+CODECS = ("zlib", "lzma", "blosc")
+
+
+def _import_blosc():
+    try:
+        import blosc
+    except ImportError:
+        raise ImportError(
+            "The 'blosc' codec requires the blosc package "
+            "(pip install blosc)."
+        ) from None
+    return blosc
+
+
+def _shuffle(data):
+    """Group the bytes of the elements by significance."""
+    itemsize = data.dtype.itemsize
+    if itemsize == 1:
+        return data.reshape(-1)
+    return data.reshape(-1).view(np.uint8).reshape(-1, itemsize).T.copy()
+
+
+def _unshuffle(raw, dtype):
+    """Undo `_shuffle`."""
+    itemsize = dtype.itemsize
+    planes = np.frombuffer(raw, np.uint8)
+    if itemsize == 1:
+        return planes
+    return planes.reshape(itemsize, -1).T.copy().view(dtype)
+
+
+def _compress(frames, codec, level, shuffle):
+    """Compress a chunk of frames, in a worker thread."""
+    data = np.stack(frames)
+    if codec == "blosc":
+        blosc = _import_blosc()
+        return blosc.compress(
+            data.tobytes(), typesize=data.dtype.itemsize, clevel=level,
+            shuffle=blosc.SHUFFLE if shuffle else blosc.NOSHUFFLE,
+            cname="zstd"
+        ), data.nbytes
+    raw = _shuffle(data) if shuffle else data.reshape(-1)
+    if codec == "zlib":
+        return zlib.compress(raw, level), data.nbytes
+    return lzma.compress(raw, preset=level), data.nbytes
+
+
+def _decompress(blob, codec, shuffle, dtype):
+    """Decompress a chunk into a flat array."""
+    if codec == "blosc":
+        return np.frombuffer(_import_blosc().decompress(blob), dtype)
+    raw = zlib.decompress(blob) if codec == "zlib" else lzma.decompress(blob)
+    if shuffle:
+        return _unshuffle(raw, dtype)
+    return np.frombuffer(raw, dtype)
+
+
+class Recorder:
+    """Writes frames to a compressed recording.
+
+    Examples
+    --------
+    >>> with Recorder("run.camrec", codec="zlib", level=1) as recorder:
+    ...     for _ in range(1000):
+    ...         recorder.write(camera.get_frame())
+    ...
+    >>> recorder.stats()["ratio"]
+    2.7
+    """
+
+    def __init__(self, path, codec="zlib", level=None, shuffle=True,
+                 chunk_frames=8, max_workers=None):
+        """Create the recording file.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file.
+        codec : {'zlib', 'lzma', 'blosc'}, optional
+            Compression codec. 'blosc' requires the blosc package.
+        level : int, optional
+            Compression level. Defaults to 1 for zlib, 0 for lzma and 5 for
+            blosc, favouring speed.
+        shuffle : bool, optional
+            Whether to group the bytes of the pixels by significance before
+            compression, which compresses images with more than 8 bits per
+            pixel better.
+        chunk_frames : int, optional
+            Number of frames compressed together. A single frame is read back
+            by decompressing its chunk.
+        max_workers : int, optional
+            Number of compression threads. Defaults to the number of CPUs.
+
+        Raises
+        ------
+        ValueError
+            If `codec` is invalid.
+        ImportError
+            If `codec` is 'blosc' and blosc is not installed.
+        """
+        if codec not in CODECS:
+            raise ValueError(
+                f"Expected `codec` to be one of {', '.join(CODECS)}, but got "
+                f"{codec!r}."
+            )
+        if codec == "blosc":
+            _import_blosc()
+        if level is None:
+            level = {"zlib": 1, "lzma": 0, "blosc": 5}[codec]
+
+        self._codec = codec
+        self._level = level
+        self._shuffle = shuffle
+        self._chunk_frames = chunk_frames
+        max_workers = max_workers or os.cpu_count() or 1
+        self._max_pending = 2 * max_workers
+        self._pool = ThreadPoolExecutor(max_workers)
+
+        self._file = open(path, "wb")
+        self._file.write(_MAGIC)
+        self._layout = None
+        self._frames = []
+        self._meta = []
+        self._pending = collections.deque()
+        self._chunks = []
+        self._frames_written = 0
+        self._raw_bytes = 0
+        self._compressed_bytes = 0
+        self._start = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def write(self, frame, meta=None):
+        """Add a frame to the recording.
+
+        The frame is compressed in the background once its chunk is full.
+        This waits only if the compression falls behind by more than two
+        chunks per thread.
+
+        Parameters
+        ----------
+        frame : xarray.DataArray or numpy.ndarray
+            The frame. The scalar coordinates of a `DataArray` are stored as
+            metadata.
+        meta : dict, optional
+            Additional JSON-serializable metadata.
+
+        Raises
+        ------
+        ValueError
+            If the shape or type of the frame differs from the first frame.
+        """
+        if hasattr(frame, "coords"):
+            meta = {**frame_metadata(frame), **(meta or {})}
+            dims = list(frame.dims)
+            frame = frame.values
+        else:
+            dims = None
+
+        if self._layout is None:
+            self._write_header({
+                "shape": list(frame.shape),
+                "dtype": frame.dtype.str,
+                "dims": dims,
+            })
+            self._start = time.perf_counter()
+        elif (list(frame.shape) != self._layout["shape"] or
+              frame.dtype.str != self._layout["dtype"]):
+            raise ValueError(
+                f"Expected a frame of shape {tuple(self._layout['shape'])} "
+                f"and type {self._layout['dtype']}, but got {frame.shape} "
+                f"and {frame.dtype.str}."
+            )
+
+        self._frames.append(frame)
+        self._meta.append(meta or {})
+        self._frames_written += 1
+        if len(self._frames) == self._chunk_frames:
+            self._submit()
+
+    def _write_header(self, layout):
+        """Write the layout of the frames and the codec."""
+        self._layout = layout
+        header = json.dumps({
+            **layout, "codec": self._codec, "shuffle": self._shuffle,
+        }).encode()
+        self._file.write(_HEADER.pack(len(header)))
+        self._file.write(header)
+
+    def _submit(self):
+        """Start compressing the collected frames as a chunk."""
+        self._pending.append((self._meta, self._pool.submit(
+            _compress, self._frames, self._codec, self._level, self._shuffle
+        )))
+        self._frames = []
+        self._meta = []
+        self._flush(wait=len(self._pending) > self._max_pending)
+
+    def _flush(self, wait=False):
+        """Write the compressed chunks and their metadata to the file in
+        order."""
+        pending = self._pending
+        while pending and (wait or pending[0][1].done()):
+            meta, future = pending.popleft()
+            blob, raw_bytes = future.result()
+            encoded = json.dumps(meta).encode()
+            self._file.write(_CHUNK.pack(
+                _CHUNK_MAGIC, len(meta), len(blob), len(encoded)
+            ))
+            self._chunks.append({
+                "offset": self._file.tell(),
+                "size": len(blob),
+                "frames": len(meta),
+                "meta_size": len(encoded),
+            })
+            self._file.write(blob)
+            self._file.write(encoded)
+            self._raw_bytes += raw_bytes
+            self._compressed_bytes += len(blob)
+            wait = False
+
+    @property
+    def frames_written(self):
+        """Number of frames added to the recording."""
+        return self._frames_written
+
+    def stats(self):
+        """Get the compression statistics.
+
+        Returns
+        -------
+        dict
+            Numbers of frames and chunks written, uncompressed and compressed
+            bytes, compression `ratio`, and throughput of uncompressed data
+            in MB/s since the first frame.
+        """
+        elapsed = (time.perf_counter() - self._start
+                   if self._start is not None else 0.0)
+        return {
+            "frames": sum(chunk["frames"] for chunk in self._chunks),
+            "chunks": len(self._chunks),
+            "raw_bytes": self._raw_bytes,
+            "compressed_bytes": self._compressed_bytes,
+            "ratio": (self._raw_bytes / self._compressed_bytes
+                      if self._compressed_bytes else None),
+            "megabytes_per_second": (self._raw_bytes / elapsed / 1e6
+                                     if elapsed else None),
+        }
+
+    def close(self):
+        """Compress the remaining frames and write the index."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._layout is None:
+                self._write_header({"shape": [], "dtype": "|u1",
+                                    "dims": None})
+            if self._frames:
+                self._submit()
+            while self._pending:
+                self._flush(wait=True)
+
+            index_offset = self._file.tell()
+            self._file.write(json.dumps({"chunks": self._chunks}).encode())
+            self._file.write(_FOOTER.pack(index_offset, _MAGIC))
+        finally:
+            self._file.close()
+            self._pool.shutdown()
+
+        stats = self.stats()
+        if stats["ratio"] is not None:
+            logger.info(
+                f"Recorded {stats['frames']} frames with compression ratio "
+                f"{stats['ratio']:.2f} at "
+                f"{stats['megabytes_per_second']:.1f} MB/s."
+            )
+
+
+class RecordingReader:
+    """Reads frames from a recording made with `Recorder`.
+
+    Examples
+    --------
+    >>> with RecordingReader("run.camrec") as recording:
+    ...     frame = recording[100]
+    ...     meta = recording.meta(100)
+    """
+
+    def __init__(self, path):
+        """Open a recording and read its index.
+
+        The chunks of a recording that was not closed are found by scanning
+        the file, up to the last chunk written completely.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a camazing recording.
+        """
+        self._file = open(path, "rb")
+        try:
+            if self._file.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a camazing recording.")
+            header = self._file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path} has no header.")
+            header = json.loads(self._file.read(_HEADER.unpack(header)[0]))
+            self._chunks = self._read_index()
+            if self._chunks is None:
+                self._chunks = self._scan_chunks()
+                logger.warning(
+                    f"{path} was not closed, recovered "
+                    f"{sum(chunk['frames'] for chunk in self._chunks)} "
+                    f"frames."
+                )
+        except Exception:
+            self._file.close()
+            raise
+
+        self.shape = tuple(header["shape"])
+        self.dtype = np.dtype(header["dtype"])
+        self.dims = tuple(header["dims"]) if header["dims"] else None
+        self.codec = header["codec"]
+        self._shuffle = header["shuffle"]
+        # Index of the first frame of each chunk.
+        self._starts = []
+        start = 0
+        for chunk in self._chunks:
+            self._starts.append(start)
+            start += chunk["frames"]
+        self._length = start
+        self._cached = (None, None)
+        self._cached_meta = (None, None)
+
+    def _read_index(self):
+        """Read the chunk index at the end of the file.
+
+        Returns
+        -------
+        list of dict or None
+            The chunks, or `None` if the recording was not closed.
+        """
+        chunks_start = self._file.tell()
+        size = os.fstat(self._file.fileno()).st_size
+        if size - chunks_start < _FOOTER.size:
+            return None
+        self._file.seek(-_FOOTER.size, os.SEEK_END)
+        index_offset, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        if magic != _MAGIC or not chunks_start <= index_offset < size:
+            return None
+        self._file.seek(index_offset)
+        try:
+            index = json.loads(
+                self._file.read(size - _FOOTER.size - index_offset)
+            )
+        except ValueError:
+            return None
+        return index["chunks"]
+
+    def _scan_chunks(self):
+        """Find the chunks written completely, following their headers.
+
+        Returns
+        -------
+        list of dict
+            The chunks.
+        """
+        file = self._file
+        size = os.fstat(file.fileno()).st_size
+        file.seek(len(_MAGIC))
+        file.seek(_HEADER.unpack(file.read(_HEADER.size))[0], os.SEEK_CUR)
+        chunks = []
+        while True:
+            header = file.read(_CHUNK.size)
+            if len(header) < _CHUNK.size:
+                break
+            magic, n_frames, blob_size, meta_size = _CHUNK.unpack(header)
+            offset = file.tell()
+            if magic != _CHUNK_MAGIC or offset + blob_size + meta_size > size:
+                break
+            chunks.append({"offset": offset, "size": blob_size,
+                           "frames": n_frames, "meta_size": meta_size})
+            file.seek(blob_size + meta_size, os.SEEK_CUR)
+        return chunks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """Get the number of frames."""
+        return self._length
+
+    def __getitem__(self, index):
+        """Read a frame.
+
+        Parameters
+        ----------
+        index : int
+            Index of the frame.
+
+        Returns
+        -------
+        numpy.ndarray
+            The frame.
+        """
+        number, position = self._locate(index)
+        return self._read_chunk(number)[position]
+
+    def _locate(self, index):
+        """Find the chunk of a frame and the position of the frame in it."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Frame index out of range.")
+        number = bisect.bisect_right(self._starts, index) - 1
+        return number, index - self._starts[number]
+
+    def __iter__(self):
+        for number in range(len(self._chunks)):
+            yield from self._read_chunk(number)
+
+    def _read_chunk(self, number):
+        """Decompress a chunk, keeping the latest one cached."""
+        if self._cached[0] != number:
+            chunk = self._chunks[number]
+            self._file.seek(chunk["offset"])
+            blob = self._file.read(chunk["size"])
+            data = _decompress(blob, self.codec, self._shuffle, self.dtype)
+            self._cached = (number, data.reshape((-1,) + self.shape))
+        return self._cached[1]
+
+    def meta(self, index):
+        """Get the metadata of a frame.
+
+        Parameters
+        ----------
+        index : int
+            Index of the frame.
+
+        Returns
+        -------
+        dict
+            The metadata, such as the scalar coordinates of the frame.
+        """
+        number, position = self._locate(index)
+        if self._cached_meta[0] != number:
+            chunk = self._chunks[number]
+            self._file.seek(chunk["offset"] + chunk["size"])
+            self._cached_meta = (
+                number, json.loads(self._file.read(chunk["meta_size"]))
+            )
+        return self._cached_meta[1][position]
+
+    def close(self):
+        """Close the file."""
+        self._file.close()
@@ -0,0 +1,218 @@
+"""Per-frame cycling of camera features (e.g. exposure or gain bracketing)."""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Features needed for programming the on-camera sequencer. The names are
+# defined in the Sequencer Control section of the GenICam SFNC.
+_DEVICE_SEQUENCER_FEATURES = (
+    "SequencerMode",
+    "SequencerConfigurationMode",
+    "SequencerSetSelector",
+    "SequencerSetSave",
+    "SequencerSetNext",
+    "SequencerSetStart",
+)
+
+# Preferred events for advancing to the next sequencer set, in order.
+_TRIGGER_SOURCES = ("FrameEnd", "ExposureEnd", "FrameStart")
+
+
+class Sequencer:
+    """A cyclic sequence of feature values, one parameter set per frame.
+
+    The effective feature state of every step is resolved beforehand, and
+    only the features whose values differ from the previous step are written
+    when moving from one step to the next.
+    """
+
+    def __init__(self, steps):
+        """Initialize the sequence.
+
+        Parameters
+        ----------
+        steps : list of dict
+            Parameter sets as dictionaries of feature names and values. A step
+            that omits a feature keeps the value set by an earlier step.
+
+        Raises
+        ------
+        ValueError
+            If `steps` is empty.
+        """
+        if not steps:
+            raise ValueError("A sequence must contain at least one step.")
+
+        self._steps = [dict(step) for step in steps]
+
+        # Resolve the full state of each step. The sequence is cyclic, so the
+        # first step inherits the values left by the last step. Two passes
+        # are enough for every feature to get its final value.
+        state = {}
+        for _ in range(2):
+            self._states = []
+            for step in self._steps:
+                state = {**state, **step}
+                self._states.append(state)
+
+        # Features to be written when moving to step `i` from step `i - 1`.
+        self._deltas = [
+            {k: v for k, v in state.items()
+             if self._states[i - 1].get(k) != v}
+            for i, state in enumerate(self._states)
+        ]
+
+        self._on_device = False
+        self._position = 0
+
+    def __len__(self):
+        """Get the number of steps in the sequence."""
+        return len(self._steps)
+
+    @property
+    def steps(self):
+        """Parameter sets as given by the user."""
+        return self._steps
+
+    @property
+    def deltas(self):
+        """Features written when entering each step from the previous one."""
+        return self._deltas
+
+    @property
+    def on_device(self):
+        """`True` if the sequence is run by the camera's own sequencer."""
+        return self._on_device
+
+    def reset(self):
+        """Restart the sequence from the first step."""
+        self._position = 0
+
+    def advance(self, camera):
+        """Move to the next step of the sequence.
+
+        When the sequence is run in software, the features that differ from
+        the previous step are written to the camera. The first call after
+        `reset` writes the full state of the first step.
+
+        Parameters
+        ----------
+        camera : Camera
+            Camera whose features are written.
+
+        Returns
+        -------
+        int
+            Index of the step the next frame belongs to.
+        """
+        index = self._position % len(self)
+        if not self._on_device:
+            if self._position == 0:
+                delta = self._states[0]
+            else:
+                delta = self._deltas[index]
+            for name, value in delta.items():
+                camera[name].value = value
+        self._position += 1
+        return index
+
+    @staticmethod
+    def is_device_capable(camera):
+        """Check if the camera implements the SFNC sequencer features.
+
+        Parameters
+        ----------
+        camera : Camera
+            An initialized camera.
+
+        Returns
+        -------
+        bool
+            `True` if the sequence can be run on the camera.
+        """
+        return all(name in camera for name in _DEVICE_SEQUENCER_FEATURES)
+
+    def program_device(self, camera):
+        """Store the sequence to the camera's sequencer and enable it.
+
+        Each sequencer set is saved after writing only the features that
+        differ from the previous set, since the working values carry over
+        from one set to the next.
+
+        Parameters
+        ----------
+        camera : Camera
+            An initialized camera, which is not acquiring images.
+
+        Raises
+        ------
+        ValueError
+            If the camera has fewer sequencer sets than there are steps.
+        """
+        n_sets = camera["SequencerSetSelector"].max + 1
+        if len(self) > n_sets:
+            raise ValueError(
+                f"The sequence has {len(self)} steps, but the camera "
+                f"sequencer supports only {n_sets} sets."
+            )
+
+        camera["SequencerMode"].value = "Off"
+        camera["SequencerConfigurationMode"].value = "On"
+        try:
+            self._save_sets(camera)
+        except Exception:
+            # Leave the camera out of the sequencer modes.
+            camera["SequencerConfigurationMode"].value = "Off"
+            raise
+
+        camera["SequencerConfigurationMode"].value = "Off"
+        camera["SequencerSetStart"].value = 0
+        camera["SequencerMode"].value = "On"
+
+        self._on_device = True
+        logger.debug(f"Programmed {len(self)} sequencer sets to the camera.")
+
+    def _save_sets(self, camera):
+        """Save the steps to the sequencer sets in configuration mode."""
+        # Include the sequenced features in the sets, if the camera lets us
+        # choose them.
+        if ("SequencerFeatureSelector" in camera and
+                "SequencerFeatureEnable" in camera):
+            selectable = camera["SequencerFeatureSelector"].valid_values
+            for name in self._states[0]:
+                if name in selectable:
+                    camera["SequencerFeatureSelector"].value = name
+                    camera["SequencerFeatureEnable"].value = True
+
+        trigger_source = None
+        if "SequencerTriggerSource" in camera:
+            valid_values = camera["SequencerTriggerSource"].valid_values
+            for source in _TRIGGER_SOURCES:
+                if source in valid_values:
+                    trigger_source = source
+                    break
+
+        for index, state in enumerate(self._states):
+            camera["SequencerSetSelector"].value = index
+            delta = state if index == 0 else self._deltas[index]
+            for name, value in delta.items():
+                camera[name].value = value
+            if "SequencerPathSelector" in camera:
+                camera["SequencerPathSelector"].value = 0
+            camera["SequencerSetNext"].value = (index + 1) % len(self)
+            if trigger_source is not None:
+                camera["SequencerTriggerSource"].value = trigger_source
+            camera["SequencerSetSave"].execute()
+
+    def disable_device(self, camera):
+        """Turn off the camera's sequencer if the sequence is run on it.
+
+        Parameters
+        ----------
+        camera : Camera
+            An initialized camera, which is not acquiring images.
+        """
+        if self._on_device:
+            camera["SequencerMode"].value = "Off"
+            self._on_device = False
@@ -0,0 +1,533 @@
+"""Distribution of frames to other processes through shared memory.
+
+A `FramePublisher` writes frames into a ring of slots in a
+`multiprocessing.shared_memory` block, and any number of `FrameSubscriber`
+objects, usually in other processes, read them as numpy arrays backed by the
+shared memory. Nothing is pickled or copied on the way.
+
+Each slot has a sequence number that is odd while the slot is being written
+and even when it holds a complete frame, so a subscriber can tell if the
+publisher has overwritten a frame that it hasn't read yet. Requires Python
+3.8 or newer.
+"""
+
+import atexit
+import collections
+import json
+import os
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from camazing.frames import frame_metadata
+
+# Layout of the shared memory block: a header with the number of published
+# frames and a JSON description of the ring, the sequence numbers and
+# metadata lengths of the slots, and the slots. The data of each slot starts
+# at a cache line boundary.
+_HEADER_SIZE = 4096
+_ALIGNMENT = 64
+
+SharedFrame = collections.namedtuple("SharedFrame", ["data", "meta", "sequence"])
+SharedFrame.__doc__ = """A frame read from shared memory.
+
+Attributes
+----------
+data : numpy.ndarray
+    Image data. A read-only view to the shared memory, which stays valid
+    until the publisher reuses the slot (see `FrameSubscriber.is_valid`).
+meta : dict
+    Metadata of the frame, such as the scalar coordinates of a frame from
+    `Camera.get_frame`.
+sequence : int
+    Sequence number of the frame, counting from zero.
+"""
+
+
+# Before Python 3.13, attaching to a shared memory block registers it to the
+# resource tracker of the process, which frees it when the process exits.
+_UNTRACKED_ATTACH = sys.version_info >= (3, 13) or os.name != "posix"
+
+
+# Shared memory blocks closed while frames still referenced them, with the
+# reference counts of their memory maps when unused. They are closed for
+# real by a later `close` or at exit, once the frames are gone.
+_deferred_closes = []
+
+
+def _mmap_refs(shm):
+    """Count the references to the memory map of a shared memory block."""
+    return sys.getrefcount(shm._mmap)
+
+
+def _close_shared_memory(shm=None, refs=None):
+    """Close a shared memory block, and any blocks whose closing was deferred.
+
+    Numpy arrays using the memory, such as the data of a `SharedFrame` that
+    a consumer holds on to, keep a reference to its memory map. Depending on
+    the numpy version, they either make closing fail with `BufferError`, or
+    don't prevent unmapping the memory under them at all. The block is kept
+    open as long as its memory map has more references than `refs`, the
+    count without any arrays.
+    """
+    pending = _deferred_closes[:]
+    _deferred_closes.clear()
+    if shm is not None:
+        pending.append((shm, refs))
+    for shm, refs in pending:
+        if _mmap_refs(shm) > refs:
+            _deferred_closes.append((shm, refs))
+            continue
+        try:
+            shm.close()
+        except BufferError:
+            _deferred_closes.append((shm, refs))
+
+
+atexit.register(_close_shared_memory)
+
+
+class OverrunError(Exception):
+    """Raised when frames were overwritten before a subscriber read them."""
+
+
+def _align(n):
+    return -(-n // _ALIGNMENT) * _ALIGNMENT
+
+
+def _c_strides(shape, itemsize):
+    """Get the strides of a C-contiguous array."""
+    strides = []
+    stride = itemsize
+    for n in reversed(shape):
+        strides.append(stride)
+        stride *= n
+    return tuple(reversed(strides))
+
+
+class _Ring:
+    """Views to the parts of a shared memory ring."""
+
+    def __init__(self, shm, description):
+        self.shm = shm
+        # Counted before any arrays use the memory, see `_close_shared_memory`.
+        self.refs = _mmap_refs(shm)
+        self.description = description
+        self.n_slots = description["n_slots"]
+        self.meta_size = description["meta_size"]
+        self.shape = tuple(description["shape"])
+        self.dtype = np.dtype(description["dtype"])
+
+        n_slots = self.n_slots
+        buf = shm.buf
+        self.head = np.ndarray((1,), np.uint64, buf, 0)
+        self.sequences = np.ndarray((n_slots,), np.uint64, buf, _HEADER_SIZE)
+        self.meta_lengths = np.ndarray(
+            (n_slots,), np.uint32, buf, _HEADER_SIZE + 8 * n_slots
+        )
+        offset = _align(_HEADER_SIZE + 12 * n_slots)
+        self.metas = np.ndarray(
+            (n_slots, self.meta_size), np.uint8, buf, offset
+        )
+        offset = _align(offset + n_slots * self.meta_size)
+        self.data = np.ndarray(
+            (n_slots,) + self.shape, self.dtype, buf, offset,
+            (_align(self.dtype.itemsize * int(np.prod(self.shape))),) +
+            _c_strides(self.shape, self.dtype.itemsize)
+        )
+
+    @staticmethod
+    def size(n_slots, shape, dtype, meta_size):
+        """Get the size of a ring in bytes."""
+        offset = _align(_HEADER_SIZE + 12 * n_slots)
+        offset = _align(offset + n_slots * meta_size)
+        frame_size = _align(np.dtype(dtype).itemsize * int(np.prod(shape)))
+        return offset + n_slots * frame_size
+
+    def release(self):
+        """Drop the views so that the shared memory can be closed."""
+        self.head = self.sequences = self.meta_lengths = None
+        self.metas = self.data = None
+
+
+class FramePublisher:
+    """Writes frames to a ring buffer in shared memory.
+
+    Examples
+    --------
+    >>> with FramePublisher((1024, 1280), "uint8") as publisher, camera:
+    ...     # Subscribers connect with FrameSubscriber(publisher.name).
+    ...     while True:
+    ...         publisher.publish(camera.get_frame())
+    """
+
+    def __init__(self, shape, dtype, n_slots=16, name=None, meta_size=4096,
+                 dims=None):
+        """Create the shared memory block.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            Shape of the frames.
+        dtype : numpy.dtype or str
+            Data type of the frames.
+        n_slots : int, optional
+            Number of frames kept in the ring. A subscriber may fall behind
+            the publisher by this many frames before losing frames.
+        name : str, optional
+            Name of the shared memory block. A unique name is generated by
+            default.
+        meta_size : int, optional
+            Maximum size of the metadata of a frame as JSON, in bytes.
+        dims : tuple of str, optional
+            Names of the dimensions of the frames, passed on to subscribers.
+
+        Raises
+        ------
+        ValueError
+            If `n_slots` is less than 2.
+        """
+        if n_slots < 2:
+            raise ValueError("A ring must have at least 2 slots.")
+
+        description = {
+            "shape": list(shape),
+            "dtype": np.dtype(dtype).str,
+            "dims": list(dims) if dims is not None else None,
+            "n_slots": n_slots,
+            "meta_size": meta_size,
+        }
+        size = _Ring.size(n_slots, shape, dtype, meta_size)
+        self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        self._ring = _Ring(self._shm, description)
+
+        encoded = json.dumps(description).encode()
+        self._shm.buf[16:16 + len(encoded)] = encoded
+        self._shm.buf[8:16] = len(encoded).to_bytes(8, "little")
+        self._ring.sequences[:] = 0
+        self._ring.head[0] = 0
+
+    @classmethod
+    def for_frame(cls, frame, **kwargs):
+        """Create a publisher for frames like the given one.
+
+        Parameters
+        ----------
+        frame : xarray.DataArray or numpy.ndarray
+            An example frame, e.g. from `Camera.get_frame`.
+        **kwargs
+            Other arguments of `FramePublisher`.
+
+        Returns
+        -------
+        FramePublisher
+            The publisher.
+        """
+        dims = getattr(frame, "dims", None)
+        return cls(frame.shape, frame.dtype, dims=dims, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+        self.unlink()
+
+    @property
+    def name(self):
+        """Name of the shared memory block, given to subscribers."""
+        return self._shm.name
+
+    @property
+    def published(self):
+        """Number of frames published."""
+        return int(self._ring.head[0])
+
+    def publish(self, frame, meta=None):
+        """Write a frame to the next slot of the ring.
+
+        Parameters
+        ----------
+        frame : xarray.DataArray or numpy.ndarray
+            The frame. The scalar coordinates of a `DataArray` are published
+            as metadata.
+        meta : dict, optional
+            Additional JSON-serializable metadata.
+
+        Returns
+        -------
+        int
+            Sequence number of the frame.
+
+        Raises
+        ------
+        ValueError
+            If the shape or type of the frame doesn't match the ring, or the
+            metadata is too large.
+        """
+        ring = self._ring
+        if hasattr(frame, "coords"):
+            meta = {**frame_metadata(frame), **(meta or {})}
+            frame = frame.values
+        if frame.shape != ring.shape or frame.dtype != ring.dtype:
+            raise ValueError(
+                f"Expected a frame of shape {ring.shape} and type "
+                f"{ring.dtype}, but got {frame.shape} and {frame.dtype}."
+            )
+        encoded = json.dumps(meta or {}).encode()
+        if len(encoded) > ring.meta_size:
+            raise ValueError(
+                f"Frame metadata takes {len(encoded)} bytes, but the ring "
+                f"has room for {ring.meta_size}."
+            )
+
+        sequence = int(ring.head[0])
+        slot = sequence % ring.n_slots
+        ring.sequences[slot] = 2 * sequence + 1
+        ring.data[slot] = frame
+        ring.metas[slot, :len(encoded)] = np.frombuffer(encoded, np.uint8)
+        ring.meta_lengths[slot] = len(encoded)
+        ring.sequences[slot] = 2 * sequence + 2
+        ring.head[0] = sequence + 1
+        return sequence
+
+    def close(self):
+        """Close the shared memory of this publisher."""
+        if self._ring is not None:
+            refs = self._ring.refs
+            self._ring.release()
+            self._ring = None
+            _close_shared_memory(self._shm, refs)
+
+    def unlink(self):
+        """Free the shared memory block once all users have closed it."""
+        if not _UNTRACKED_ATTACH:
+            # A subscriber sharing the resource tracker of this process (e.g.
+            # a forked one) has unregistered the block, and unlinking
+            # unregisters it again.
+            resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+
+class FrameSubscriber:
+    """Reads frames from the ring buffer of a `FramePublisher`.
+
+    Examples
+    --------
+    >>> with FrameSubscriber(name) as subscriber:
+    ...     while True:
+    ...         frame = subscriber.get()
+    ...         process(frame.data, frame.meta)
+    """
+
+    def __init__(self, name, start="next"):
+        """Attach to the shared memory block of a publisher.
+
+        Parameters
+        ----------
+        name : str
+            Name of the shared memory block (`FramePublisher.name`).
+        start : {'next', 'latest', 'oldest'}, optional
+            The first frame to read: the next one to be published, the most
+            recently published one, or the oldest one still in the ring.
+
+        Raises
+        ------
+        ValueError
+            If `start` is invalid.
+        """
+        if start not in ("next", "latest", "oldest"):
+            raise ValueError(
+                f"Expected `start` to be 'next', 'latest' or 'oldest', but "
+                f"got {start!r}."
+            )
+
+        if sys.version_info >= (3, 13):
+            self._shm = shared_memory.SharedMemory(name, track=False)
+        else:
+            self._shm = shared_memory.SharedMemory(name)
+            if not _UNTRACKED_ATTACH:
+                # Only the publisher owns the block, so it must not be freed
+                # when this process exits.
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        length = int.from_bytes(self._shm.buf[8:16], "little")
+        description = json.loads(bytes(self._shm.buf[16:16 + length]))
+        self._ring = _Ring(self._shm, description)
+        self.overruns = 0
+
+        head = int(self._ring.head[0])
+        if start == "next":
+            self._next = head
+        elif start == "latest":
+            self._next = max(head - 1, 0)
+        else:
+            self._next = max(head - self._ring.n_slots + 1, 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    @property
+    def shape(self):
+        """Shape of the frames."""
+        return self._ring.shape
+
+    @property
+    def dtype(self):
+        """Data type of the frames."""
+        return self._ring.dtype
+
+    @property
+    def dims(self):
+        """Names of the dimensions of the frames, if given."""
+        dims = self._ring.description["dims"]
+        return tuple(dims) if dims is not None else None
+
+    @property
+    def pending(self):
+        """Number of published frames not yet read."""
+        return int(self._ring.head[0]) - self._next
+
+    def _skip(self, to):
+        """Skip lost frames up to the given sequence number."""
+        if to > self._next:
+            self.overruns += to - self._next
+            self._next = to
+
+    def get(self, timeout=None, on_overrun="skip"):
+        """Wait for the next frame.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait in seconds. Waits indefinitely by default.
+        on_overrun : {'skip', 'raise'}, optional
+            What to do if frames were overwritten before they were read:
+            count them in `overruns` and continue from the oldest frame still
+            in the ring, or raise `OverrunError`.
+
+        Returns
+        -------
+        SharedFrame
+            The frame, whose data is a view to the shared memory.
+
+        Raises
+        ------
+        TimeoutError
+            If no frame was published within `timeout`.
+        OverrunError
+            If frames were overwritten and `on_overrun` is 'raise'.
+        """
+        ring = self._ring
+        n_slots = ring.n_slots
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 1e-5
+
+        while True:
+            head = int(ring.head[0])
+            if head <= self._next:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError("No frame published within timeout.")
+                time.sleep(delay)
+                delay = min(2 * delay, 1e-3)
+                continue
+
+            # The publisher may already be writing the slot of the oldest
+            # frame, so that one counts as lost as well.
+            lost_until = head - n_slots + 1
+            if lost_until > self._next:
+                if on_overrun == "raise":
+                    self._skip(lost_until)
+                    raise OverrunError(
+                        f"Frames were overwritten, {self.overruns} lost so "
+                        f"far."
+                    )
+                self._skip(lost_until)
+
+            sequence = self._next
+            slot = sequence % n_slots
+            expected = 2 * sequence + 2
+            if int(ring.sequences[slot]) != expected:
+                # Overwritten between reading the head and the slot.
+                continue
+            length = int(ring.meta_lengths[slot])
+            meta = bytes(ring.metas[slot, :length])
+            data = ring.data[slot]
+            if int(ring.sequences[slot]) != expected:
+                continue
+
+            data.flags.writeable = False
+            self._next = sequence + 1
+            return SharedFrame(data, json.loads(meta), sequence)
+
+    def read(self, sequence):
+        """Read a frame by its sequence number.
+
+        Unlike `get`, this doesn't wait or move the position of the
+        subscriber, which lets several subscribers share the frames.
+
+        Parameters
+        ----------
+        sequence : int
+            Sequence number of a published frame.
+
+        Returns
+        -------
+        SharedFrame
+            The frame, whose data is a view to the shared memory.
+
+        Raises
+        ------
+        OverrunError
+            If the frame has been overwritten or is not published yet.
+        """
+        ring = self._ring
+        slot = sequence % ring.n_slots
+        expected = 2 * sequence + 2
+        if int(ring.sequences[slot]) == expected:
+            length = int(ring.meta_lengths[slot])
+            meta = bytes(ring.metas[slot, :length])
+            data = ring.data[slot]
+            if int(ring.sequences[slot]) == expected:
+                data.flags.writeable = False
+                return SharedFrame(data, json.loads(meta), sequence)
+        raise OverrunError(f"Frame {sequence} is not in the ring.")
+
+    def is_valid(self, frame):
+        """Check that the data of a frame hasn't been overwritten.
+
+        The data of a `SharedFrame` is not copied, so the publisher reuses
+        its memory after `n_slots` more frames. Checking after processing a
+        frame tells if the results can be trusted.
+
+        Parameters
+        ----------
+        frame : SharedFrame
+            A frame returned by `get`.
+
+        Returns
+        -------
+        bool
+            `True` if the frame is still intact.
+        """
+        slot = frame.sequence % self._ring.n_slots
+        return int(self._ring.sequences[slot]) == 2 * frame.sequence + 2
+
+    def close(self):
+        """Detach from the shared memory.
+
+        Frames returned by `get` and `read` may still be held: the memory
+        is only unmapped once they are released, by a later `close` of any
+        ring or at exit. Their data can't be trusted after closing, as
+        `is_valid` can no longer be checked, so copy any data needed longer.
+        """
+        if self._ring is not None:
+            refs = self._ring.refs
+            self._ring.release()
+            self._ring = None
+            _close_shared_memory(self._shm, refs)
@@ -34,7 +34,8 @@ setuptools.setup(
     author="Severi Jääskeläinen",
     author_email="severi.jaaskelainen@gmail.com",
     url="https://github.com/silmae/camazing",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["tests"]),
+    python_requires=">=3.8",
     license="MIT licence",
     install_requires=requirements,
     extras_require=extras_requirements,
@@ -0,0 +1,25 @@
+import pytest
+
+from camazing.core import CameraList
+from camazing.emulator import EmulatedCamera, EmulatedGenTL
+from camazing.util import Singleton
+
+
+@pytest.fixture
+def make_camera():
+    """Create initialized emulated cameras, finalized after the test."""
+    cameras = []
+
+    def make(**spec):
+        spec.setdefault("frame_rate", 500.0)
+        # `CameraList` is a singleton, so a new one is needed for each
+        # emulated transport layer.
+        Singleton._instances.pop(CameraList, None)
+        camera = CameraList(gentl=EmulatedGenTL([EmulatedCamera(**spec)]))[0]
+        camera.initialize()
+        cameras.append(camera)
+        return camera
+
+    yield make
+    for camera in cameras:
+        camera.finalize()
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from camazing.core import AcquisitionException
+from camazing.framelog import FLAG_FRAMES_LOST
+
+
+def test_loss_report_after_reconfigure(make_camera):
+    camera = make_camera()
+    camera.start_acquisition(frame_log=True)
+    try:
+        for _ in range(5):
+            camera.get_frame()
+        camera.reconfigure(Width=320)
+        for _ in range(3):
+            frame = camera.get_frame()
+    finally:
+        camera.stop_acquisition()
+
+    assert frame.shape[1] == 320
+    report = camera.loss_report()
+    assert report["frames_lost"] == 0
+    assert report["loss_ratio"] == 0.0
+    assert report["restarts"] == 0
+    assert not (camera.frame_log.array()["flags"] & FLAG_FRAMES_LOST).any()
+
+
+def test_device_without_data_streams(make_camera):
+    camera = make_camera()
+    camera._device.data_stream_ids = []
+    with pytest.raises(AcquisitionException, match="no data streams"):
+        camera.start_acquisition(n_buffers="auto", memory_budget=1 << 20)
+    assert not camera.is_acquiring()
+
+
+def test_newest_only_keeps_triggers_in_flight(make_camera):
+    camera = make_camera()
+    camera["TriggerMode"].value = "On"
+    camera["TriggerSource"].value = "Software"
+    camera.start_acquisition(n_buffers=8, trigger_depth=3,
+                             buffer_handling="NewestOnly")
+    try:
+        camera.get_frame()
+        for _ in range(5):
+            # Let all the triggered frames arrive, so that all but the
+            # newest are discarded.
+            time.sleep(0.05)
+            camera.get_frame()
+    finally:
+        camera.stop_acquisition()
+
+    assert camera.stats()["counters"]["discarded_buffers"] == 10
+
+
+def test_failed_acquisition_start_closes_data_streams(make_camera):
+    camera = make_camera(sequencer_sets=4)
+    camera.set_sequence([{"ExposureTime": 1000.0}, {"ExposureTime": 2000.0}])
+
+    def fail():
+        raise RuntimeError("AcquisitionStart failed")
+
+    camera["AcquisitionStart"].execute = fail
+    with pytest.raises(RuntimeError):
+        camera.start_acquisition()
+    assert not camera.is_acquiring()
+    assert not camera._data_streams
+    assert not camera._buffers
+    assert camera["SequencerMode"].value == "Off"
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+VALID_RANGE = np.array([0, 4095])
+
+
+def expose(camera, scene):
+    """Image of a scene by a linear sensor with the camera's settings."""
+    scale = camera["ExposureTime"].value * 10 ** (camera["Gain"].value / 20)
+    return np.clip(scene * scale, 0, 4095).astype(np.uint16)
+
+
+def run(camera, controller, scene, n_frames=50):
+    for _ in range(n_frames):
+        controller.update(expose(camera, scene), VALID_RANGE)
+    return controller.state()
+
+
+@pytest.fixture
+def scene():
+    rng = np.random.default_rng(0)
+    return rng.uniform(0.5, 1.5, size=(64, 64))
+
+
+def test_converges_to_target(make_camera, scene):
+    camera = make_camera(exposure_time=100.0)
+    controller = camera.auto_exposure(target=0.4, min_interval=0,
+                                      settle_frames=0, subsample=1)
+    state = run(camera, controller, scene)
+
+    assert state["status"] == "converged"
+    assert state["brightness"] == pytest.approx(0.4, rel=0.05)
+    assert state["exposure_time"] == camera["ExposureTime"].value
+    # The exposure time was enough, so the gain was not touched.
+    assert camera["Gain"].value == 0.0
+    assert state["updates"] <= 3
+
+
+def test_gain_is_raised_at_the_exposure_limit(make_camera, scene):
+    camera = make_camera(exposure_time=100.0)
+    controller = camera.auto_exposure(target=0.4, min_interval=0,
+                                      settle_frames=0, subsample=1,
+                                      exposure_limits=(1.0, 400.0))
+    state = run(camera, controller, scene)
+
+    assert state["status"] == "converged"
+    assert camera["ExposureTime"].value == 400.0
+    assert camera["Gain"].value > 0
+    assert state["brightness"] == pytest.approx(0.4, rel=0.05)
+
+
+def test_saturated_image_is_darkened(make_camera, scene):
+    camera = make_camera(exposure_time=100000.0)
+    controller = camera.auto_exposure(target=0.4, min_interval=0,
+                                      settle_frames=0, subsample=1)
+    controller.update(expose(camera, scene), VALID_RANGE)
+    assert camera["ExposureTime"].value <= 100000.0 / 4
+
+    state = run(camera, controller, scene)
+    assert state["status"] == "converged"
+    assert state["saturated"] == 0.0
+
+
+def test_limited(make_camera, scene):
+    camera = make_camera(exposure_time=100.0)
+    controller = camera.auto_exposure(target=0.4, min_interval=0,
+                                      settle_frames=0, use_gain=False,
+                                      exposure_limits=(1.0, 200.0))
+    state = run(camera, controller, scene, n_frames=5)
+    assert state["status"] == "limited"
+    assert state["gain"] is None
+    assert camera["ExposureTime"].value == 200.0
+
+
+def test_settle_frames_are_skipped(make_camera, scene):
+    camera = make_camera(exposure_time=100.0)
+    controller = camera.auto_exposure(target=0.4, min_interval=0,
+                                      settle_frames=3)
+    assert controller.update(expose(camera, scene), VALID_RANGE)
+    for _ in range(3):
+        assert not controller.update(np.zeros((64, 64), np.uint16),
+                                     VALID_RANGE)
+    assert controller.state()["updates"] == 1
+
+
+def test_runs_on_acquired_frames(make_camera):
+    camera = make_camera()
+    with camera.auto_exposure(target=0.4) as controller:
+        camera.start_acquisition()
+        try:
+            for _ in range(5):
+                camera.get_frame()
+        finally:
+            camera.stop_acquisition()
+        assert controller.frames == 5
+        assert controller.state()["brightness"] is not None
+    # Closing detaches the controller from the camera.
+    assert camera._auto_exposure is None
+
+
+def test_invalid_target(make_camera):
+    camera = make_camera()
+    with pytest.raises(ValueError):
+        camera.auto_exposure(target=1.5)
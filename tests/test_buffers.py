@@ -0,0 +1,50 @@
+import pytest
+
+from camazing.buffers import MARGIN, estimate_buffer_count, grow_buffer_count
+
+
+def test_estimate_from_frame_rate():
+    n_buffers, reason = estimate_buffer_count(500.0, 1000, latency=0.1)
+    assert n_buffers == 50 + MARGIN
+    assert "500 frames/s" in reason
+
+    assert estimate_buffer_count(None, 1000, minimum=3)[0] == 3
+    assert estimate_buffer_count(1.0, 1000, minimum=8)[0] == 8
+
+
+def test_estimate_within_memory_budget():
+    n_buffers, reason = estimate_buffer_count(500.0, 1000,
+                                              memory_budget=20500)
+    assert n_buffers == 20
+    assert "memory budget" in reason
+
+    with pytest.raises(ValueError):
+        estimate_buffer_count(500.0, 1000, memory_budget=1500, minimum=2)
+
+
+def test_grow():
+    assert grow_buffer_count(10, 2, 1000) == 15
+    assert grow_buffer_count(10, 30, 1000) == 40
+    assert grow_buffer_count(10, 30, 1000, memory_budget=12000) == 12
+    # A full budget doesn't shrink the pool.
+    assert grow_buffer_count(10, 30, 1000, memory_budget=5000) == 10
+
+
+def test_automatic_buffer_count(make_camera):
+    camera = make_camera(frame_rate=500.0)
+    payload_size = camera["PayloadSize"].value
+    camera.start_acquisition(n_buffers="auto", latency=0.1)
+    try:
+        buffers, = camera._buffers.values()
+        assert len(buffers) == 50 + MARGIN
+        camera.get_frame()
+    finally:
+        camera.stop_acquisition()
+
+    camera.start_acquisition(n_buffers="auto", latency=0.1,
+                             memory_budget=10 * payload_size)
+    try:
+        buffers, = camera._buffers.values()
+        assert len(buffers) == 10
+    finally:
+        camera.stop_acquisition()
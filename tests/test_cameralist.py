@@ -0,0 +1,65 @@
+import pytest
+
+from camazing.core import CameraList
+from camazing.emulator import EmulatedCamera, EmulatedGenTL
+from camazing.util import Singleton
+
+
+def make_list(specs):
+    Singleton._instances.pop(CameraList, None)
+    gentl = EmulatedGenTL(specs)
+    return gentl, CameraList(gentl=gentl)
+
+
+def test_update_keeps_cameras_with_repeated_serial_numbers():
+    gentl, cameras = make_list([
+        EmulatedCamera(serial_number="", model="A"),
+        EmulatedCamera(serial_number="", model="B"),
+        EmulatedCamera(serial_number="X", model="C"),
+        EmulatedCamera(serial_number="X", model="D"),
+    ])
+    before = list(cameras)
+    assert len(before) == 4
+    cameras.update()
+    assert all(a is b for a, b in zip(before, cameras))
+    assert [c._device_info.model for c in cameras] == ["A", "B", "C", "D"]
+
+
+def test_update_finalizes_removed_cameras():
+    gentl, cameras = make_list([EmulatedCamera(), EmulatedCamera()])
+    kept, removed = list(cameras)
+    removed.initialize()
+    removed.start_acquisition()
+    removed.get_frame()
+
+    device = gentl.interfaces[0].devices.pop()
+    cameras.update()
+
+    assert list(cameras) == [kept]
+    assert not removed.is_acquiring()
+    assert not removed.is_initialized()
+    assert not device._streams
+
+
+def test_initialize_all_reports_cameras_with_repeated_serial_numbers():
+    _, cameras = make_list([
+        EmulatedCamera(serial_number=""),
+        EmulatedCamera(serial_number=""),
+        EmulatedCamera(serial_number="X"),
+    ])
+    first, second, third = cameras
+    try:
+        with pytest.raises(ValueError, match="shared by 2 cameras"):
+            cameras.initialize_all({"": {"Gain": 6.0}})
+        assert not first.is_initialized()
+
+        reports = cameras.initialize_all({
+            second: {"Gain": 6.0}, "X": {"Gain": 12.0},
+        })
+        assert list(reports) == [first, second, third]
+        assert all(report["error"] is None for report in reports.values())
+        assert [camera["Gain"].value for camera in cameras] == \
+            [0.0, 6.0, 12.0]
+    finally:
+        for camera in cameras:
+            camera.finalize()
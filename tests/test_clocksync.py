@@ -0,0 +1,35 @@
+import threading
+import time
+
+import pytest
+
+
+def test_sync_runs_off_the_acquisition_thread(make_camera):
+    camera = make_camera(clock_drift=1e-3)
+    sync = camera.enable_clock_sync(interval=0.02, samples=2)
+    latch = camera["TimestampLatch"]
+    latches = []
+    execute = latch.execute
+    latch.execute = lambda: (latches.append(threading.current_thread()),
+                             execute())
+
+    camera.start_acquisition()
+    try:
+        start = time.perf_counter()
+        while time.perf_counter() - start < 0.2:
+            frame = camera.get_frame()
+    finally:
+        camera.stop_acquisition()
+
+    # The fit was updated while frames were fetched, by another thread.
+    assert latches
+    assert threading.current_thread() not in latches
+    assert sync.state()["samples"] > 1
+    assert sync.state()["drift_ppm"] == pytest.approx(1000, rel=0.1)
+    assert abs(float(frame.timestamp) - time.time()) < 0.1
+
+    camera.disable_clock_sync()
+    assert camera._clock_sync is None
+    n_latches = len(latches)
+    time.sleep(0.05)
+    assert len(latches) == n_latches
@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+import pytest
+
+from camazing.executor import FrameExecutor
+
+
+def total(data, meta):
+    return int(data.sum())
+
+
+def slow_total(data, meta):
+    time.sleep(0.05)
+    return int(data.sum())
+
+
+def fail(data, meta):
+    raise RuntimeError("analysis failed")
+
+
+def test_results_are_in_order():
+    images = [np.full((16, 16), i, dtype=np.uint16) for i in range(20)]
+    with FrameExecutor(total, max_workers=2, n_slots=4) as executor:
+        results = [result.result for result in executor.map(images)]
+    assert results == [256 * i for i in range(20)]
+
+
+def test_dropped_frames_are_skipped():
+    images = [np.full((16, 16), i, dtype=np.uint8) for i in range(10)]
+    with FrameExecutor(slow_total, max_workers=1, n_slots=1,
+                       backpressure="drop") as executor:
+        results = [result.result for result in executor.map(images)]
+        dropped = executor.dropped
+    assert dropped > 0
+    assert len(results) + dropped == 10
+    assert results == sorted(results)
+
+
+def test_exception_of_the_function_is_raised():
+    with FrameExecutor(fail, max_workers=1) as executor:
+        executor.submit(np.zeros((4, 4), np.uint8))
+        with pytest.raises(RuntimeError, match="analysis failed"):
+            list(executor.results(wait=True))
+
+
+def test_imap(make_camera):
+    camera = make_camera()
+    camera.start_acquisition()
+    try:
+        results = list(camera.imap(total, n_frames=10, max_workers=2))
+    finally:
+        camera.stop_acquisition()
+    frame_ids = [result.meta["frame_id"] for result in results]
+    assert len(results) == 10
+    assert frame_ids == sorted(frame_ids)
+    assert all(isinstance(result.result, int) for result in results)
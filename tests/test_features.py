@@ -0,0 +1,53 @@
+import pytest
+
+from camazing.feature_types import AccessModeError
+
+
+def test_set_values_writes_enumerations_first(make_camera):
+    camera = make_camera()
+    camera.set_values({"Gain": 6.0, "TriggerMode": "On",
+                       "ExposureTime": 2000.0})
+    assert camera.get_values(["Gain", "TriggerMode", "ExposureTime"]) == \
+        {"Gain": 6.0, "TriggerMode": "On", "ExposureTime": 2000.0}
+
+
+def test_set_values_rolls_back_on_invalid_value(make_camera):
+    camera = make_camera()
+    before = camera.get_values(["Gain", "TriggerMode", "ExposureTime"])
+    with pytest.raises(ValueError, match="ExposureTime"):
+        camera.set_values({"Gain": 6.0, "TriggerMode": "On",
+                           "ExposureTime": 1e9})
+    assert camera.get_values(["Gain", "TriggerMode", "ExposureTime"]) == \
+        before
+
+
+def test_set_values_without_rollback(make_camera):
+    camera = make_camera()
+    with pytest.raises(AccessModeError):
+        camera.set_values({"Gain": 6.0, "DeviceTemperature": 20.0},
+                          atomic=False)
+    assert camera["Gain"].value == 6.0
+
+
+def test_set_values_unknown_feature_writes_nothing(make_camera):
+    camera = make_camera()
+    with pytest.raises(KeyError):
+        camera.set_values({"Gain": 6.0, "NoSuchFeature": 1})
+    assert camera["Gain"].value == 0.0
+
+
+def test_set_values_holds_the_feature_lock(make_camera):
+    camera = make_camera()
+    gain = camera["Gain"]
+    locked = []
+    write = gain._write
+
+    def checked_write(value):
+        locked.append(camera._feature_lock.locked())
+        write(value)
+
+    gain._write = checked_write
+    with pytest.raises(ValueError):
+        camera.set_values({"Gain": 6.0, "ExposureTime": 1e9})
+    # Written and restored under the lock.
+    assert locked == [True, True]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from camazing.framelog import FLAG_FRAMES_LOST, FLAG_INCOMPLETE, FrameLog
+
+
+def test_records_span_chunks():
+    log = FrameLog(features=("ExposureTime",), chunk_size=4)
+    for i in range(10):
+        log.append(i, 1000 * i, 100.0 + i, values=(float(i),))
+    records = log.array()
+
+    assert len(log) == len(records) == 10
+    np.testing.assert_array_equal(records["frame_id"], np.arange(10))
+    np.testing.assert_array_equal(records["device_timestamp"],
+                                  1000 * np.arange(10))
+    np.testing.assert_array_equal(records["ExposureTime"], np.arange(10))
+    assert not records["flags"].any()
+
+    log.clear()
+    assert len(log) == 0
+    assert log.array().dtype == log.dtype
+
+
+def test_missing_values_and_flags():
+    log = FrameLog(features=("Gain",))
+    log.append(None, None, 1.5, complete=False, frames_lost=3,
+               values=(None,))
+    record, = log.array()
+    assert record["frame_id"] == -1
+    assert record["device_timestamp"] == 0
+    assert np.isnan(record["Gain"])
+    assert record["flags"] == FLAG_INCOMPLETE | FLAG_FRAMES_LOST
+
+
+def test_save(tmp_path):
+    log = FrameLog(features=("Gain",))
+    log.append(0, 10, 1.0, values=(6.0,))
+    log.save(tmp_path / "log.npz")
+    with np.load(tmp_path / "log.npz") as saved:
+        assert set(saved.files) == set(log.dtype.names)
+        np.testing.assert_array_equal(saved["Gain"], [6.0])
+
+
+def test_camera_logs_acquired_frames(make_camera):
+    camera = make_camera(exposure_time=2000.0, gain=6.0)
+    camera.start_acquisition(frame_log=True)
+    try:
+        frames = [camera.get_frame() for _ in range(5)]
+    finally:
+        camera.stop_acquisition()
+
+    log = camera.frame_log
+    # The numeric metadata features are logged, but not `PixelFormat`.
+    assert log.features == ("Gain", "ExposureTime")
+    records = log.array()
+    np.testing.assert_array_equal(
+        records["frame_id"], [frame.frame_id.item() for frame in frames]
+    )
+    np.testing.assert_array_equal(
+        records["host_timestamp"],
+        [frame.timestamp.item() for frame in frames]
+    )
+    np.testing.assert_array_equal(records["Gain"], 6.0)
+    np.testing.assert_array_equal(records["ExposureTime"], 2000.0)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from camazing.imagestats import image_statistics
+
+
+def test_mono_statistics_match_numpy():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 4096, size=(120, 160), dtype=np.uint16)
+    image[:2] = 4095
+    stats = image_statistics(image, np.array([0, 4095]),
+                             percentiles=(1, 50, 99))
+
+    np.testing.assert_array_equal(
+        stats["histogram"], np.bincount(image.ravel(), minlength=4096)
+    )
+    assert stats["pixels"] == image.size
+    assert stats["mean"] == pytest.approx(image.mean())
+    assert stats["saturated"] == pytest.approx((image == 4095).mean())
+    for q, value in stats["percentiles"].items():
+        assert value == np.percentile(image, q, method="inverted_cdf")
+
+
+def test_colour_statistics_per_channel():
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, size=(60, 80, 3), dtype=np.uint8)
+    stats = image_statistics(image, np.array([0, 255]), subsample=2)
+
+    view = image[::2, ::2]
+    assert stats["histogram"].shape == (3, 256)
+    for channel in range(3):
+        np.testing.assert_array_equal(
+            stats["histogram"][channel],
+            np.bincount(view[..., channel].ravel(), minlength=256)
+        )
+    np.testing.assert_allclose(stats["mean"], view.mean(axis=(0, 1)))
+    np.testing.assert_array_equal(
+        stats["percentiles"][50],
+        np.percentile(view, 50, axis=(0, 1), method="inverted_cdf")
+    )
+
+
+def test_values_over_the_valid_range_are_saturated():
+    image = np.array([[0, 100, 1023, 4000]], dtype=np.uint16)
+    stats = image_statistics(image, np.array([0, 1023]))
+    assert stats["histogram"].size == 1024
+    assert stats["saturated"] == 0.5
+
+
+def test_invalid_type():
+    with pytest.raises(ValueError):
+        image_statistics(np.zeros((4, 4), np.float32), np.array([0, 1]))
+
+
+def test_camera_statistics(make_camera):
+    camera = make_camera()
+    camera.enable_statistics(subsample=2, percentiles=(50,))
+    camera.start_acquisition()
+    try:
+        frame = camera.get_frame()
+        camera.disable_statistics()
+        assert "statistics" not in camera.get_frame().attrs
+    finally:
+        camera.stop_acquisition()
+
+    stats = frame.attrs["statistics"]
+    view = frame.values[::2, ::2]
+    assert stats["mean"] == pytest.approx(view.mean())
+    assert stats["pixels"] == view.size
@@ -0,0 +1,66 @@
+from camazing.metrics import FrameTracker
+
+
+def track(frame_ids):
+    tracker = FrameTracker()
+    lost = [tracker.update(frame_id) for frame_id in frame_ids]
+    return tracker, lost
+
+
+def test_gap():
+    tracker, lost = track([1, 2, 5, 6])
+    assert lost == [0, 0, 2, 0]
+    assert tracker.report()["frames_lost"] == 2
+    assert tracker.report()["gaps"] == 1
+
+
+def test_gev_wrap():
+    tracker, lost = track([0xFFFE, 0xFFFF, 1, 2])
+    assert lost == [0, 0, 0, 0]
+    tracker, lost = track([0xFFFE, 2])
+    assert lost == [0, 2]
+
+
+def test_duplicate():
+    tracker, lost = track([6, 7, 7, 8])
+    assert lost == [0, 0, 0, 0]
+    report = tracker.report()
+    assert report["frames_lost"] == 0
+    assert report["duplicates"] == 1
+    assert tracker.run_frames == 3
+
+
+def test_producer_restart():
+    tracker, lost = track([5, 6, 7, 1, 2, 4])
+    assert lost == [0, 0, 0, 0, 0, 1]
+    report = tracker.report()
+    assert report["frames_lost"] == 1
+    assert report["restarts"] == 1
+    assert report["first_frame_id"] == 5
+    assert report["last_frame_id"] == 4
+    assert tracker.run_frames == 4
+
+
+def test_backward_jump_near_gev_maximum_is_a_restart():
+    tracker, lost = track([0xFFF0, 0x8000])
+    assert lost == [0, 0]
+    assert tracker.report()["restarts"] == 1
+
+
+def test_restart_keeps_totals():
+    tracker, _ = track([1, 2, 4])
+    tracker.restart()
+    assert tracker.update(1) == 0
+    assert tracker.update(2) == 0
+    report = tracker.report()
+    assert report["frames_received"] == 5
+    assert report["frames_lost"] == 1
+    assert report["restarts"] == 0
+    assert tracker.run_frames == 2
+
+
+def test_missing_frame_ids():
+    tracker, lost = track([None, None])
+    assert lost == [0, 0]
+    assert tracker.report()["frames_received"] == 2
+    assert tracker.run_frames == 2
@@ -0,0 +1,31 @@
+import gc
+import weakref
+
+
+def test_unsubscribe_stops_callbacks(make_camera):
+    camera = make_camera()
+    gain = camera["Gain"]
+    calls = []
+    handle = gain.subscribe(calls.append)
+    gain.value = 1.0
+    assert calls == [gain]
+
+    gain.unsubscribe(handle)
+    gain.value = 2.0
+    assert calls == [gain]
+
+
+def test_subscribers_are_released(make_camera):
+    camera = make_camera()
+
+    class Callback:
+        def __call__(self, feature):
+            pass
+
+    callback = Callback()
+    released = weakref.ref(callback)
+    camera["Gain"].subscribe(callback)
+    del callback
+    camera.finalize()
+    gc.collect()
+    assert released() is None
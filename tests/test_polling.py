@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_features_are_polled_at_their_intervals(make_camera):
+    camera = make_camera(gain=6.0)
+    with camera.poll_features({"DeviceTemperature": 0.02, "Gain": 10.0},
+                              batch_window=0.001) as poller:
+        assert wait_for(lambda: len(poller.history("DeviceTemperature")) >= 5)
+        latest = poller.latest()
+
+    assert latest["Gain"][1] == 6.0
+    # Gain is read once, at the start.
+    assert len(poller.history("Gain")) == 1
+    timestamps = [t for t, _ in poller.history("DeviceTemperature")]
+    assert timestamps == sorted(timestamps)
+    # Closing detaches the poller from the camera, keeping the values.
+    assert camera._poller is None
+    assert len(poller.history("DeviceTemperature")) >= 5
+
+
+def test_features_due_together_are_read_in_one_batch(make_camera):
+    camera = make_camera()
+    with camera.poll_features(["DeviceTemperature", "Gain"],
+                              interval=0.02) as poller:
+        assert wait_for(lambda: poller.batches >= 3)
+    assert poller.reads == 2 * poller.batches
+
+
+def test_reads_wait_for_frames_during_acquisition(make_camera):
+    camera = make_camera()
+    poller = camera.poll_features(["DeviceTemperature"], interval=0.01,
+                                  frame_wait=10.0)
+    try:
+        assert wait_for(lambda: poller.reads >= 1)
+        camera.start_acquisition()
+        try:
+            time.sleep(0.05)
+            reads = poller.reads
+            time.sleep(0.1)
+            # No frames are fetched, so nothing is read.
+            assert poller.reads <= reads + 1
+            for _ in range(500):
+                camera.get_frame()
+                if poller.reads > reads + 1:
+                    break
+            assert poller.reads > reads + 1
+        finally:
+            camera.stop_acquisition()
+    finally:
+        poller.close()
+
+
+def test_invalid_interval(make_camera):
+    camera = make_camera()
+    with pytest.raises(ValueError):
+        camera.poll_features({"DeviceTemperature": 0})
@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+
+from camazing.preview import PreviewTap
+
+
+def latest(tap, timeout=1.0):
+    """Wait until the tap has published a preview frame."""
+    deadline = time.perf_counter() + timeout
+    while tap.latest() is None and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    return tap.latest()
+
+
+def test_downsampled_shapes():
+    image = np.arange(48 * 64, dtype=np.uint16).reshape(48, 64)
+    with PreviewTap(max_rate=1000, factor=4) as tap:
+        assert tap.offer(image, "Mono16", frame_id=7)
+        frame = latest(tap)
+    assert frame.frame_id == 7
+    np.testing.assert_array_equal(frame.data, image[::4, ::4])
+
+    with PreviewTap(max_rate=1000, factor=4, method="bin") as tap:
+        tap.offer(image, "Mono16")
+        frame = latest(tap)
+    expected = image.reshape(12, 4, 16, 4).mean(axis=(1, 3))
+    np.testing.assert_allclose(frame.data, expected)
+
+    with PreviewTap(max_rate=1000, factor=4, debayer=True) as tap:
+        tap.offer(image, "BayerRG16")
+        frame = latest(tap)
+    assert frame.data.shape == (12, 16, 3)
+    np.testing.assert_array_equal(frame.data[..., 0], image[::4, ::4])
+
+
+def test_offered_image_can_be_modified():
+    image = np.full((32, 32), 10, dtype=np.uint8)
+    with PreviewTap(max_rate=1000, factor=2) as tap:
+        # Keep the worker from picking up the image before it's modified.
+        with tap._condition:
+            tap.offer(image, "Mono8")
+            image[...] = 0
+        frame = latest(tap)
+    assert (frame.data == 10).all()
+
+
+def test_rate_cap(make_camera):
+    camera = make_camera()
+    with camera.preview(max_rate=20, factor=8) as preview:
+        camera.start_acquisition()
+        try:
+            start = time.perf_counter()
+            frames = 0
+            while time.perf_counter() - start < 0.5:
+                camera.get_frame()
+                frames += 1
+        finally:
+            camera.stop_acquisition()
+        time.sleep(0.05)
+        view = preview.latest()
+
+    assert view.data.shape == (60, 80)
+    assert frames > 50
+    assert 5 <= view.sequence + 1 <= 11
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from camazing.recording import Recorder, RecordingReader
+
+
+def frames(n):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 4096, (6, 8), dtype=np.uint16) for _ in range(n)]
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+@pytest.mark.parametrize("shuffle", [True, False])
+def test_round_trip(tmp_path, codec, shuffle):
+    path = str(tmp_path / "run.camrec")
+    written = frames(11)
+    with Recorder(path, codec=codec, shuffle=shuffle, chunk_frames=4) as rec:
+        for i, frame in enumerate(written):
+            rec.write(frame, {"index": i})
+    assert rec.stats()["frames"] == 11
+    assert rec.stats()["chunks"] == 3
+
+    with RecordingReader(path) as recording:
+        assert len(recording) == 11
+        assert recording.shape == (6, 8)
+        assert recording.dtype == np.uint16
+        assert recording.codec == codec
+        for i, frame in enumerate(written):
+            np.testing.assert_array_equal(recording[i], frame)
+            assert recording.meta(i) == {"index": i}
+        np.testing.assert_array_equal(recording[-1], written[-1])
+        assert recording.meta(-1) == {"index": 10}
+        np.testing.assert_array_equal(np.stack(list(recording)),
+                                      np.stack(written))
+
+
+def test_camera_frames_keep_their_coordinates(tmp_path, make_camera):
+    camera = make_camera(width=64, height=48)
+    path = str(tmp_path / "run.camrec")
+    with camera:
+        stats = camera.record(path, n_frames=5, chunk_frames=2)
+    assert stats["frames"] == 5
+
+    with RecordingReader(path) as recording:
+        assert len(recording) == 5
+        assert recording.dims == ("y", "x")
+        frame_ids = [recording.meta(i)["frame_id"] for i in range(5)]
+        assert frame_ids == sorted(frame_ids)
+        assert recording.meta(0)["ExposureTime"] == \
+            camera["ExposureTime"].value
+
+
+def test_unclosed_recording_is_recovered(tmp_path):
+    path = str(tmp_path / "run.camrec")
+    written = frames(10)
+    recorder = Recorder(path, chunk_frames=4, max_workers=1)
+    for i, frame in enumerate(written):
+        recorder.write(frame, {"index": i})
+    # The recorder crashes after writing two chunks, in the middle of the
+    # third one.
+    while recorder._pending:
+        recorder._flush(wait=True)
+    recorder._file.write(b"CHNK\x04\x00")
+    recorder._file.close()
+    recorder._pool.shutdown()
+
+    with RecordingReader(path) as recording:
+        assert len(recording) == 8
+        np.testing.assert_array_equal(recording[7], written[7])
+        assert recording.meta(7) == {"index": 7}
+
+
+def test_metadata_is_not_kept_in_memory(tmp_path):
+    with Recorder(str(tmp_path / "run.camrec"), chunk_frames=2,
+                  max_workers=1) as recorder:
+        for i, frame in enumerate(frames(10)):
+            recorder.write(frame, {"index": i})
+            while recorder._pending:
+                recorder._flush(wait=True)
+            assert len(recorder._meta) <= 1
+        assert recorder.frames_written == 10
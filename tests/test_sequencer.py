@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from camazing.core import AcquisitionException
+
+STEPS = [{"ExposureTime": 1000.0}, {"ExposureTime": 2000.0},
+         {"ExposureTime": 3000.0}]
+
+
+def first_frame_kept(seed, drop_rate):
+    return random.Random(seed).random() >= drop_rate
+
+
+@pytest.mark.parametrize("drop_rate", [0.0, 0.2])
+def test_device_sequence_steps(make_camera, drop_rate):
+    seed = 2
+    assert first_frame_kept(seed, drop_rate)
+    camera = make_camera(sequencer_sets=4, drop_rate=drop_rate, seed=seed)
+    camera.set_sequence(STEPS)
+    camera.start_acquisition()
+    try:
+        assert camera._sequencer.on_device
+        frames = [camera.get_frame() for _ in range(30)]
+    finally:
+        camera.stop_acquisition()
+
+    # The camera starts from the first set with frame ID 1, and moves to
+    # the next one with every frame, whether it arrives or not.
+    for frame in frames:
+        frame_id = int(frame.frame_id)
+        assert int(frame.sequence_step) == (frame_id - 1) % len(STEPS)
+    if drop_rate:
+        assert camera.loss_report()["frames_lost"] > 0
+    assert camera["SequencerMode"].value == "Off"
+
+
+def test_failed_start_disables_device_sequencer(make_camera):
+    camera = make_camera(sequencer_sets=4)
+    camera.set_sequence(STEPS)
+    with pytest.raises(ValueError):
+        # Too small for the minimum number of buffers.
+        camera.start_acquisition(n_buffers="auto", memory_budget=1)
+    assert not camera.is_acquiring()
+    assert camera["SequencerMode"].value == "Off"
+    assert not camera._sequencer.on_device
+
+
+def test_software_sequence_checks_trigger_depth_first(make_camera):
+    camera = make_camera()
+    camera["TriggerMode"].value = "On"
+    camera["TriggerSource"].value = "Software"
+    camera.set_sequence(STEPS, device_sequencer=False)
+    exposure_time = camera["ExposureTime"].value
+    with pytest.raises(AcquisitionException):
+        camera.start_acquisition(trigger_depth=2)
+    assert not camera.is_acquiring()
+    assert camera["ExposureTime"].value == exposure_time
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from camazing import sharedmem
+from camazing.sharedmem import FramePublisher, FrameSubscriber
+
+
+@pytest.mark.parametrize("shape, dtype", [
+    ((4, 6), "uint8"),
+    ((5, 3, 3), "uint16"),
+])
+def test_frames_round_trip(shape, dtype):
+    frames = [np.arange(np.prod(shape), dtype=dtype).reshape(shape) + i
+              for i in range(3)]
+    publisher = FramePublisher(shape, dtype, n_slots=4)
+    try:
+        subscriber = FrameSubscriber(publisher.name, start="oldest")
+        try:
+            for i, frame in enumerate(frames):
+                publisher.publish(frame, {"index": i})
+            for i, frame in enumerate(frames):
+                shared = subscriber.get(timeout=1)
+                assert shared.data.strides == frame.strides
+                np.testing.assert_array_equal(shared.data, frame)
+                assert shared.meta == {"index": i}
+        finally:
+            subscriber.close()
+    finally:
+        publisher.close()
+        publisher.unlink()
+
+
+def test_close_while_a_frame_is_held():
+    publisher = FramePublisher((4, 4), "uint8", n_slots=2)
+    try:
+        subscriber = FrameSubscriber(publisher.name, start="oldest")
+        publisher.publish(np.full((4, 4), 7, dtype=np.uint8), {})
+        frame = subscriber.get(timeout=1)
+        subscriber.close()
+        # The memory stays mapped while the frame is held.
+        assert (frame.data == 7).all()
+        assert sharedmem._deferred_closes
+        del frame
+    finally:
+        publisher.close()
+        publisher.unlink()
+    assert not sharedmem._deferred_closes
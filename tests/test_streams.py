@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+EXTRA_STREAMS = [(320, 240, "Mono16")]
+
+
+def test_frames_of_all_streams_are_matched(make_camera):
+    camera = make_camera(extra_streams=EXTRA_STREAMS, drop_rate=0.1, seed=3)
+    camera.start_acquisition()
+    try:
+        pairs = [camera.get_frames(timeout=1.0) for _ in range(20)]
+    finally:
+        camera.stop_acquisition()
+
+    for first, second in pairs:
+        assert first.shape == (480, 640)
+        assert second.shape == (240, 320)
+        assert str(second.dtype) == "uint16"
+        assert int(first.frame_id) == int(second.frame_id)
+        assert (int(first.stream), int(second.stream)) == (0, 1)
+
+
+def test_stalled_stream_times_out(make_camera):
+    camera = make_camera(extra_streams=EXTRA_STREAMS)
+    camera.start_acquisition(n_buffers=4)
+    try:
+        camera.get_frames(timeout=1.0)
+        # The producer of the second data stream stops delivering, after
+        # the frames it has already delivered.
+        camera._data_streams[1].stop_acquisition(0)
+        with pytest.raises(TimeoutError):
+            for _ in range(10):
+                camera.get_frames(timeout=0.1)
+        for _ in range(3):
+            start = time.perf_counter()
+            with pytest.raises(TimeoutError, match="data stream 1"):
+                camera.get_frames(timeout=0.1)
+            assert time.perf_counter() - start < 0.5
+        # The buffers of the first data stream were queued again.
+        assert camera._data_streams[0].num_queued > 0
+    finally:
+        camera.stop_acquisition()